@@ -0,0 +1,380 @@
+"""Banc d'essai hors ligne du scraper Yupoo
+
+Un faux site Yupoo local (pages catégorie avec .pagination__main et a.album__main, pages album,
+images de couverture) permet de mesurer le pipeline complet sans toucher au vrai site:
+
+    python benchmark.py --pages 4 --albums-per-page 12 --image-size 1600x1200 --latency-ms 40
+    python benchmark.py --forbidden 5 --placeholder 5 --redirect 5 --runs 3 --json bench.json
+
+Les pannes (403, placeholder, redirection vers res/703.gif) et la latence sont déterminées par
+l'URL demandée: deux exécutions avec les mêmes options voient exactement les mêmes réponses.
+"""
+
+import argparse
+import contextlib
+import http.server
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+from PIL import Image
+
+try:
+    import resource  # Indisponible sous Windows: la mémoire de pointe n'est alors pas mesurée
+except ImportError:
+    resource = None
+
+import scraper
+
+IMAGE_FORMATS = {'jpeg': ('JPEG', 'image/jpeg', 'jpg'), 'png': ('PNG', 'image/png', 'png'), 'webp': ('WEBP', 'image/webp', 'webp')}
+
+# GIF 1x1 servi par Yupoo à la place des images bloquées
+PLACEHOLDER_GIF = (b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+                   b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;')
+
+def synthetic_image(seed, size, image_format):
+    """Image déterministe à texture douce (taille de fichier proche d'une vraie photo produit)"""
+    width, height = size
+    rng = random.Random(seed)
+    tile_size = (max(1, width // 16), max(1, height // 16))
+    tile = Image.frombytes('RGB', tile_size, bytes(rng.getrandbits(8) for _ in range(tile_size[0] * tile_size[1] * 3)))
+    img = tile.resize(size, Image.BICUBIC)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=IMAGE_FORMATS[image_format][0], quality=90)
+    return buffer.getvalue()
+
+def fault_for(path, options):
+    """Panne injectée pour une URL d'image: None, 'forbidden', 'placeholder' ou 'redirect'"""
+    roll = zlib.crc32(path.encode('utf-8')) % 100
+    for fault in ('forbidden', 'placeholder', 'redirect'):
+        if roll < options[fault]:
+            return fault
+        roll -= options[fault]
+    return None
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Réponses du faux site; la configuration est portée par le serveur (self.server.options)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        options = self.server.options
+        path = self.path
+
+        # Latence déterministe: base + gigue dérivée de l'URL
+        if options['latency_ms'] or options['jitter_ms']:
+            jitter = zlib.crc32(path.encode('utf-8')) % (options['jitter_ms'] + 1)
+            time.sleep((options['latency_ms'] + jitter) / 1000)
+
+        if path.startswith('/categories/'):
+            match = re.search(r'page=(\d+)', path)
+            self.send_body(200, 'text/html; charset=utf-8', self.category_page(int(match.group(1)) if match else 1))
+        elif path.startswith('/albums/'):
+            album = int(path.split('/')[2].split('?')[0])
+            self.send_body(200, 'text/html; charset=utf-8', self.album_page(album))
+        elif path.startswith('/res/703.gif'):
+            self.send_body(200, 'image/gif', PLACEHOLDER_GIF)
+        elif path.startswith('/photo.yupoo.com/'):
+            self.image(path)
+        else:
+            self.send_body(404, 'text/plain', b'not found')
+
+    def category_page(self, page):
+        options = self.server.options
+        items = []
+        for i in range(options['albums_per_page']):
+            album = page * 1000 + i
+            items.append(
+                f'<div class="album"><a class="album__main" title="Album {album}" href="/albums/{album}?uid=1">'
+                f'<img class="album__img" data-src="{self.image_url(album, 0, "small")}">'
+                f'<div class="album__title">Album {album}</div></a></div>'
+            )
+        links = ''.join(f'<a class="pagination__number" href="?page={n}">{n}</a>' for n in range(1, options['pages'] + 1))
+        pagination = f'<div class="pagination__main"><span>au total {options["pages"]} pages</span>{links}</div>'
+        return f'<html><body><div class="categories__children">{"".join(items)}</div>{pagination}</body></html>'.encode('utf-8')
+
+    def album_page(self, album):
+        options = self.server.options
+        gallery = ''.join(
+            f'<div class="image__imagewrap"><img class="image__img" data-src="{self.image_url(album, k, "medium")}"></div>'
+            for k in range(1, options['gallery_images'] + 1)
+        )
+        return (
+            f'<html><body><div class="showalbumheader__main">'
+            f'<span class="showalbumheader__gallerytitle">YEEZY 700V2 Teal Blue {album} Size 36-46</span>'
+            f'<div class="showalbumheader__gallerycover"><img src="{self.image_url(album, 0, "medium")}"></div>'
+            f'</div><div class="showalbum__imagecardwrap">{gallery}</div></body></html>'
+        ).encode('utf-8')
+
+    def image_url(self, album, index, variant):
+        extension = IMAGE_FORMATS[self.server.options['image_format']][2]
+        return f"http://127.0.0.1:{self.server.server_port}/photo.yupoo.com/bench/{album}/{index}/{variant}.{extension}"
+
+    def image(self, path):
+        fault = fault_for(path, self.server.options)
+        if fault == 'forbidden':
+            self.send_body(403, 'text/html', b'<html><body>403 Forbidden</body></html>')
+            return
+        if fault == 'placeholder':
+            self.send_body(200, 'image/gif', PLACEHOLDER_GIF)
+            return
+        if fault == 'redirect':
+            self.send_response(302)
+            self.send_header('Location', '/res/703.gif')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        etag = '"%08x"' % zlib.crc32(path.encode('utf-8'))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        album, index = int(path.split('/')[3]), int(path.split('/')[4])
+        self.send_body(200, IMAGE_FORMATS[self.server.options['image_format']][1], self.server.images[album_ordinal(album, self.server.options)][index], etag)
+
+    def send_body(self, code, content_type, body, etag=None):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def album_ordinal(album, options):
+    """Rang de l'album dans la catégorie (0, 1, 2...) à partir de son ID page * 1000 + position"""
+    page, position = divmod(album, 1000)
+    return (page - 1) * options['albums_per_page'] + position
+
+def serve_stand_in(options, port_pipe):
+    """Processus du faux site: séparé pour ne pas partager le GIL ni la mémoire avec le scraper mesuré"""
+    # Une image distincte par URL (couverture K=0 et photos de galerie K>0 de chaque album):
+    # ni le cache ni le dédoublonnage du scraper ne peuvent éviter un téléchargement ou un encodage.
+    # Avec --shared-covers N, les couvertures de chaque groupe de N albums consécutifs sont identiques
+    album_count = options['pages'] * options['albums_per_page']
+    per_album = options['gallery_images'] + 1
+    group = max(1, options['shared_covers'])
+    images = [[synthetic_image(options['seed'] + (n - n % group if k == 0 else n) * per_album + k,
+                               options['image_size'], options['image_format'])
+               for k in range(per_album)] for n in range(album_count)]
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    server.options = options
+    server.images = images
+    port_pipe.send(server.server_port)
+    server.serve_forever()
+
+def start_stand_in(options):
+    """Démarrer le faux site dans un processus dédié; retourne (processus, URL de la catégorie)"""
+    parent_pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.get_context('spawn').Process(target=serve_stand_in, args=(options, child_pipe), daemon=True)
+    process.start()
+    port = parent_pipe.recv()
+    return process, f"http://127.0.0.1:{port}/categories/1"
+
+def peak_rss_mb():
+    """Mémoire résidente de pointe du processus et de ses processus d'encodage terminés (Mo)"""
+    if resource is None:
+        return None
+    # ru_maxrss est en Ko sous Linux et en octets sous macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return round(own, 1), round(children, 1)
+
+def run_pipeline(base_url, options, work_dir):
+    """Une exécution complète du scraper sur le faux site; retourne les mesures"""
+    output_folder = os.path.join(work_dir, 'sortie')
+    images_dir = os.path.join(output_folder, 'images')
+    os.makedirs(images_dir)
+
+    scraper.CONFIG.update({
+        'workers': options['workers'],
+        'download_workers': options['download_workers'],
+        'encode_workers': options['encode_workers'],
+        'host_rate': options['host_rate'],
+        'host_burst': options['host_burst'],
+        'cache_dir': os.path.join(work_dir, 'cache') if options['cache'] else None,
+        'page_delay': 0,
+        'metrics_port': None,
+    })
+    scraper.reset_stage_stats()
+
+    output = sys.stdout if options['verbose'] else open(os.devnull, 'w', encoding='utf-8')
+    try:
+        with contextlib.redirect_stdout(output):
+            summary = scraper.run_scrape(base_url, output_folder, images_dir, options['webp_quality'])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    wall = summary['wall_seconds']
+    images = len([name for name in os.listdir(images_dir) if name.endswith('.webp')])
+    encode = scraper.STAGE_STATS['encodage']
+    return {
+        'wall_seconds': round(wall, 3),
+        'products': summary['products'],
+        'images': images,
+        'products_per_second': round(summary['products'] / wall, 2) if wall else 0.0,
+        'images_per_second': round(images / wall, 2) if wall else 0.0,
+        'encoded_source_mb_per_second': round(encode.bytes_in / (1024 * 1024) / wall, 2) if wall else 0.0,
+        'encoded_webp_mb_per_second': round(encode.bytes_out / (1024 * 1024) / wall, 2) if wall else 0.0,
+        'stages': {name: stats.as_dict(wall) for name, stats in scraper.STAGE_STATS.items() if stats.count},
+    }
+
+def run_isolated_stages(options):
+    """Étapes mesurées seules, sans réseau: analyse HTML et encodage WebP dans ce processus"""
+    results = {}
+
+    # Analyse lxml d'une page catégorie et d'une page album générées comme par le faux site
+    handler = StandInHandler.__new__(StandInHandler)
+    handler.server = type('FakeServer', (), {'options': options, 'server_port': 80})()
+    category_html = handler.category_page(1)
+    album_html = handler.album_page(1000)
+    iterations = 200
+    start = time.perf_counter()
+    for _ in range(iterations):
+        doc = scraper.lxml_html.fromstring(category_html, base_url='http://127.0.0.1/categories/1')
+        scraper.parse_pagination(doc)
+        scraper.parse_album_entries(doc, 'http://127.0.0.1/categories/1')
+        scraper.parse_product_page(scraper.lxml_html.fromstring(album_html), 'http://127.0.0.1/albums/1000')
+    seconds = time.perf_counter() - start
+    results['analyse_html'] = {'pages_per_second': round(2 * iterations / seconds, 1)}
+
+    # Encodage WebP d'images synthétiques (un seul cœur)
+    samples = [synthetic_image(options['seed'] + n, options['image_size'], options['image_format']) for n in range(4)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        encoded_bytes = 0
+        start = time.perf_counter()
+        for n, data in enumerate(samples):
+            size, _ = scraper.encode_webp_file(data, os.path.join(temp_dir, f"img-{n}.webp"), options['webp_quality'])
+            encoded_bytes += size
+        seconds = time.perf_counter() - start
+    source_mb = sum(len(data) for data in samples) / (1024 * 1024)
+    results['encodage_webp'] = {
+        'images_per_second': round(len(samples) / seconds, 2),
+        'source_mb_per_second': round(source_mb / seconds, 2),
+        'webp_mb_per_second': round(encoded_bytes / (1024 * 1024) / seconds, 2),
+    }
+    return results
+
+def print_report(runs, isolated, rss):
+    """Afficher la médiane des exécutions, le détail par étape et les étapes isolées"""
+    def median(key):
+        return statistics.median(run[key] for run in runs)
+
+    print(f"\n📊 PIPELINE COMPLET (médiane de {len(runs)} exécution(s)):")
+    print(f"   ⏱️  Durée: {median('wall_seconds'):.2f} s")
+    print(f"   📦 Produits: {median('products'):.0f} ({median('products_per_second'):.2f}/s)")
+    print(f"   🖼️  Images: {median('images'):.0f} ({median('images_per_second'):.2f}/s)")
+    print(f"   🎨 Encodé: {median('encoded_source_mb_per_second'):.2f} Mo source/s → {median('encoded_webp_mb_per_second'):.2f} Mo WebP/s")
+    if rss is not None:
+        print(f"   🧠 Mémoire de pointe: {rss[0]:.1f} Mo (scraper), {rss[1]:.1f} Mo (processus d'encodage)")
+
+    print(f"\n📈 PAR ÉTAPE (dernière exécution):")
+    for stage in runs[-1]['stages'].values():
+        print(f"   {stage['label']}: {stage['count']} éléments ({stage['errors']} erreurs), "
+              f"p50 {stage['p50_seconds'] * 1000:.0f} ms | p95 {stage['p95_seconds'] * 1000:.0f} ms, "
+              f"occupation {stage['utilization'] * 100:.0f}%")
+
+    print(f"\n🔬 ÉTAPES ISOLÉES:")
+    print(f"   Analyse HTML: {isolated['analyse_html']['pages_per_second']:.1f} pages/s")
+    encode = isolated['encodage_webp']
+    print(f"   Encodage WebP: {encode['images_per_second']:.2f} images/s, "
+          f"{encode['source_mb_per_second']:.2f} Mo source/s → {encode['webp_mb_per_second']:.2f} Mo WebP/s (1 cœur)")
+
+def parse_size(value):
+    match = re.fullmatch(r'(\d+)x(\d+)', value)
+    if not match:
+        raise argparse.ArgumentTypeError("format attendu: LARGEURxHAUTEUR (ex: 1600x1200)")
+    return int(match.group(1)), int(match.group(2))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai hors ligne du scraper Yupoo")
+    parser.add_argument('--pages', type=int, default=3, help="pages dans la catégorie")
+    parser.add_argument('--albums-per-page', type=int, default=8, help="albums par page")
+    parser.add_argument('--gallery-images', type=int, default=6, help="images de galerie par page album")
+    parser.add_argument('--image-size', type=parse_size, default=(1200, 1200), help="taille des couvertures (LARGEURxHAUTEUR)")
+    parser.add_argument('--image-format', choices=sorted(IMAGE_FORMATS), default='jpeg', help="format des couvertures")
+    parser.add_argument('--latency-ms', type=int, default=0, help="latence ajoutée à chaque réponse")
+    parser.add_argument('--jitter-ms', type=int, default=0, help="gigue maximale ajoutée à la latence")
+    parser.add_argument('--forbidden', type=int, default=0, help="%% d'images répondant 403")
+    parser.add_argument('--placeholder', type=int, default=0, help="%% d'images remplacées par un GIF placeholder")
+    parser.add_argument('--redirect', type=int, default=0, help="%% d'images redirigées vers res/703.gif")
+    parser.add_argument('--shared-covers', type=int, default=0, help="albums consécutifs partageant la même couverture (mesure du dédoublonnage)")
+    parser.add_argument('--runs', type=int, default=1, help="nombre d'exécutions (la médiane est affichée)")
+    parser.add_argument('--seed', type=int, default=1, help="graine des images synthétiques")
+    parser.add_argument('--webp-quality', type=int, default=80)
+    parser.add_argument('--workers', type=int, default=scraper.CONFIG['workers'])
+    parser.add_argument('--download-workers', type=int, default=scraper.CONFIG['download_workers'])
+    parser.add_argument('--encode-workers', type=int, default=scraper.CONFIG['encode_workers'])
+    parser.add_argument('--host-rate', type=float, default=1000.0, help="limite par hôte (élevée par défaut: mesure du code, pas de la politesse)")
+    parser.add_argument('--host-burst', type=int, default=scraper.CONFIG['host_burst'])
+    parser.add_argument('--cache', action='store_true', help="activer le cache d'images (vide au début de chaque exécution)")
+    parser.add_argument('--json', help="écrire aussi les résultats dans ce fichier JSON")
+    parser.add_argument('--verbose', action='store_true', help="afficher la sortie du scraper")
+    args = parser.parse_args(argv)
+
+    if args.forbidden + args.placeholder + args.redirect > 100:
+        parser.error("--forbidden + --placeholder + --redirect ne peut pas dépasser 100")
+    return vars(args)
+
+def main(argv=None):
+    options = parse_args(argv)
+    print(f"🧪 Faux site: {options['pages']} pages × {options['albums_per_page']} albums, "
+          f"images {options['image_size'][0]}x{options['image_size'][1]} {options['image_format']}, "
+          f"latence {options['latency_ms']}+{options['jitter_ms']} ms, "
+          f"pannes 403 {options['forbidden']}% / placeholder {options['placeholder']}% / 703.gif {options['redirect']}%")
+
+    server, base_url = start_stand_in(options)
+    runs = []
+    try:
+        for n in range(1, options['runs'] + 1):
+            work_dir = tempfile.mkdtemp(prefix='yupoo_bench_')
+            try:
+                result = run_pipeline(base_url, options, work_dir)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            runs.append(result)
+            print(f"   Exécution {n}: {result['wall_seconds']:.2f} s, {result['products_per_second']:.2f} produits/s, "
+                  f"{result['images_per_second']:.2f} images/s")
+        # Mesurée avant l'arrêt du faux site: seuls le scraper et ses processus d'encodage sont comptés
+        rss = peak_rss_mb()
+    finally:
+        server.terminate()
+        server.join()
+
+    isolated = run_isolated_stages(options)
+    print_report(runs, isolated, rss)
+
+    if options['json']:
+        report = {
+            'options': {key: value for key, value in options.items() if key not in ('json', 'verbose')},
+            'runs': runs,
+            'peak_rss_mb': {'scraper': rss[0], 'encodage': rss[1]} if rss is not None else None,
+            'isolated_stages': isolated,
+        }
+        with open(options['json'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Résultats: {options['json']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,166 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import pandas as pd
 import time
 from datetime import datetime
 import os
+import sys
+import json
+import csv
+import hashlib
+import shutil
+import sqlite3
+import http.server
 import re
-import requests
 import random
-from urllib.parse import urlparse
-from fake_useragent import UserAgent
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse, urljoin
 from PIL import Image
 import io
-from webdriver_manager.chrome import ChromeDriverManager
+import threading
+import queue
+import collections
+import contextlib
+import functools
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+# selenium, webdriver_manager, fake_useragent, openpyxl et pyarrow sont importés à la première utilisation:
+# `--help`, `--dry-run` et le moteur HTTP démarrent sans les charger
 
 
 # Configuration
 # CHROMEDRIVER_PATH = "/usr/local/bin/chromedriver-136"
 OUTPUT_FILE_BASE = "yupoo_data"
+JOURNAL_FILE = "scrape_journal.jsonl"
+ALBUM_INDEX_FILE = "album_index.json"
+ALBUM_ROWS_PATTERN = re.compile(r'^album_rows\.\d+\.jsonl$')
+DEDUP_INDEX_FILE = "dedup_index.jsonl"
+# Écart max (sur 255) entre deux miniatures couleur 4x4 pour confirmer un rapprochement perceptuel:
+# le dHash est calculé en niveaux de gris, deux coloris d'un même modèle ont souvent le même
+DEDUP_COLOUR_TOLERANCE = 24
+
+# Paramètres d'exécution
+CONFIG = {
+    'backend': 'http',      # "http" (requests + lxml, sans navigateur) ou "selenium"
+    'http_timeout': 20,     # Timeout des requêtes HTML en secondes
+    'workers': 4,           # Nombre de workers d'extraction en parallèle
+    'queue_size': 16,       # Taille max de la file entre découverte des liens et extraction
+    'download_workers': 8,  # Téléchargements d'images simultanés
+    'host_rate': 4.0,       # Requêtes d'images par seconde et par hôte
+    'host_burst': 4,        # Rafale maximale autorisée par hôte
+    'encode_workers': None, # Processus d'encodage WebP (None = un par cœur)
+    'gallery': False,       # Télécharger toutes les photos de chaque album (img-N-1, img-N-2...) en plus de la couverture
+    'gallery_max_images': 0,         # Photos max par album en mode galerie (0 = toutes)
+    'gallery_album_concurrency': 4,  # Téléchargements simultanés max pour un même album
+    'gallery_concurrency': 6,        # Téléchargements de galerie simultanés, tous albums confondus (le reste du pool sert aux couvertures)
+    'resume': False,        # Reprendre depuis le journal du dossier de sortie (--resume)
+    'incremental': False,   # Ne traiter que les albums nouveaux ou modifiés (--incremental)
+    'cache_dir': 'yupoo_cache',  # Cache d'images partagé entre exécutions (None = désactivé)
+    'cache_max_mb': 2048,   # Taille max du cache avant éviction LRU
+    'dedup': True,          # Réutiliser le fichier d'une couverture déjà enregistrée (même image) au lieu de la ré-encoder
+    'dedup_distance': None, # Bits d'écart max entre hashs perceptuels pour réutiliser une image quasi identique (None = hash exact seulement)
+    'blocklist_days': 7,    # Durée pendant laquelle une URL placeholder connue n'est plus demandée
+    'parquet_output': False,  # Écrire aussi les lignes typées dans l'entrepôt Parquet (nécessite pyarrow)
+    'parquet_dir': 'yupoo_parquet',  # Entrepôt Parquet partagé entre exécutions: categorie=<dossier>/date_execution=<AAAA-MM-JJ>/
+    'metrics_port': None,   # Port HTTP optionnel exposant /metrics au format texte Prometheus
+    'metrics_host': '127.0.0.1',  # Adresse d'écoute de /metrics ('0.0.0.0' = toutes les interfaces réseau)
+    'page_delay': 0,        # Pause en secondes entre deux pages catégorie (les pages sont préchargées)
+    'ready_timeout': 10,    # Attente max d'une page Selenium avant que les délais appris ne prennent le relais
+    'ready_timeout_min': 0.5,  # Délai appris minimum (s) d'une page Selenium, même si elle répond toujours très vite
+    'driver_recycle_pages': 200,  # Pages chargées par un navigateur avant de le remplacer (mémoire bornée)
+    'host_concurrency': 4,  # Requêtes HTML simultanées max par hôte (partagées entre catégories)
+    'batch_parallel': 2,    # Catégories scrapées en même temps en mode --batch
+    'page_prefetch': 3,     # Pages catégorie téléchargées à l'avance, en parallèle (moteur HTTP)
+    # Tailles supplémentaires produites au même décodage que l'image principale, dans images/<name>/
+    # ex. [{'name': 'thumb', 'size': 256, 'quality': 70}, {'name': 'medium', 'size': 800}, {'name': 'medium', 'size': 800, 'format': 'AVIF'}]
+    'derivatives': [],
+    'max_decode_pixels': 24_000_000,  # Au-delà, le JPEG est décodé directement à échelle réduite (draft); les autres formats sont réduits sous la limite dès leur décodage
+    'decode_memory_mb': 1024,         # Mémoire max réservée aux images en cours de décodage (tous processus d'encodage confondus)
+    'max_retries': 3,       # Nouvelles tentatives après timeout, erreur réseau, 5xx ou 429
+    'backoff_base': 1.0,    # Attente avant la première reprise (s), doublée ensuite, avec jitter
+    'backoff_max': 30.0,    # Attente max entre deux tentatives (s)
+    'retry_after_max': 300, # Retry-After plus long ignoré au-delà de cette durée (s)
+    'breaker_threshold': 3, # Limitations consécutives (403/429/placeholder) avant de mettre l'hôte en pause
+    'breaker_pause': 30.0,  # Première pause d'un hôte qui nous limite (s), doublée à chaque nouvelle coupure
+    'host_rate_min': 0.5,   # Débit d'images min par hôte après réductions AIMD
+    'host_rate_max': None,  # Débit d'images max par hôte atteint par augmentation AIMD (None = host_rate, jamais dépassé)
+    'host_concurrency_max': None,  # Requêtes HTML simultanées max par hôte atteintes par augmentation AIMD (None = host_concurrency)
+    'session_pool_size': 4, # Sessions HTTP préparées au démarrage, chacune avec son User-Agent et ses cookies
+    'session_connections': 8,  # Connexions keep-alive par hôte et par session (= requêtes simultanées max par session)
+    'cookie_sync_seconds': 60,  # Intervalle min entre deux copies des cookies Selenium d'un hôte vers les sessions HTTP
+    'lease_seconds': 120,   # Location d'une tâche par un worker (--worker), prolongée tant qu'il y travaille
+    'task_max_attempts': 3, # Tentatives max d'une tâche avant abandon (échec ou location expirée)
+    'queue_poll': 1.0,      # Intervalle d'interrogation de la file (coordinateur et workers) en secondes
+}
+
+# Colonnes des fichiers de sortie, dans l'ordre
+OUTPUT_COLUMNS = [
+    'Nom_Produit', 'Nom_Original', 'Lien_Article', 'URL_Image_Originale', 'URL_Image_Serveur',
+    'Image_Telecharge', 'Statut_Telechargement', 'Qualite_WebP', 'Numero_Page', 'Date_Scraping', 'URLs_Derives', 'URLs_Galerie'
+]
+INTEGER_COLUMNS = {'Qualite_WebP', 'Numero_Page'}
+
+# Codes de Statut_Telechargement dans l'entrepôt Parquet (colonne catégorielle)
+STATUS_CODES = ['reussi', 'doublon', 'echec', 'url_introuvable']
+SUCCESS_CODES = {'reussi', 'doublon'}
+
+# Valeurs de remplacement des sorties texte, enregistrées comme nulles dans l'entrepôt Parquet
+MISSING_VALUES = {"Non disponible", "Non téléchargée", "Image non trouvée", ""}
+
+# Sélecteurs CSS partagés par les moteurs HTTP et Selenium
+ALBUM_LINK_SELECTOR = "a.album__main"
+ALBUM_TITLE_SELECTOR = ".album__title"
+PAGINATION_SELECTORS = [".pagination__main", ".pagination", "[class*='pagination']"]
+PAGE_NUMBER_SELECTOR = ".pagination__number, .pagination-number, [class*='pagination'] a[href*='page=']"
+PAGE_LINK_SELECTOR = "a[href*='page=']"
+TITLE_SELECTOR = ".showalbumheader__gallerytitle"
+TITLE_FALLBACK_SELECTORS = ["span[data-name]", ".showalbumheader__title", "h1", "h2"]
+IMAGE_SELECTORS = [
+    ".showalbumheader__gallerycover img",
+    ".album-cover img",
+    ".gallery img:first-child",
+    "img[src*='yupoo.com']"
+]
+GALLERY_IMAGE_SELECTOR = ".showalbum__children img, .image__imagewrap img"
+GALLERY_FILE_PATTERN = re.compile(r'^img-\d+-\d+\.webp$')
 
-# Initialiser le générateur d'agent utilisateur
-ua = UserAgent()
+# Script Selenium: lien, titre et couverture de chaque album de la page en un seul aller-retour
+ALBUM_ENTRIES_SCRIPT = """
+    var titleSelector = arguments[1];
+    return Array.from(document.querySelectorAll(arguments[0])).map(function (item) {
+        var img = item.querySelector('img');
+        var title = item.querySelector(titleSelector);
+        return {
+            link: item.href,
+            title: item.getAttribute('title') || (title ? title.textContent.trim() : ''),
+            cover: img ? (img.getAttribute('data-origin-src') || img.getAttribute('data-src') || img.getAttribute('src') || '') : ''
+        };
+    });
+"""
+
+# Script Selenium: URL de chaque photo de la galerie d'un album (attributs de chargement différé compris)
+GALLERY_SCRIPT = """
+    return Array.from(document.querySelectorAll(arguments[0])).map(function (img) {
+        return img.getAttribute('data-origin-src') || img.getAttribute('data-src') || img.getAttribute('src') || '';
+    });
+"""
+
+# Script Selenium: vrai si chaque groupe de sélecteurs a au moins un élément présent dans la page
+READY_SCRIPT = """
+    return arguments[0].every(function (group) {
+        return group.some(function (selector) { return document.querySelector(selector) !== null; });
+    });
+"""
+
+# Cache des sélecteurs compilés pour lxml (compilés une seule fois en XPath)
+_compiled_selectors = {}
+
+@functools.lru_cache(maxsize=None)
+def user_agent_generator():
+    """Générateur d'agent utilisateur, créé une seule fois (UserAgent() peut télécharger ses données)"""
+    from fake_useragent import UserAgent
+    return UserAgent()
 
 def get_webp_quality():
     """Demander à l'utilisateur la qualité WebP désirée"""
@@ -57,79 +194,112 @@ def get_webp_quality():
         except ValueError:
             print("❌ Veuillez entrer un nombre valide")
 
-def clean_product_name(name):
-    """Nettoyer le nom du produit - MAX 2 MOTS SEULEMENT"""
-    if not name or name == "Name not found":
-        return "PRODUIT"
+class ProductNameNormalizer:
+    """Nettoyage des noms de produits - MAX 2 MOTS SEULEMENT
     
-    try:
+    Les expressions régulières sont compilées une seule fois et les titres déjà vus sont mémorisés
+    (les albums d'un fournisseur répètent souvent les mêmes noms). Le résultat est identique, caractère
+    pour caractère, à l'ancien clean_product_name.
+    """
+    
+    # Remplacements appliqués dans l'ordre (l'ordre compte: chaque étape voit le résultat de la précédente)
+    REMOVALS = [
         # Supprimer les numéros au début (comme "200")
-        name = re.sub(r'^\d+\s*', '', name)
-        
+        (r'^\d+\s*', 0),
         # Supprimer les caractères chinois/japonais/coréens
-        name = re.sub(r'[\u4e00-\u9fff\u3400-\u4dbf\u3040-\u309f\u30a0-\u30ff\uac00-\ud7af]+', '', name)
-        
+        (r'[\u4e00-\u9fff\u3400-\u4dbf\u3040-\u309f\u30a0-\u30ff\uac00-\ud7af]+', 0),
         # Supprimer les codes produit (comme HM6803-004, 03YHLS12)
-        name = re.sub(r'[A-Z]{2,}\d{4,}-\d{3,}', '', name)
-        name = re.sub(r'\d{2,}[A-Z]{2,}\d{2,}', '', name)
-        name = re.sub(r'货号[：:][A-Z0-9-]+', '', name)
-        
+        (r'[A-Z]{2,}\d{4,}-\d{3,}', 0),
+        (r'\d{2,}[A-Z]{2,}\d{2,}', 0),
+        (r'货号[：:][A-Z0-9-]+', 0),
         # Supprimer les tailles (comme 36-45, 36-46, Size 36 46)
-        name = re.sub(r'Size\s*\d{2}\s*-?\s*\d{2}', '', name, flags=re.IGNORECASE)
-        name = re.sub(r'\d{2}-\d{2}', '', name)
-        
-        # Supprimer les mots/codes inutiles
-        useless_words = ['货号', 'Size', 'Teal', 'Blue', '-', '_']
-        for word in useless_words:
-            name = re.sub(r'\b' + re.escape(word) + r'\b', '', name, flags=re.IGNORECASE)
-        
-        # Supprimer les caractères spéciaux et espaces multiples
-        name = re.sub(r'[^\w\s]', ' ', name)
-        name = re.sub(r'\s+', ' ', name)
-        name = name.strip()
-        
-        # Si le nom est vide après nettoyage, utiliser un nom par défaut
-        if not name:
+        (r'Size\s*\d{2}\s*-?\s*\d{2}', re.IGNORECASE),
+        (r'\d{2}-\d{2}', 0),
+    ]
+    
+    # Mots/codes inutiles, retirés un par un dans cet ordre
+    USELESS_WORDS = ['货号', 'Size', 'Teal', 'Blue', '-', '_']
+    
+    MAX_LENGTH = 20
+    
+    def __init__(self, cache_size=1 << 18):
+        self._removals = [re.compile(pattern, flags) for pattern, flags in self.REMOVALS]
+        self._removals += [re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE) for word in self.USELESS_WORDS]
+        self._special_chars = re.compile(r'[^\w\s]')
+        self._spaces = re.compile(r'\s+')
+        self._number_word = re.compile(r'^V?\d+$')
+        self._version_word = re.compile(r'^\d{3}V\d+$')
+        self.normalize = functools.lru_cache(maxsize=cache_size)(self._normalize)
+    
+    def __call__(self, name):
+        return self.normalize(name)
+    
+    def _normalize(self, name):
+        if not name or name == "Name not found":
             return "PRODUIT"
         
-        # GARDER SEULEMENT LES 2 PREMIERS MOTS SIGNIFICATIFS
-        words = [word.upper() for word in name.split() if len(word) > 1]
-        
-        # Filtrer les mots qui sont juste des numéros ou des codes
-        meaningful_words = []
-        for word in words:
-            # Ignorer les mots qui sont principalement des numéros
-            if not re.match(r'^\d+$', word) and not re.match(r'^V?\d+$', word):
-                meaningful_words.append(word)
-            # Mais garder les versions comme "700V2"
-            elif re.match(r'^\d{3}V\d+$', word):
-                meaningful_words.append(word)
-        
-        # Prendre les 2 premiers mots significatifs
-        if len(meaningful_words) >= 2:
-            result = f"{meaningful_words[0]}_{meaningful_words[1]}"
-        elif len(meaningful_words) == 1:
-            result = meaningful_words[0]
-        else:
-            result = "PRODUIT"
-        
-        # Limiter la longueur totale à 20 caractères
-        if len(result) > 20:
-            result = result[:20]
+        try:
+            for pattern in self._removals:
+                name = pattern.sub('', name)
+            
+            # Supprimer les caractères spéciaux et espaces multiples
+            name = self._spaces.sub(' ', self._special_chars.sub(' ', name)).strip()
+            
+            # Si le nom est vide après nettoyage, utiliser un nom par défaut
+            if not name:
+                return "PRODUIT"
+            
+            # GARDER SEULEMENT LES 2 PREMIERS MOTS SIGNIFICATIFS (pas les numéros, mais les versions comme "700V2")
+            meaningful_words = []
+            for word in name.split():
+                if len(word) <= 1:
+                    continue
+                word = word.upper()
+                if not self._number_word.match(word) or self._version_word.match(word):
+                    meaningful_words.append(word)
+                    if len(meaningful_words) == 2:
+                        break
+            
+            if not meaningful_words:
+                return "PRODUIT"
+            
+            # Limiter la longueur totale à 20 caractères
+            return "_".join(meaningful_words)[:self.MAX_LENGTH]
+            
+        except Exception as e:
+            print(f"   ⚠️ Erreur lors du nettoyage du nom: {str(e)}")
+            return "PRODUIT"
+    
+    def normalize_many(self, names):
+        """Nettoyer une série de titres (liste, itérable ou Series pandas) en une passe
         
-        return result
+        Chaque titre distinct n'est nettoyé qu'une fois. Une Series (tout objet avec .map) est retournée
+        comme Series avec le même index; sinon une liste dans le même ordre.
+        """
+        if hasattr(names, 'map') and hasattr(names, 'index'):
+            unique = {name: self.normalize(name) for name in dict.fromkeys(names)}
+            return names.map(unique.__getitem__)
         
-    except Exception as e:
-        print(f"   ⚠️ Erreur lors du nettoyage du nom: {str(e)}")
-        return "PRODUIT"
+        names = list(names)
+        unique = {name: self.normalize(name) for name in dict.fromkeys(names)}
+        return [unique[name] for name in names]
+
+product_names = ProductNameNormalizer()
 
-def create_session():
-    """Créer une session avec protection anti-bot"""
+def clean_product_name(name):
+    """Nettoyer le nom du produit - MAX 2 MOTS SEULEMENT (voir ProductNameNormalizer)"""
+    return product_names.normalize(name)
+
+def create_session(user_agent=None):
+    """Créer une session avec protection anti-bot
+    
+    user_agent: identité fixe de la session (un User-Agent aléatoire sinon).
+    """
     session = requests.Session()
     
     # En-têtes améliorés pour contourner la protection anti-bot
     session.headers.update({
-        'User-Agent': ua.random,
+        'User-Agent': user_agent or user_agent_generator().random,
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
         'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
         'Accept-Encoding': 'gzip, deflate, br',
@@ -144,293 +314,1816 @@ def create_session():
         'Referer': 'https://www.google.com/',
     })
     
+    # Une connexion keep-alive par requête simultanée possible sur cette session, pour chaque hôte
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=CONFIG['session_connections'])
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
     return session
 
-def is_placeholder_image(response, url):
-    """Vérifier si l'image téléchargée est un placeholder"""
+def distinct_user_agents(count):
+    """count User-Agents différents autant que possible (la liste de fake_useragent peut se répéter)"""
+    generator = user_agent_generator()
+    agents = []
+    for _ in range(count * 10):
+        agent = generator.random
+        if agent not in agents:
+            agents.append(agent)
+        if len(agents) == count:
+            return agents
+    return [agents[i % len(agents)] for i in range(count)]
+
+class SessionPool:
+    """Sessions HTTP créées au démarrage, chacune avec un User-Agent stable, ses cookies et son pool de connexions
     
-    # Vérifier la taille du contenu (les images placeholder sont généralement très petites)
-    content_length = len(response.content)
-    if content_length < 1000:  # Moins de 1KB probablement un placeholder
-        print(f"   ⚠️ Image trop petite ({content_length} octets) - probablement un placeholder")
-        return True
+    checkout() prête la session la moins occupée: une session sert jusqu'à CONFIG['session_connections']
+    requêtes simultanées, au-delà l'emprunteur attend qu'une place se libère. Les cookies obtenus par
+    les navigateurs Selenium sont recopiés dans toutes les sessions, pour que les requêtes HTTP
+    profitent des cookies anti-bot déjà obtenus au lieu de les redemander.
     
-    # Vérifier si redirigé vers des URLs placeholder connues
-    placeholder_indicators = [
-        'placeholder', 'default', 'error', 'not-found', '404', 
-        'forbidden', 'unavailable', 'res/703.gif', 'static/error'
-    ]
+    Le pool s'utilise aussi comme une session: get() emprunte une session le temps de la requête.
+    """
     
-    final_url = response.url.lower()
-    for indicator in placeholder_indicators:
-        if indicator in final_url:
-            print(f"   ⚠️ URL placeholder détectée: {indicator}")
-            return True
+    def __init__(self):
+        self._sessions = []
+        self._leases = []
+        self._next = 0
+        self._cookie_syncs = {}
+        self._condition = threading.Condition(threading.RLock())
+        self.user_agents = []
+        self.checkouts = 0
+        self.waits = 0
+        self.cookies_imported = 0
+    
+    def open(self, size=None):
+        """Créer les sessions (une seule fois, jusqu'à close())"""
+        with self._condition:
+            if self._sessions:
+                return
+            agents = distinct_user_agents(max(1, size or CONFIG['session_pool_size']))
+            self._sessions = [create_session(agent) for agent in agents]
+            self.user_agents = agents
+            self._leases = [0] * len(self._sessions)
+            self._next = 0
+        print(f"🛡️ {len(agents)} sessions HTTP prêtes ({len(set(agents))} User-Agents distincts)")
+    
+    def _take(self):
+        with self._condition:
+            if not self._sessions:
+                self.open()
+            if min(self._leases) >= CONFIG['session_connections']:
+                self.waits += 1
+            while min(self._leases) >= CONFIG['session_connections']:
+                self._condition.wait()
+            # La moins occupée, en partant de la suivante de la dernière prêtée (répartition à égalité)
+            count = len(self._sessions)
+            order = [(self._next + i) % count for i in range(count)]
+            index = min(order, key=lambda i: self._leases[i])
+            self._next = (index + 1) % count
+            self._leases[index] += 1
+            self.checkouts += 1
+            return index, self._sessions[index]
+    
+    def _give_back(self, index, session):
+        with self._condition:
+            # Le pool a pu être fermé puis rouvert pendant la requête: ne rendre qu'à la bonne session
+            if index < len(self._sessions) and self._sessions[index] is session:
+                self._leases[index] -= 1
+                self._condition.notify()
+    
+    @contextlib.contextmanager
+    def checkout(self):
+        """Emprunter une session pour une série de requêtes (ex: en-têtes puis corps d'une image)"""
+        index, session = self._take()
+        try:
+            yield session
+        finally:
+            self._give_back(index, session)
+    
+    def get(self, url, **kwargs):
+        """requests.get sur la session la moins occupée"""
+        with self.checkout() as session:
+            return session.get(url, **kwargs)
+    
+    def import_cookies(self, driver, url):
+        """Copier les cookies du navigateur dans toutes les sessions (au plus une fois par intervalle et par hôte)"""
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        with self._condition:
+            last = self._cookie_syncs.get(host)
+            if not self._sessions or (last is not None and now - last < CONFIG['cookie_sync_seconds']):
+                return
+            self._cookie_syncs[host] = now
+            sessions = list(self._sessions)
+        try:
+            cookies = driver.get_cookies()
+        except Exception:
+            return
+        for session in sessions:
+            for cookie in cookies:
+                session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''),
+                                    path=cookie.get('path', '/'), secure=cookie.get('secure', False))
+        with self._condition:
+            self.cookies_imported += len(cookies)
+    
+    def as_dict(self):
+        with self._condition:
+            return {
+                'user_agents': list(self.user_agents),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'cookies_imported': self.cookies_imported,
+            }
+    
+    def close(self):
+        """Fermer les connexions de toutes les sessions"""
+        with self._condition:
+            sessions, self._sessions, self._leases = self._sessions, [], []
+            self._cookie_syncs = {}
+            self._condition.notify_all()
+        for session in sessions:
+            session.close()
+
+session_pool = SessionPool()
+
+# Les images placeholder sont généralement très petites (moins de 1KB)
+PLACEHOLDER_MAX_BYTES = 1000
+
+# URLs vers lesquelles Yupoo redirige les images bloquées ou introuvables
+PLACEHOLDER_URL_INDICATORS = [
+    'placeholder', 'default', 'error', 'not-found', '404', 
+    'forbidden', 'unavailable', 'res/703.gif', 'static/error'
+]
+
+def placeholder_reason(final_url, content_type, content_length):
+    """Raison de considérer une réponse image comme placeholder, ou None si elle semble valide
+    
+    Ne dépend que de l'URL finale et des en-têtes: appelée avant de lire le corps.
+    content_length: taille annoncée (ou lue), None si inconnue.
+    """
+    # Vérifier la taille du contenu
+    if content_length is not None and content_length < PLACEHOLDER_MAX_BYTES:
+        return f"Image trop petite ({content_length} octets) - probablement un placeholder"
+    
+    # Vérifier si redirigé vers des URLs placeholder connues (chemin seulement: un hôte ou un port comme :40412
+    # ne doit pas faire passer une image pour un placeholder)
+    path = urlparse(final_url).path.lower()
+    for indicator in PLACEHOLDER_URL_INDICATORS:
+        if indicator in path:
+            return f"URL placeholder détectée: {indicator}"
     
     # Vérifier le type de contenu
-    content_type = response.headers.get('Content-Type', '').lower()
+    content_type = (content_type or '').lower()
     if content_type and not content_type.startswith('image/'):
-        print(f"   ⚠️ Type de contenu invalide: {content_type}")
-        return True
+        return f"Type de contenu invalide: {content_type}"
     
-    return False
+    return None
 
-def convert_to_webp(image_data, quality=80):
-    """Convertir les données d'image en format WebP"""
-    try:
-        print(f"   🔄 Conversion WebP (qualité {quality}): {len(image_data)} octets d'entrée")
-        
-        # Ouvrir l'image depuis les données binaires
-        img = Image.open(io.BytesIO(image_data))
-        print(f"   📐 Dimensions originales: {img.size}, Mode: {img.mode}")
-        
-        # Si l'image a un canal alpha, la convertir en RGB
-        if img.mode in ('RGBA', 'LA', 'P'):
-            print(f"   🔄 Conversion de {img.mode} vers RGB")
-            img = img.convert('RGB')
-        
-        # Sauvegarder en WebP dans un buffer
-        webp_buffer = io.BytesIO()
-        img.save(webp_buffer, format='WebP', quality=quality)
-        webp_buffer.seek(0)
-        
-        webp_data = webp_buffer.getvalue()
-        print(f"   ✅ Conversion réussie (Q{quality}): {len(webp_data)} octets de sortie")
-        
-        return webp_data
-    except Exception as e:
-        print(f"   ❌ ERREUR DE CONVERSION WebP: {str(e)}")
+def declared_length(response):
+    """Content-Length annoncé (None s'il est absent ou si le corps est compressé)"""
+    length = response.headers.get('Content-Length', '')
+    if not length.isdigit() or response.headers.get('Content-Encoding', 'identity') != 'identity':
         return None
+    return int(length)
+
+def read_body(response, chunk_size=64 * 1024):
+    """Lire le corps d'une réponse stream=True par morceaux dans un seul tampon"""
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size):
+        body += chunk
+    return body
+
+# Bornes des histogrammes de latence (secondes): de 1 ms à ~131 s, par puissances de 2
+LATENCY_BUCKETS = [0.001 * (2 ** i) for i in range(18)]
 
-def download_image(url, output_dir, image_counter, session, folder_name, webp_quality):
-    """Télécharger une image avec protection anti-bot et conversion WebP"""
+class StageStats:
+    """Compteurs et histogramme de latence d'une étape du pipeline (thread-safe, mémoire constante)"""
     
-    try:
-        # Nettoyer et valider l'URL
-        url = str(url).strip()
-        if not url.startswith(('http://', 'https://')):
-            print(f"   ❌ ERREUR: Format d'URL invalide - {url}")
-            return False, None, None
-        
-        # Ajouter un délai aléatoire pour éviter la limitation de débit
-        time.sleep(random.uniform(0.5, 2.0))
-        
-        # Mettre à jour le referrer pour chaque requête
-        if 'yupoo.com' in url:
-            domain = urlparse(url).netloc
-            session.headers.update({'Referer': f'https://{domain}/'})
-        
-        print(f"   🔄 Téléchargement: {url[:60]}...")
-        
-        # Première tentative
-        response = session.get(url, timeout=30, allow_redirects=True)
-        
-        if response.status_code != 200:
-            print(f"   ❌ ERREUR: Code de statut HTTP {response.status_code}")
-            return False, None, None
-        
-        if is_placeholder_image(response, url):
-            print(f"   ❌ ERREUR: Image placeholder détectée")
-            return False, None, None
+    def __init__(self, label, workers=1):
+        self.label = label
+        self.workers = workers
+        self.count = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # dernier = au-delà de la borne max
+        self._lock = threading.Lock()
+    
+    def record(self, seconds, bytes_in=0, bytes_out=0, error=False):
+        """Enregistrer un élément traité par l'étape"""
+        bucket = len(LATENCY_BUCKETS)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                bucket = i
+                break
         
-        # Convertir en WebP avec la qualité choisie
-        print(f"   🔄 Conversion en WebP (qualité {webp_quality})...")
-        webp_data = convert_to_webp(response.content, webp_quality)
+        with self._lock:
+            self.count += 1
+            self.busy_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.buckets[bucket] += 1
+            if error:
+                self.errors += 1
+    
+    def percentile(self, q):
+        """Latence estimée au quantile q (0-1), interpolée dans le seau de l'histogramme"""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = q * self.count
+            cumulative = 0
+            for i, bucket_count in enumerate(self.buckets):
+                if bucket_count and cumulative + bucket_count >= target:
+                    lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                    upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max_seconds
+                    return min(lower + (upper - lower) * (target - cumulative) / bucket_count, self.max_seconds)
+                cumulative += bucket_count
+            return self.max_seconds
+    
+    def utilization(self, wall_seconds):
+        """Part du temps où les workers de l'étape étaient occupés (1.0 = saturée)"""
+        if wall_seconds <= 0:
+            return 0.0
+        return self.busy_seconds / (wall_seconds * max(1, self.workers))
+    
+    def as_dict(self, wall_seconds):
+        return {
+            'label': self.label,
+            'count': self.count,
+            'errors': self.errors,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'busy_seconds': round(self.busy_seconds, 4),
+            'workers': self.workers,
+            'utilization': round(self.utilization(wall_seconds), 4),
+            'p50_seconds': round(self.percentile(0.50), 4),
+            'p95_seconds': round(self.percentile(0.95), 4),
+            'p99_seconds': round(self.percentile(0.99), 4),
+            'max_seconds': round(self.max_seconds, 4),
+        }
+
+# Compteurs par étape du chemin critique, pour savoir où part le temps de chaque exécution
+STAGE_STATS = {
+    'chargement_page': StageStats("Chargement des pages"),
+    'pagination': StageStats("Détection de la pagination"),
+    'recherche_elements': StageStats("Recherche des éléments"),
+    'reseau': StageStats("Réseau (images)"),
+    'placeholder': StageStats("Vérification placeholder"),
+    'encodage': StageStats("Encodage WebP"),
+    'ecriture_disque': StageStats("Écriture disque (sorties, journal, cache)"),
+    'attente_selenium': StageStats("Attente de chargement (Selenium)"),
+    'dedoublonnage': StageStats("Dédoublonnage (hash exact, perceptuel en option)"),
+}
+
+def reset_stage_stats():
+    """Remettre à zéro les compteurs de toutes les étapes (entre deux exécutions d'un même processus)"""
+    for name, stats in list(STAGE_STATS.items()):
+        STAGE_STATS[name] = StageStats(stats.label, stats.workers)
+
+class StageTimer:
+    """Mesurer un bloc de code pour une étape: `with StageTimer('reseau') as timer: ...`"""
+    
+    def __init__(self, stage):
+        self.stage = stage
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.error = False
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        STAGE_STATS[self.stage].record(time.perf_counter() - self._start, self.bytes_in, self.bytes_out,
+                                       error=self.error or exc_type is not None)
+        return False
+
+def print_stage_stats(wall_seconds):
+    """Afficher le débit et les latences de chaque étape, et l'étape la plus chargée"""
+    print(f"\n📈 DÉBIT PAR ÉTAPE:")
+    for stats in STAGE_STATS.values():
+        if not stats.count:
+            continue
+        mb_in = stats.bytes_in / (1024 * 1024)
+        rate = stats.count / wall_seconds if wall_seconds > 0 else 0
+        print(f"   {stats.label}: {stats.count} éléments ({stats.errors} erreurs), {mb_in:.1f} Mo, "
+              f"{rate:.2f}/s, occupation {stats.utilization(wall_seconds) * 100:.0f}% sur {stats.workers} workers")
+        print(f"      latence p50 {stats.percentile(0.50) * 1000:.0f} ms | p95 {stats.percentile(0.95) * 1000:.0f} ms"
+              f" | p99 {stats.percentile(0.99) * 1000:.0f} ms")
+    
+    busiest = max(STAGE_STATS.values(), key=lambda stats: stats.utilization(wall_seconds))
+    if busiest.count:
+        print(f"   🐢 Goulot d'étranglement probable: {busiest.label}")
+    
+    if readiness.waits:
+        print(f"   ⏳ Attentes Selenium: {readiness.waits} ({readiness.timeouts} délais expirés), "
+              f"{readiness.saved_seconds:.1f} s gagnées par rapport aux pauses fixes")
+    totals = host_health.totals()
+    if totals['retries'] or totals['throttled']:
+        print(f"   🔁 Reprises: {totals['retries']} | limitations (403/429/placeholder): {totals['throttled']} | "
+              f"hôtes mis en pause: {totals['breaker_trips']}")
+    if session_pool.waits or session_pool.cookies_imported:
+        print(f"   🍪 Sessions HTTP: {session_pool.checkouts} emprunts ({session_pool.waits} attentes), "
+              f"{session_pool.cookies_imported} cookies Selenium partagés")
+    if decode_budget.waits:
+        print(f"   🧠 Décodages mis en attente (limite {CONFIG['decode_memory_mb']} Mo): {decode_budget.waits}, "
+              f"pic réservé {decode_budget.peak / (1024 * 1024):.0f} Mo")
+
+def write_metrics_report(output_folder, base_filename, wall_seconds, extra=None):
+    """Écrire le rapport de métriques JSON à côté du CSV de sortie"""
+    report = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'wall_seconds': round(wall_seconds, 3),
+        'stages': {name: stats.as_dict(wall_seconds) for name, stats in STAGE_STATS.items()},
+    }
+    if extra:
+        report.update(extra)
+    
+    report_path = os.path.join(output_folder, f"{base_filename}_metrics.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📊 Rapport de métriques: {report_path}")
+    return report_path
+
+def prometheus_metrics_text():
+    """Métriques des étapes au format d'exposition texte Prometheus"""
+    lines = [
+        "# HELP yupoo_stage_seconds Latence des étapes du scraper",
+        "# TYPE yupoo_stage_seconds histogram",
+    ]
+    for name, stats in STAGE_STATS.items():
+        with stats._lock:
+            buckets = list(stats.buckets)
+            count, busy = stats.count, stats.busy_seconds
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+            cumulative += bucket_count
+            lines.append(f'yupoo_stage_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+        lines.append(f'yupoo_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+        lines.append(f'yupoo_stage_seconds_sum{{stage="{name}"}} {busy:.6f}')
+        lines.append(f'yupoo_stage_seconds_count{{stage="{name}"}} {count}')
+    
+    for metric, attribute, help_text in [
+        ('yupoo_stage_errors_total', 'errors', "Erreurs par étape"),
+        ('yupoo_stage_bytes_in_total', 'bytes_in', "Octets entrants par étape"),
+        ('yupoo_stage_bytes_out_total', 'bytes_out', "Octets sortants par étape"),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, stats in STAGE_STATS.items():
+            lines.append(f'{metric}{{stage="{name}"}} {getattr(stats, attribute)}')
+    return "\n".join(lines) + "\n"
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Point d'accès /metrics pour Prometheus"""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_metrics_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host=None):
+    """Démarrer le serveur /metrics en arrière-plan; retourne le serveur (à fermer avec shutdown())
+    
+    host: adresse d'écoute (CONFIG['metrics_host'] par défaut, la machine locale seulement).
+    """
+    host = host or CONFIG['metrics_host']
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metriques", daemon=True).start()
+    print(f"📡 Métriques Prometheus: http://{host}:{server.server_port}/metrics")
+    return server
+
+def aimd_ceiling(start, ceiling):
+    """Plafond d'une augmentation AIMD: ceiling s'il est fixé (jamais sous la valeur de départ), sinon start"""
+    return start if ceiling is None else max(ceiling, start)
+
+class HostHealth:
+    """État partagé de chaque hôte: disjoncteur et débit / concurrence AIMD
+    
+    Succès: augmentation additive du débit d'images (TokenBucket) et de la concurrence HTML (HostSlots)
+    jusqu'à CONFIG['host_rate_max'] / CONFIG['host_concurrency_max'], par défaut les valeurs configurées
+    (host_rate / host_concurrency restent alors des plafonds). Limitation (403, 429, redirection
+    placeholder): division par deux; après CONFIG['breaker_threshold'] limitations consécutives, l'hôte
+    est mis en pause (pause doublée à chaque nouvelle coupure). Un Retry-After met aussi l'hôte en pause.
+    """
+    
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+    
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {
+                'rate': CONFIG['host_rate'], 'concurrency': float(CONFIG['host_concurrency']),
+                'open_until': 0.0, 'consecutive': 0, 'trips': 0,
+                'retries': 0, 'throttled': 0, 'breaker_trips': 0, 'buckets': [],
+            }
+        return state
+    
+    def attach(self, host, bucket):
+        """Faire suivre au limiteur de débit de l'hôte les ajustements AIMD"""
+        with self._lock:
+            state = self._state(host)
+            state['buckets'].append(bucket)
+            bucket.rate = state['rate']
+    
+    def concurrency(self, host):
+        """Requêtes HTML simultanées actuellement permises pour l'hôte"""
+        with self._lock:
+            return max(1, int(self._state(host)['concurrency']))
+    
+    def wait(self, host):
+        """Bloquer tant que le disjoncteur de l'hôte est ouvert"""
+        while True:
+            with self._lock:
+                delay = self._state(host)['open_until'] - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(min(delay, 1.0))
+    
+    def success(self, host):
+        with self._lock:
+            state = self._state(host)
+            state['consecutive'] = 0
+            state['trips'] = 0
+            state['rate'] = min(aimd_ceiling(CONFIG['host_rate'], CONFIG['host_rate_max']), state['rate'] + 0.25 / max(state['rate'], 1.0))
+            state['concurrency'] = min(aimd_ceiling(CONFIG['host_concurrency'], CONFIG['host_concurrency_max']), state['concurrency'] + 1 / state['concurrency'])
+            for bucket in state['buckets']:
+                bucket.rate = state['rate']
+    
+    def throttled(self, host, retry_after=None):
+        """L'hôte nous limite: réduire débit et concurrence, et ouvrir le disjoncteur si nécessaire"""
+        with self._lock:
+            state = self._state(host)
+            state['throttled'] += 1
+            state['consecutive'] += 1
+            state['rate'] = max(CONFIG['host_rate_min'], state['rate'] / 2)
+            state['concurrency'] = max(1.0, state['concurrency'] / 2)
+            for bucket in state['buckets']:
+                bucket.rate = state['rate']
+            
+            pause = retry_after or 0
+            tripped = state['consecutive'] >= CONFIG['breaker_threshold']
+            if tripped:
+                pause = max(pause, CONFIG['breaker_pause'] * 2 ** state['trips'])
+                state['trips'] += 1
+                state['breaker_trips'] += 1
+                # Semi-ouvert: une seule nouvelle limitation après la pause suffit à recouper
+                state['consecutive'] = CONFIG['breaker_threshold'] - 1
+            if pause:
+                state['open_until'] = max(state['open_until'], time.monotonic() + pause)
+        if tripped:
+            print(f"   ⛔ Hôte {host} en pause {pause:.0f} s (limitations répétées, débit réduit à {state['rate']:.1f}/s)")
+    
+    def is_throttled(self, host):
+        """Vrai si l'hôte nous limite en ce moment (limitations sans succès depuis, ou disjoncteur ouvert)"""
+        with self._lock:
+            state = self._state(host)
+            return state['consecutive'] > 0 or state['open_until'] > time.monotonic()
+    
+    def retried(self, host):
+        with self._lock:
+            self._state(host)['retries'] += 1
+    
+    def totals(self):
+        """Reprises, limitations et coupures, tous hôtes confondus"""
+        with self._lock:
+            return {key: sum(state[key] for state in self._hosts.values()) for key in ('retries', 'throttled', 'breaker_trips')}
+    
+    def as_dict(self):
+        with self._lock:
+            return {host: {'retries': state['retries'], 'throttled': state['throttled'], 'breaker_trips': state['breaker_trips'],
+                           'rate': round(state['rate'], 2), 'concurrency': int(state['concurrency'])}
+                    for host, state in self._hosts.items()}
+
+host_health = HostHealth()
+
+# Réponses indiquant que l'hôte nous limite (ralentir), et celles qui valent une nouvelle tentative:
+# un 403 vise souvent une seule image (pas de reprise), mais plusieurs à la suite coupent l'hôte
+THROTTLE_STATUSES = {403, 429}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def retry_after_seconds(response):
+    """Délai demandé par l'en-tête Retry-After (secondes ou date HTTP), plafonné à CONFIG['retry_after_max']"""
+    value = response.headers.get('Retry-After', '').strip()
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            from email.utils import parsedate_to_datetime
+            seconds = (parsedate_to_datetime(value) - datetime.now(parsedate_to_datetime(value).tzinfo)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), CONFIG['retry_after_max'])
+
+def backoff_delay(attempt, retry_after=None):
+    """Attente avant la tentative n° attempt (1 = première reprise): exponentielle avec jitter, au moins Retry-After"""
+    ceiling = min(CONFIG['backoff_max'], CONFIG['backoff_base'] * 2 ** (attempt - 1))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    return max(delay, retry_after or 0)
+
+def resilient_get(session, url, rate_limiter=None, **kwargs):
+    """GET avec reprises (timeouts, erreurs réseau, 5xx, 429) et suivi de la santé de l'hôte
+    
+    Retourne la dernière réponse (à fermer par l'appelant, éventuellement en erreur); l'erreur réseau
+    de la dernière tentative est propagée.
+    """
+    host = urlparse(url).netloc
+    retry_after = None
+    for attempt in range(CONFIG['max_retries'] + 1):
+        if attempt:
+            host_health.retried(host)
+            delay = backoff_delay(attempt, retry_after)
+            print(f"   🔁 Nouvelle tentative {attempt}/{CONFIG['max_retries']} dans {delay:.1f} s: {url[:60]}")
+            time.sleep(delay)
+        host_health.wait(host)
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         
-        if webp_data is None:
-            print(f"   ❌ ERREUR: Échec de la conversion WebP")
-            return False, None, None
+        retry_after = None
+        try:
+            response = session.get(url, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if attempt == CONFIG['max_retries']:
+                raise
+            print(f"   ⚠️ {type(e).__name__} pour {url[:60]}")
+            continue
         
-        # Générer le nom de fichier SIMPLE : img-1.webp, img-2.webp, etc.
-        filename = f"img-{image_counter}.webp"
-        file_path = os.path.join(output_dir, filename)
+        retry_after = retry_after_seconds(response)
+        if response.status_code in THROTTLE_STATUSES or retry_after:
+            host_health.throttled(host, retry_after)
+        elif response.status_code not in RETRY_STATUSES:
+            host_health.success(host)
         
-        # Sauvegarder le fichier WebP
-        try:
-            with open(file_path, 'wb') as f:
-                f.write(webp_data)
+        if response.status_code not in RETRY_STATUSES or attempt == CONFIG['max_retries']:
+            return response
+        response.close()
+
+def fetch_image(url, session, rate_limiter=None, cache=None, webp_quality=None, conditional=True):
+    """Télécharger les octets bruts d'une image (sans conversion)
+    
+    Retourne (octets, hash source) ou None en cas d'échec. Avec un cache, la requête est conditionnelle
+    (ETag / Last-Modified): une réponse 304 retourne (None, hash source) sans transférer le corps.
+    """
+    # Nettoyer et valider l'URL
+    url = str(url).strip()
+    if not url.startswith(('http://', 'https://')):
+        print(f"   ❌ ERREUR: Format d'URL invalide - {url}")
+        return None
+    
+    # Referrer propre à la requête (la session peut être partagée entre threads)
+    headers = {}
+    if 'yupoo.com' in url:
+        domain = urlparse(url).netloc
+        headers['Referer'] = f'https://{domain}/'
+    
+    # URL déjà connue comme placeholder (exécution précédente): ne pas la redemander
+    if cache is not None and cache.is_blocked(url):
+        print(f"   ⛔ URL placeholder connue - ignorée: {url[:60]}")
+        return None
+    
+    # Revalidation conditionnelle si l'image est déjà en cache
+    if cache is not None and conditional:
+        headers.update(cache.conditional_headers(url, webp_quality))
+    
+    print(f"   🔄 Téléchargement: {url[:60]}...")
+    
+    # Temps réseau: de l'envoi de la requête à la fin de la lecture du corps
+    start = time.perf_counter()
+    try:
+        # stream=True: seuls le statut et les en-têtes sont lus, le corps attend la vérification placeholder
+        # (limite de débit de l'hôte, reprises et disjoncteur dans resilient_get)
+        response = resilient_get(session, url, rate_limiter, timeout=30, allow_redirects=True, headers=headers, stream=True)
+        with response:
+            if response.status_code == 304 and cache is not None:
+                print(f"   ♻️ Image inchangée (304) - version en cache")
+                STAGE_STATS['reseau'].record(time.perf_counter() - start)
+                cache.revalidated += 1
+                return None, cache.source_hash_for(url)
             
-            # VÉRIFICATION CRITIQUE: S'assurer que le fichier existe réellement
-            if not os.path.exists(file_path):
-                print(f"   ❌ ERREUR CRITIQUE: Fichier non créé - {file_path}")
-                return False, None, None
+            if response.status_code != 200:
+                print(f"   ❌ ERREUR: Code de statut HTTP {response.status_code}")
+                STAGE_STATS['reseau'].record(time.perf_counter() - start, error=True)
+                return None
             
-            # Vérifier la taille du fichier sauvegardé
-            file_size = os.path.getsize(file_path)
-            if file_size == 0:
-                print(f"   ❌ ERREUR CRITIQUE: Fichier vide - {file_path}")
-                os.remove(file_path)  # Supprimer le fichier vide
-                return False, None, None
+            # Redirection vers res/703.gif, page HTML d'erreur, corps minuscule: rejet sans télécharger le corps
+            with StageTimer('placeholder') as timer:
+                reason = placeholder_reason(response.url, response.headers.get('Content-Type'), declared_length(response))
+                timer.error = reason is not None
+            if reason is None:
+                image_data = read_body(response)
+                STAGE_STATS['reseau'].record(time.perf_counter() - start, bytes_in=len(image_data))
+                reason = placeholder_reason(response.url, None, len(image_data))
+            else:
+                STAGE_STATS['reseau'].record(time.perf_counter() - start)
             
-            print(f"   ✅ Fichier sauvegardé: {filename} ({file_size} octets, Q{webp_quality})")
+            if reason is not None:
+                print(f"   ⚠️ {reason}")
+                print(f"   ❌ ERREUR: Image placeholder détectée")
+                # Redirection vers un placeholder: l'hôte nous limite probablement, l'image elle-même est sans doute
+                # valable; seule une URL qui sert directement un placeholder, hors limitation, est mise en liste noire
+                host = urlparse(url).netloc
+                if response.history:
+                    host_health.throttled(host)
+                elif cache is not None and not host_health.is_throttled(host):
+                    cache.block(url, reason)
+                return None
             
-        except Exception as save_error:
-            print(f"   ❌ ERREUR DE SAUVEGARDE: {str(save_error)}")
-            return False, None, None
-        
-        # Générer l'URL du serveur
-        server_url = f"http://app.madeinchina-ebook.com/images/{folder_name}/{filename}"
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
         
-        print(f"   ✅ Image téléchargée: {filename}")
-        print(f"   🔗 URL serveur: {server_url}")
-        return True, filename, server_url
+        source_hash = None
+        if cache is not None:
+            source_hash = cache.store_source(url, image_data, etag, last_modified)
+        return image_data, source_hash
         
     except requests.exceptions.Timeout:
         print(f"   ❌ ERREUR: Timeout lors du téléchargement de {url}")
-        return False, None, None
     except requests.exceptions.ConnectionError:
         print(f"   ❌ ERREUR: Problème de connexion pour {url}")
-        return False, None, None
     except Exception as e:
         print(f"   ❌ ERREUR DE TÉLÉCHARGEMENT pour {url}: {str(e)}")
-        return False, None, None
+    
+    STAGE_STATS['reseau'].record(time.perf_counter() - start, error=True)
+    return None
 
-# Setup Chrome options for headless mode
-def get_driver():
-    options = Options()
-    # options.binary_location = "/Applications/Brave Browser.app/Contents/MacOS/Brave Browser"
+def fetch_source(url, session, rate_limiter, cache, file_path, webp_quality):
+    """Obtenir l'image source en passant par le cache si possible
     
-    # Activer le mode headless pour que vous puissiez utiliser votre ordinateur normalement
-    options.add_argument("--headless")
+    Retourne (octets à encoder, hash source), (None, hash source) si le WebP a été restauré
+    depuis le cache directement dans file_path, ou None en cas d'échec.
+    """
+    fetched = fetch_image(url, session, rate_limiter, cache, webp_quality)
+    if fetched is None:
+        return None
     
-    # Optimisations de performance
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--disable-images")  # Ne pas charger les images pour un scraping plus rapide
+    image_data, source_hash = fetched
+    if cache is None:
+        return image_data, None
     
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+    # Même image source déjà encodée à cette qualité (même URL ou autre album): aucun encodage
+    if cache.restore_webp(source_hash, webp_quality, file_path):
+        print(f"   ♻️ WebP Q{webp_quality} réutilisé depuis le cache: {os.path.basename(file_path)}")
+        return None, source_hash
+    
+    if image_data is None:
+        image_data = cache.read_source(source_hash)
+        if image_data is None:
+            # Source évincée du cache entre-temps: téléchargement complet
+            fetched = fetch_image(url, session, rate_limiter, cache, webp_quality, conditional=False)
+            if fetched is None:
+                return None
+            image_data, source_hash = fetched
+    
+    return image_data, source_hash
 
-def detect_pagination(driver, base_url):
-    """Détecter si la page a une pagination et retourner le nombre total de pages"""
-    print("🔍 Vérification de la pagination...")
+class ImageCache:
+    """Cache disque adressé par contenu: sources par hash SHA-256, WebP par (hash, qualité)
     
-    try:
-        driver.get(base_url)
-        time.sleep(3)
-        
-        # Chercher les éléments de pagination
-        pagination_selectors = [
-            ".pagination__main",
-            ".pagination",
-            "[class*='pagination']"
-        ]
+    L'index SQLite garde l'ETag / Last-Modified de chaque URL et la date de dernière utilisation
+    de chaque fichier pour l'éviction LRU au-delà de la taille maximale.
+    """
+    
+    def __init__(self, cache_dir, max_mb):
+        self._dir = cache_dir
+        self._max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self.revalidated = 0
+        self.webp_hits = 0
+        self.evicted = 0
+        self.blocked_skips = 0
         
-        pagination_found = False
-        total_pages = 1
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, source_hash TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, size INTEGER, last_used REAL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS blocked (url TEXT PRIMARY KEY, reason TEXT, blocked_at REAL)")
+            self._db.commit()
+            self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    
+    def _path(self, key):
+        kind, name = key.split('/', 1)
+        return os.path.join(self._dir, kind, name[:2], name)
+    
+    def _has(self, key):
+        """Vrai si le fichier est indexé et présent; met à jour sa date d'utilisation (LRU)"""
+        with self._lock:
+            row = self._db.execute("SELECT size FROM blobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            if not os.path.exists(self._path(key)):
+                self._db.execute("DELETE FROM blobs WHERE key = ?", (key,))
+                self._total -= row[0]
+                self._db.commit()
+                return False
+            self._db.execute("UPDATE blobs SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return True
+    
+    def _store(self, key, write):
+        """Écrire un fichier du cache de manière atomique puis évincer si la taille max est dépassée"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with StageTimer('ecriture_disque') as timer:
+            write(temp_path)
+            os.replace(temp_path, path)
+            size = os.path.getsize(path)
+            timer.bytes_out = size
         
-        for selector in pagination_selectors:
-            try:
-                pagination_element = driver.find_element(By.CSS_SELECTOR, selector)
-                pagination_found = True
-                print("✅ Pagination détectée!")
-                
-                # Essayer de trouver le nombre total de pages de différentes manières
-                page_methods = [
-                    # Méthode 1: Chercher le texte "au total X pages"
-                    lambda: re.search(r'au total (\d+) pages?', pagination_element.text),
-                    # Méthode 2: Chercher le texte "total X pages"
-                    lambda: re.search(r'total (\d+) pages?', pagination_element.text.lower()),
-                    # Méthode 3: Compter les liens de numéro de page
-                    lambda: len(driver.find_elements(By.CSS_SELECTOR, ".pagination__number, .pagination-number, [class*='pagination'] a[href*='page=']")),
-                    # Méthode 4: Trouver le numéro de page le plus élevé
-                    lambda: max([int(re.search(r'page=(\d+)', link.get_attribute('href')).group(1)) 
-                               for link in driver.find_elements(By.CSS_SELECTOR, "a[href*='page=']") 
-                               if re.search(r'page=(\d+)', link.get_attribute('href'))], default=1)
-                ]
-                
-                for method in page_methods:
-                    try:
-                        result = method()
-                        if isinstance(result, re.Match):
-                            total_pages = int(result.group(1))
-                            break
-                        elif isinstance(result, int) and result > 0:
-                            total_pages = result
-                            break
-                    except:
-                        continue
-                
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM blobs WHERE key = ?", (key,)).fetchone()
+            self._total += size - (previous[0] if previous else 0)
+            self._db.execute("INSERT OR REPLACE INTO blobs (key, size, last_used) VALUES (?, ?, ?)", (key, size, time.time()))
+            self._evict()
+            self._db.commit()
+    
+    def _evict(self):
+        """Supprimer les fichiers les moins récemment utilisés (appelé sous verrou)"""
+        while self._total > self._max_bytes:
+            row = self._db.execute("SELECT key, size FROM blobs ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
                 break
-                
-            except:
-                continue
-        
-        if not pagination_found:
-            print("ℹ️  Aucune pagination trouvée - page unique détectée")
-            total_pages = 1
-        else:
-            print(f"📄 Nombre total de pages détecté: {total_pages}")
+            key, size = row
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._db.execute("DELETE FROM blobs WHERE key = ?", (key,))
+            self._total -= size
+            self.evicted += 1
+    
+    def conditional_headers(self, url, webp_quality):
+        """En-têtes If-None-Match / If-Modified-Since si la source ou son WebP est encore en cache"""
+        with self._lock:
+            row = self._db.execute("SELECT etag, last_modified, source_hash FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return {}
         
-        return total_pages, pagination_found
+        etag, last_modified, source_hash = row
+        if not (self._has(f"src/{source_hash}") or self._has(f"webp/{source_hash}-q{webp_quality}")):
+            return {}
         
-    except Exception as e:
-        print(f"⚠️  Erreur lors de la détection de pagination: {str(e)}")
-        return 1, False
-
-def create_output_folder():
-    """Créer un dossier personnalisé pour stocker les résultats"""
-    print("\n📁 Configuration du dossier")
-    print("Choisissez une option:")
-    print("1. Entrer un nom de dossier personnalisé")
-    print("2. Utiliser un dossier avec horodatage (auto)")
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
     
-    choice = input("Entrez votre choix (1 ou 2): ").strip()
+    def is_blocked(self, url):
+        """Vrai si l'URL a donné un placeholder il y a moins de CONFIG['blocklist_days'] jours"""
+        with self._lock:
+            row = self._db.execute("SELECT blocked_at FROM blocked WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return False
+            if time.time() - row[0] > CONFIG['blocklist_days'] * 86400:
+                # Expirée: l'image a pu être rétablie chez le fournisseur
+                self._db.execute("DELETE FROM blocked WHERE url = ?", (url,))
+                self._db.commit()
+                return False
+            self.blocked_skips += 1
+            return True
     
-    if choice == "1":
-        folder_name = input("Entrez le nom du dossier: ").strip()
-        if not folder_name:
-            folder_name = f"scrape_yupoo_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    else:
-        folder_name = f"scrape_yupoo_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    def block(self, url, reason):
+        """Mémoriser une URL placeholder pour ne plus la demander lors des prochaines exécutions"""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO blocked (url, reason, blocked_at) VALUES (?, ?, ?)", (url, reason, time.time()))
+            self._db.commit()
     
-    # Créer le dossier principal
-    try:
-        if not os.path.exists(folder_name):
-            os.makedirs(folder_name)
-            print(f"✅ Dossier créé: {folder_name}")
-        else:
-            print(f"📁 Utilisation du dossier existant: {folder_name}")
-        
-        # Créer le sous-dossier images
-        images_dir = os.path.join(folder_name, "images")
-        if not os.path.exists(images_dir):
-            os.makedirs(images_dir)
-            print(f"✅ Dossier images créé: {images_dir}")
+    def source_hash_for(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT source_hash FROM urls WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+    
+    def store_source(self, url, image_data, etag, last_modified):
+        """Mémoriser les octets source (adressés par SHA-256) et les validateurs HTTP de l'URL"""
+        source_hash = hashlib.sha256(image_data).hexdigest()
+        key = f"src/{source_hash}"
+        if not self._has(key):
+            def write(path):
+                with open(path, 'wb') as f:
+                    f.write(image_data)
+            self._store(key, write)
         
-        return folder_name, images_dir
-    except Exception as e:
-        print(f"❌ Erreur lors de la création du dossier: {str(e)}")
-        print("📁 Utilisation du répertoire actuel à la place")
-        images_dir = os.path.join(".", "images")
-        if not os.path.exists(images_dir):
-            os.makedirs(images_dir)
-        return ".", images_dir
-
-def get_base_url():
-    """Obtenir l'URL de base de l'utilisateur"""
-    print("\n🌐 Configuration de l'URL")
-    print("Entrez l'URL de la catégorie Yupoo à scraper:")
-    print("Exemples:")
-    print("- https://umkao.x.yupoo.com/categories/511015?isSubCate=true")
-    print("- https://umkao.x.yupoo.com/categories/15850?isSubCate=true")
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO urls (url, etag, last_modified, source_hash) VALUES (?, ?, ?, ?)",
+                             (url, etag, last_modified, source_hash))
+            self._db.commit()
+        return source_hash
     
-    url = input("\nEntrez l'URL: ").strip()
+    def read_source(self, source_hash):
+        key = f"src/{source_hash}"
+        if not source_hash or not self._has(key):
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
     
-    # Nettoyer l'URL - supprimer le paramètre page s'il est présent
-    if "page=" in url:
-        url = re.sub(r'&page=\d+', '', url)
-        url = re.sub(r'\?page=\d+&?', '?', url)
-        url = re.sub(r'\?$', '', url)
+    def restore_webp(self, source_hash, webp_quality, file_path):
+        """Copier le WebP déjà encodé pour (hash source, qualité) vers file_path; False s'il n'existe pas"""
+        key = f"webp/{source_hash}-q{webp_quality}"
+        if not source_hash or not self._has(key):
+            return False
+        try:
+            with StageTimer('ecriture_disque') as timer:
+                temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+                shutil.copyfile(self._path(key), temp_path)
+                os.replace(temp_path, file_path)
+                timer.bytes_out = os.path.getsize(file_path)
+        except OSError:
+            return False
+        self.webp_hits += 1
+        return True
+    
+    def store_webp(self, source_hash, webp_quality, file_path):
+        """Mémoriser le WebP encodé pour que les exécutions suivantes à la même qualité n'encodent rien"""
+        if source_hash:
+            self._store(f"webp/{source_hash}-q{webp_quality}", lambda path: shutil.copyfile(file_path, path))
+    
+    def print_stats(self):
+        print(f"\n♻️  CACHE D'IMAGES ({self._dir}):")
+        print(f"   304 Not Modified: {self.revalidated}")
+        print(f"   WebP réutilisés sans encodage: {self.webp_hits}")
+        print(f"   URLs placeholder connues ignorées: {self.blocked_skips}")
+        print(f"   Taille: {self._total / (1024 * 1024):.1f} Mo ({self.evicted} fichiers évincés)")
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def encode_webp_file(image_data, file_path, quality=80, derivatives=(), max_pixels=None):
+    """Décoder l'image et écrire le WebP directement dans file_path (exécutable dans un processus séparé)
+    
+    Les dérivés (voir derivative_outputs) sont produits à partir du même décodage.
+    Retourne (taille totale des fichiers écrits, durée d'encodage en secondes).
+    """
+    return render_images(image_data, [(file_path, None, quality, 'WEBP')] + list(derivatives), max_pixels)
+
+def render_images(image_data, outputs, max_pixels=None):
+    """Décoder une seule fois et écrire chaque sortie (chemin, taille max ou None, qualité, format)
+    
+    Sans sortie pleine taille, ou au-delà de max_pixels, le JPEG est décodé directement à l'échelle
+    réduite (draft); les autres formats au-delà de max_pixels sont décodés puis aussitôt ramenés sous la
+    limite (seules les images au-delà de Image.MAX_IMAGE_PIXELS sont refusées). Les réductions
+    s'enchaînent de la plus grande à la plus petite avec reduce() puis LANCZOS.
+    Chaque fichier est écrit sous un nom temporaire puis renommé: jamais de fichier à moitié écrit.
+    """
+    start = time.perf_counter()
+    
+    # Décodage depuis la mémoire, sans fichier temporaire (seul l'en-tête est lu ici)
+    img = Image.open(io.BytesIO(image_data))
+    draft_box = None
+    sizes = [size for _, size, _, _ in outputs]
+    if None not in sizes:
+        largest = max(sizes)
+        draft_box = (largest, largest)
+    
+    if max_pixels and img.width * img.height > max_pixels and img.format != 'JPEG':
+        if Image.MAX_IMAGE_PIXELS and img.width * img.height > Image.MAX_IMAGE_PIXELS:
+            raise ValueError(f"image {img.width}x{img.height} au-delà de {Image.MAX_IMAGE_PIXELS} pixels (format {img.format})")
+        # PNG, WebP...: pas de décodage à échelle réduite, l'image est ramenée sous max_pixels dès son décodage
+        ratio = (max_pixels / (img.width * img.height)) ** 0.5
+        img.thumbnail((max(1, int(img.width * ratio)), max(1, int(img.height * ratio))), Image.LANCZOS)
+    elif max_pixels and img.width * img.height > max_pixels:
+        # draft choisit l'échelle 1/2, 1/4 ou 1/8 qui reste au-dessus de la taille demandée:
+        # demander la moitié de la limite garantit un décodage sous max_pixels
+        ratio = (max_pixels / (img.width * img.height)) ** 0.5 / 2
+        cap_box = (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+        draft_box = cap_box if draft_box is None else (min(draft_box[0], cap_box[0]), min(draft_box[1], cap_box[1]))
+    
+    if draft_box is not None:
+        img.draft('RGB', draft_box)
+    
+    # Si l'image a un canal alpha, la convertir en RGB
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGB')
+    
+    total_size = 0
+    for file_path, size, quality, image_format in sorted(outputs, key=lambda output: -(output[1] or float('inf'))):
+        if size is not None and max(img.size) > size:
+            ratio = size / max(img.size)
+            img = img.resize((max(1, round(img.width * ratio)), max(1, round(img.height * ratio))),
+                             Image.LANCZOS, reducing_gap=2.0)
+        if image_format == 'AVIF':
+            avif_supported()
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            img.save(temp_path, format=image_format, quality=quality)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        total_size += os.path.getsize(file_path)
+    return total_size, time.perf_counter() - start
+
+def decode_footprint(image_data, max_pixels):
+    """Mémoire estimée pour décoder image_data: pixels décodés (plafonnés) x 4 octets, x2 pour la conversion/réduction"""
+    try:
+        img = Image.open(io.BytesIO(image_data))
+        pixels = img.width * img.height
+    except Exception:
+        # Illisible: le décodage échouera tout de suite, sans allouer de pixels
+        return len(image_data)
+    # Seul le JPEG est décodé directement sous max_pixels; les autres formats sont décodés en entier avant réduction
+    if max_pixels and img.format == 'JPEG':
+        pixels = min(pixels, max_pixels)
+    return len(image_data) + pixels * 4 * 2
+
+class DecodeBudget:
+    """Mémoire réservée aux images en cours de décodage, limitée à CONFIG['decode_memory_mb']
+    
+    Un téléchargement qui dépasserait la limite attend qu'un encodage se termine: quand beaucoup de grandes
+    images arrivent en même temps, elles sont décodées tour à tour au lieu d'épuiser la mémoire.
+    """
+    
+    def __init__(self):
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self.waits = 0
+        self.peak = 0
+    
+    def acquire(self, size, wait=True):
+        """Réserver size octets; une seule image plus grande que la limite passe quand rien d'autre n'est en cours"""
+        limit = CONFIG['decode_memory_mb'] * 1024 * 1024
+        with self._condition:
+            if wait and self._in_use and self._in_use + size > limit:
+                self.waits += 1
+                while self._in_use and self._in_use + size > limit:
+                    self._condition.wait()
+            self._in_use += size
+            self.peak = max(self.peak, self._in_use)
+    
+    def release(self, size):
+        with self._condition:
+            self._in_use -= size
+            self._condition.notify_all()
+    
+    def as_dict(self):
+        with self._condition:
+            return {'waits': self.waits, 'peak_mb': round(self.peak / (1024 * 1024), 1)}
+
+decode_budget = DecodeBudget()
+
+@functools.lru_cache(maxsize=None)
+def avif_supported():
+    """Encodeur AVIF disponible: Pillow >= 11.3 compilé avec libavif, ou le plugin pillow-avif-plugin"""
+    from PIL import features
+    try:
+        if features.check('avif'):
+            return True
+    except ValueError:
+        pass
+    try:
+        import pillow_avif  # noqa: F401 - enregistre le format AVIF dans Pillow
+        return True
+    except ImportError:
+        return False
+
+def normalize_derivative(spec):
+    """Dérivé de CONFIG['derivatives'] ou de --derivative NOM:TAILLE[:QUALITÉ[:FORMAT]] → dict validé"""
+    if isinstance(spec, str):
+        parts = spec.split(':')
+        if not 2 <= len(parts) <= 4:
+            raise ValueError(f"dérivé invalide '{spec}' (attendu NOM:TAILLE[:QUALITÉ[:FORMAT]])")
+        spec = {'name': parts[0], 'size': parts[1]}
+        if len(parts) > 2 and parts[2]:
+            spec['quality'] = parts[2]
+        if len(parts) > 3:
+            spec['format'] = parts[3]
+    
+    try:
+        derivative = {
+            'name': str(spec['name']),
+            'size': int(spec['size']),
+            'quality': int(spec['quality']) if spec.get('quality') is not None else None,
+            'format': str(spec.get('format') or 'WEBP').upper(),
+        }
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"dérivé invalide: {spec}")
+    
+    if not derivative['name'] or os.sep in derivative['name'] or derivative['name'] in ('.', '..'):
+        raise ValueError(f"nom de dérivé invalide: '{derivative['name']}'")
+    if derivative['size'] < 16:
+        raise ValueError(f"taille de dérivé trop petite: {derivative['size']}")
+    if derivative['format'] not in ('WEBP', 'AVIF'):
+        raise ValueError(f"format de dérivé non supporté: {derivative['format']} (WEBP ou AVIF)")
+    if derivative['format'] == 'AVIF' and not avif_supported():
+        raise ValueError("AVIF indisponible: installez pillow-avif-plugin ou Pillow >= 11.3")
+    return derivative
+
+def derivative_outputs(images_dir, filename, webp_quality):
+    """Sorties (chemin, taille max, qualité, format) des dérivés configurés pour l'image filename"""
+    base = os.path.splitext(filename)[0]
+    outputs = []
+    for derivative in map(normalize_derivative, CONFIG['derivatives']):
+        file_path = os.path.join(images_dir, derivative['name'], f"{base}.{derivative['format'].lower()}")
+        outputs.append((file_path, derivative['size'], derivative['quality'] or webp_quality, derivative['format']))
+    return outputs
+
+def missing_derivatives(file_path, webp_quality):
+    """Dérivés pas encore présents sur disque pour l'image principale file_path"""
+    return [output for output in derivative_outputs(os.path.dirname(file_path), os.path.basename(file_path), webp_quality)
+            if not os.path.exists(output[0])]
+
+def derivative_source(file_path, source_hash, cache):
+    """Octets à décoder pour compléter les dérivés: la source en cache, sinon le WebP principal"""
+    if cache is not None and source_hash is not None:
+        image_data = cache.read_source(source_hash)
+        if image_data is not None:
+            return image_data
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+def derivative_urls(images_dir, folder_name, filename, webp_quality):
+    """Colonne URLs_Derives: 'nom: URL serveur' de chaque dérivé présent sur disque, séparés par ' | '"""
+    urls = []
+    for file_path, _, _, _ in derivative_outputs(images_dir, filename, webp_quality):
+        if os.path.exists(file_path):
+            name = os.path.basename(os.path.dirname(file_path))
+            urls.append(f"{name}: http://app.madeinchina-ebook.com/images/{folder_name}/{name}/{os.path.basename(file_path)}")
+    return " | ".join(urls)
+
+def perceptual_signature(image_data):
+    """(hash perceptuel 64 bits, miniature couleur 4x4 RGB) d'une image, ou None si elle est unie
+    
+    Le dHash (sens du gradient horizontal d'une miniature 9x8 en niveaux de gris) rapproche les
+    recompressions et redimensionnements; la miniature couleur sépare les coloris d'un même modèle.
+    Le JPEG est décodé directement à échelle réduite (draft), ce qui coûte bien moins qu'un décodage complet.
+    """
+    img = Image.open(io.BytesIO(image_data))
+    img.draft('RGB', (64, 64))
+    img = img.convert('RGB')
+    pixels = list(img.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    
+    # Image unie ou dégradé régulier: le hash ne distingue rien, seul le hash exact fait foi
+    if bits in (0, (1 << 64) - 1):
+        return None
+    return bits, img.resize((4, 4), Image.BOX).tobytes()
+
+def safe_perceptual_signature(image_data):
+    """Signature perceptuelle, ou None si l'image ne peut pas être décodée (le hash exact suffit alors)"""
+    try:
+        return perceptual_signature(image_data)
+    except Exception:
+        return None
+
+def colours_match(colour, other):
+    """Vrai si deux miniatures couleur 4x4 ne diffèrent nulle part de plus de DEDUP_COLOUR_TOLERANCE"""
+    return len(colour) == len(other) and all(abs(a - b) <= DEDUP_COLOUR_TOLERANCE for a, b in zip(colour, other))
+
+def file_sha256(file_path):
+    """SHA-256 du contenu d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def check_saved_image(file_path, folder_name, webp_quality):
+    """Vérifier le fichier WebP écrit sur disque et générer son URL serveur"""
+    filename = os.path.basename(file_path)
+    
+    # VÉRIFICATION CRITIQUE: S'assurer que le fichier existe réellement
+    if not os.path.exists(file_path):
+        print(f"   ❌ ERREUR CRITIQUE: Fichier non créé - {file_path}")
+        return False, None, None
+    
+    # Vérifier la taille du fichier sauvegardé
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        print(f"   ❌ ERREUR CRITIQUE: Fichier vide - {file_path}")
+        os.remove(file_path)  # Supprimer le fichier vide
+        return False, None, None
+    
+    print(f"   ✅ Fichier sauvegardé: {filename} ({file_size} octets, Q{webp_quality})")
+    
+    # Générer l'URL du serveur
+    server_url = f"http://app.madeinchina-ebook.com/images/{folder_name}/{filename}"
+    
+    print(f"   ✅ Image téléchargée: {filename}")
+    print(f"   🔗 URL serveur: {server_url}")
+    return True, filename, server_url
+
+def download_image(url, output_dir, image_number, session, folder_name, webp_quality, rate_limiter=None, cache=None):
+    """Télécharger une image avec protection anti-bot et conversion WebP (dans le thread appelant)"""
+    # Générer le nom de fichier SIMPLE : img-1.webp, img-2.webp, etc.
+    filename = f"img-{image_number}.webp"
+    file_path = os.path.join(output_dir, filename)
+    
+    fetched = fetch_source(url, session, rate_limiter, cache, file_path, webp_quality)
+    if fetched is None:
+        return False, None, None
+    
+    image_data, source_hash = fetched
+    if image_data is None:
+        missing = missing_derivatives(file_path, webp_quality)
+        if missing:
+            # WebP principal restauré depuis le cache: seuls les dérivés manquants sont produits
+            try:
+                source = derivative_source(file_path, source_hash, cache)
+                footprint = decode_footprint(source, CONFIG['max_decode_pixels'])
+                decode_budget.acquire(footprint)
+                try:
+                    file_size, seconds = render_images(source, missing, CONFIG['max_decode_pixels'])
+                finally:
+                    decode_budget.release(footprint)
+                STAGE_STATS['encodage'].record(seconds, bytes_in=len(source), bytes_out=file_size)
+            except Exception as e:
+                print(f"   ⚠️ Dérivés non produits pour {filename}: {str(e)}")
+        return check_saved_image(file_path, folder_name, webp_quality)
+    
+    # Convertir en WebP avec la qualité choisie, directement dans le fichier
+    print(f"   🔄 Conversion en WebP (qualité {webp_quality}): {len(image_data)} octets d'entrée")
+    footprint = decode_footprint(image_data, CONFIG['max_decode_pixels'])
+    decode_budget.acquire(footprint)
+    try:
+        file_size, seconds = encode_webp_file(image_data, file_path, webp_quality, derivative_outputs(output_dir, filename, webp_quality),
+                                              CONFIG['max_decode_pixels'])
+        STAGE_STATS['encodage'].record(seconds, bytes_in=len(image_data), bytes_out=file_size)
+        if cache is not None:
+            cache.store_webp(source_hash, webp_quality, file_path)
+    except Exception as e:
+        print(f"   ❌ ERREUR DE CONVERSION WebP: {str(e)}")
+        STAGE_STATS['encodage'].record(0.0, bytes_in=len(image_data), error=True)
+        return False, None, None
+    finally:
+        decode_budget.release(footprint)
+    
+    return check_saved_image(file_path, folder_name, webp_quality)
+
+class EncodeStage:
+    """Étape d'encodage WebP dans un pool de processus (un par cœur), séparée du réseau"""
+    
+    def __init__(self, workers=None):
+        workers = workers or os.cpu_count() or 1
+        STAGE_STATS['encodage'].workers = workers
+        # "spawn" partout: même comportement que sous Windows et pas de fork d'un processus multi-thread
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    
+    def submit(self, image_data, file_path, quality, derivatives=(), wait=True):
+        """Planifier l'encodage (et les dérivés); le Future retourne (taille des fichiers, durée d'encodage)
+        
+        Bloque tant que decode_budget est plein (wait=False depuis un callback de Future, qui ne doit pas attendre).
+        """
+        return self._submit(image_data, wait, encode_webp_file, image_data, file_path, quality, derivatives, CONFIG['max_decode_pixels'])
+    
+    def submit_outputs(self, image_data, outputs):
+        """Planifier des sorties seules (dérivés manquants d'une image déjà encodée)"""
+        return self._submit(image_data, True, render_images, image_data, outputs, CONFIG['max_decode_pixels'])
+    
+    def _submit(self, image_data, wait, function, *args):
+        footprint = decode_footprint(image_data, CONFIG['max_decode_pixels'])
+        decode_budget.acquire(footprint, wait=wait)
+        try:
+            future = self._executor.submit(function, *args)
+        except Exception:
+            decode_budget.release(footprint)
+            raise
+        future.add_done_callback(lambda done: decode_budget.release(footprint))
+        return future
+    
+    def close(self):
+        """Attendre les encodages en cours et arrêter les processus"""
+        self._executor.shutdown(wait=True)
+
+class TokenBucket:
+    """Limiteur de débit à jetons: `rate` requêtes par seconde avec une rafale de `capacity`"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Bloquer jusqu'à ce qu'un jeton soit disponible, puis le consommer"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class DownloadStage:
+    """Étape de téléchargement des images: pool de threads, sessions du session_pool et limite de débit par hôte
+    
+    Les octets téléchargés sont confiés à l'EncodeStage; le thread réseau passe aussitôt à l'image suivante.
+    """
+    
+    def __init__(self, workers, host_rate, host_burst, encoder=None, cache=None):
+        self._workers = max(1, workers)
+        self._host_rate = host_rate
+        self._host_burst = host_burst
+        self._encoder = encoder
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="telechargement")
+        self._buckets = {}
+        self._dedup = {}
+        self._lock = threading.Lock()
+        self._gallery = GalleryDownloads(self)
+        STAGE_STATS['reseau'].workers = self._workers
+    
+    def _host_bucket(self, url):
+        """Limiteur de débit propre à l'hôte de l'image"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self._host_rate, self._host_burst)
+                host_health.attach(host, self._buckets[host])
+            return self._buckets[host]
+    
+    def _download(self, result, url, output_dir, image_number, folder_name, webp_quality):
+        try:
+            bucket = self._host_bucket(url)
+            if self._encoder is None:
+                with session_pool.checkout() as session:
+                    result.set_result(download_image(url, output_dir, image_number, session, folder_name, webp_quality, bucket, self._cache))
+                return
+            
+            file_path = os.path.join(output_dir, f"img-{image_number}.webp")
+            # Même session (User-Agent, cookies, connexion) pour les en-têtes et le corps de l'image
+            with session_pool.checkout() as session:
+                fetched = fetch_source(url, session, bucket, self._cache, file_path, webp_quality)
+            if fetched is None:
+                result.set_result((False, None, None))
+                return
+            
+            image_data, source_hash = fetched
+            filename = os.path.basename(file_path)
+            # Couvertures seulement: une photo de galerie (image_number "N-K") ne sert jamais de fichier de référence,
+            # sinon une couverture pourrait pointer vers img-N-K.webp et manquer parmi les couvertures du dossier
+            dedup = self._dedup.get(output_dir) if not isinstance(image_number, str) else None
+            if image_data is None:
+                # WebP restauré depuis le cache: rien à encoder, mais la copie est inutile si la même image est déjà dans le dossier
+                duplicate = None
+                if dedup is not None:
+                    dedup.forget(filename)
+                    duplicate = dedup.find(source_hash, None, filename)
+                if duplicate is not None:
+                    os.remove(file_path)
+                    result.set_result(dedup.reuse(duplicate, 0))
+                    return
+                saved = check_saved_image(file_path, folder_name, webp_quality)
+                if dedup is not None and saved[0]:
+                    dedup.add(source_hash, None, saved[1], saved[2], os.path.getsize(file_path), 0.0)
+                self._complete_derivatives(result, saved, None, source_hash, file_path, webp_quality)
+                return
+            
+            # Même couverture déjà enregistrée dans ce dossier (autre album): réutiliser son fichier
+            fingerprint = None
+            if dedup is not None:
+                with StageTimer('dedoublonnage'):
+                    # Signature perceptuelle seulement si le rapprochement d'images quasi identiques est activé
+                    perceptual = safe_perceptual_signature(image_data) if CONFIG['dedup_distance'] is not None else None
+                    fingerprint = (source_hash or hashlib.sha256(image_data).hexdigest(), perceptual)
+                    duplicate, pending = dedup.claim(*fingerprint, filename)
+                if duplicate is not None:
+                    if duplicate['filename'] == filename:
+                        # Même image au même numéro (exécution précédente): le fichier est déjà à jour
+                        saved = check_saved_image(file_path, folder_name, webp_quality)
+                        self._complete_derivatives(result, saved, image_data, source_hash, file_path, webp_quality)
+                    else:
+                        result.set_result(dedup.reuse(duplicate, len(image_data)))
+                    return
+                if pending is not None:
+                    # Image identique en cours d'encodage pour un album de plus petit numéro: attendre son fichier
+                    pending.add_done_callback(
+                        lambda done: self._after_pending(done, result, image_data, source_hash, file_path, folder_name, webp_quality, dedup, fingerprint))
+                    return
+            
+            self._encode(result, image_data, source_hash, file_path, folder_name, webp_quality, dedup, fingerprint)
+        except Exception as e:
+            print(f"   ❌ ERREUR DE TÉLÉCHARGEMENT pour {url}: {str(e)}")
+            result.set_result((False, None, None))
+    
+    def _encode(self, result, image_data, source_hash, file_path, folder_name, webp_quality, dedup=None, fingerprint=None, wait=True):
+        derivatives = derivative_outputs(os.path.dirname(file_path), os.path.basename(file_path), webp_quality)
+        encoding = self._encoder.submit(image_data, file_path, webp_quality, derivatives, wait=wait)
+        encoding.add_done_callback(
+            lambda done: result.set_result(self._encoded(done, len(image_data), source_hash, file_path, folder_name, webp_quality, dedup, fingerprint)))
+    
+    def _after_pending(self, done, result, image_data, source_hash, file_path, folder_name, webp_quality, dedup, fingerprint):
+        entry = done.result()
+        if entry is not None:
+            result.set_result(dedup.reuse(entry, len(image_data)))
+        else:
+            # L'encodage de référence a échoué: encoder cette copie normalement (elle remplace l'entrée de son fichier)
+            dedup.forget(os.path.basename(file_path))
+            self._encode(result, image_data, source_hash, file_path, folder_name, webp_quality, dedup, fingerprint, wait=False)
+    
+    def _encoded(self, done, input_size, source_hash, file_path, folder_name, webp_quality, dedup=None, fingerprint=None):
+        """Résultat final d'une image une fois l'encodage terminé dans le pool de processus"""
+        try:
+            file_size, seconds = done.result()
+            STAGE_STATS['encodage'].record(seconds, bytes_in=input_size, bytes_out=file_size)
+            if self._cache is not None:
+                self._cache.store_webp(source_hash, webp_quality, file_path)
+            saved = check_saved_image(file_path, folder_name, webp_quality)
+            if dedup is not None:
+                if saved[0]:
+                    dedup.add(*fingerprint, saved[1], saved[2], file_size, seconds)
+                else:
+                    dedup.release(fingerprint[0], os.path.basename(file_path))
+            return saved
+        except Exception as e:
+            print(f"   ❌ ERREUR DE CONVERSION WebP ({os.path.basename(file_path)}): {str(e)}")
+            STAGE_STATS['encodage'].record(0.0, bytes_in=input_size, error=True)
+            if dedup is not None:
+                dedup.release(fingerprint[0], os.path.basename(file_path))
+            return False, None, None
+    
+    def _complete_derivatives(self, result, saved, image_data, source_hash, file_path, webp_quality):
+        """Image principale déjà sur disque: produire les dérivés manquants avant de publier le résultat"""
+        missing = missing_derivatives(file_path, webp_quality) if saved[0] else []
+        if not missing:
+            result.set_result(saved)
+            return
+        
+        source = image_data if image_data is not None else derivative_source(file_path, source_hash, self._cache)
+        
+        def rendered(done):
+            try:
+                file_size, seconds = done.result()
+                STAGE_STATS['encodage'].record(seconds, bytes_in=len(source), bytes_out=file_size)
+            except Exception as e:
+                # L'image principale reste valable; seuls les dérivés manquent dans la ligne
+                print(f"   ⚠️ Dérivés non produits pour {os.path.basename(file_path)}: {str(e)}")
+                STAGE_STATS['encodage'].record(0.0, bytes_in=len(source), error=True)
+            result.set_result(saved)
+        
+        self._encoder.submit_outputs(source, missing).add_done_callback(rendered)
+    
+    def register_dedup(self, output_dir, dedup):
+        """Activer le dédoublonnage (DedupIndex) pour les couvertures écrites dans output_dir (None pour le retirer)"""
+        with self._lock:
+            if dedup is None:
+                self._dedup.pop(output_dir, None)
+            else:
+                self._dedup[output_dir] = dedup
+    
+    def dedup_for(self, output_dir):
+        """DedupIndex actif pour output_dir, ou None"""
+        with self._lock:
+            return self._dedup.get(output_dir)
+    
+    def submit(self, url, output_dir, image_number, folder_name, webp_quality):
+        """Planifier un téléchargement; le Future retourne (success, filename, server_url)
+        
+        image_number: N pour la couverture (img-N.webp), "N-K" pour une photo de galerie (img-N-K.webp).
+        """
+        result = Future()
+        self._executor.submit(self._download, result, url, output_dir, image_number, folder_name, webp_quality)
+        return result
+    
+    def submit_gallery(self, urls, output_dir, image_number, folder_name, webp_quality):
+        """Planifier les photos de la galerie d'un album (img-N-1, img-N-2...)
+        
+        Le Future retourne [(K, success, filename, server_url)] dans l'ordre de la galerie.
+        """
+        return self._gallery.submit(urls, output_dir, image_number, folder_name, webp_quality)
+    
+    def close(self):
+        """Attendre les téléchargements en cours (les sessions sont fermées avec le session_pool)"""
+        self._executor.shutdown(wait=True)
+
+class GalleryDownloads:
+    """Photos des galeries d'albums, lancées dans le DownloadStage par fenêtres
+    
+    Au plus CONFIG['gallery_album_concurrency'] photos en cours par album et CONFIG['gallery_concurrency']
+    au total; les albums sont servis à tour de rôle pour qu'un album de 60 photos ne bloque pas les suivants,
+    et le reste du pool de téléchargement reste disponible pour les couvertures.
+    """
+    
+    def __init__(self, downloader):
+        self._downloader = downloader
+        self._albums = collections.deque()
+        self._active = 0
+        self._lock = threading.Lock()
+    
+    def submit(self, urls, output_dir, image_number, folder_name, webp_quality):
+        album = {
+            'pending': collections.deque(enumerate(urls, 1)),
+            'total': len(urls),
+            'active': 0,
+            'results': {},
+            'job': (output_dir, image_number, folder_name, webp_quality),
+            'future': Future(),
+        }
+        if not urls:
+            album['future'].set_result([])
+            return album['future']
+        with self._lock:
+            self._albums.append(album)
+        self._dispatch()
+        return album['future']
+    
+    def _dispatch(self):
+        launch = []
+        with self._lock:
+            skipped = 0
+            while self._albums and self._active < CONFIG['gallery_concurrency'] and skipped < len(self._albums):
+                album = self._albums.popleft()
+                if album['active'] >= CONFIG['gallery_album_concurrency']:
+                    # Album à sa limite: il reprendra son tour quand une de ses photos sera terminée
+                    self._albums.append(album)
+                    skipped += 1
+                    continue
+                skipped = 0
+                launch.append((album, *album['pending'].popleft()))
+                album['active'] += 1
+                self._active += 1
+                if album['pending']:
+                    self._albums.append(album)
+        
+        for album, position, url in launch:
+            output_dir, image_number, folder_name, webp_quality = album['job']
+            try:
+                download = self._downloader.submit(url, output_dir, f"{image_number}-{position}", folder_name, webp_quality)
+            except RuntimeError:
+                # Téléchargements déjà arrêtés (interruption)
+                download = Future()
+                download.set_result((False, None, None))
+            download.add_done_callback(lambda done, album=album, position=position: self._finished(album, position, done))
+    
+    def _finished(self, album, position, done):
+        try:
+            outcome = done.result()
+        except Exception:
+            outcome = (False, None, None)
+        with self._lock:
+            album['results'][position] = outcome
+            album['active'] -= 1
+            self._active -= 1
+            complete = len(album['results']) == album['total']
+        if complete:
+            album['future'].set_result([(position, *album['results'][position]) for position in sorted(album['results'])])
+        self._dispatch()
+
+def gallery_urls(candidates, page_url):
+    """URLs absolues et sans doublon des photos d'une galerie, limitées à CONFIG['gallery_max_images']"""
+    urls = []
+    seen = set()
+    for src in candidates:
+        if not src or src.startswith('data:'):
+            continue
+        url = urljoin(page_url, src)
+        if url not in seen:
+            seen.add(url)
+            urls.append(url)
+    if CONFIG['gallery_max_images']:
+        urls = urls[:CONFIG['gallery_max_images']]
+    return urls
+
+def parse_gallery_urls(doc, page_url):
+    """Photos de la galerie d'une page album lxml (data-origin-src, puis data-src, puis src)"""
+    return gallery_urls([img.get('data-origin-src') or img.get('data-src') or img.get('src')
+                         for img in select_all(doc, GALLERY_IMAGE_SELECTOR)], page_url)
+
+# Setup Chrome options for headless mode
+def get_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    
+    options = Options()
+    # options.binary_location = "/Applications/Brave Browser.app/Contents/MacOS/Brave Browser"
+    
+    # Activer le mode headless pour que vous puissiez utiliser votre ordinateur normalement
+    options.add_argument("--headless")
+    
+    # Optimisations de performance
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-extensions")
+    
+    # Ne pas charger les images pour un scraping plus rapide (--disable-images n'existe pas dans Chrome):
+    # les URLs restent dans les attributs src / data-src, seuls les téléchargements sont évités
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    
+    service = Service(chromedriver_path())
+    return webdriver.Chrome(service=service, options=options)
+
+@functools.lru_cache(maxsize=None)
+def chromedriver_path():
+    """Installer / localiser ChromeDriver une seule fois par processus"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    return ChromeDriverManager().install()
+
+class BrowserPool:
+    """Navigateurs headless déjà démarrés, réutilisés d'un worker ou d'une catégorie à l'autre"""
+    
+    def __init__(self):
+        self._idle = []
+        self._loads = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0
+    
+    def acquire(self):
+        """Prendre un navigateur libre, ou en démarrer un nouveau"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.started += 1
+        return get_driver()
+    
+    def release(self, driver):
+        """Rendre un navigateur au pool pour la prochaine catégorie"""
+        with self._lock:
+            self._idle.append(driver)
+    
+    def navigate(self, driver_ref, url):
+        """Charger url dans le navigateur de driver_ref et le retourner
+        
+        Le navigateur est pris dans le pool au premier chargement, puis remplacé par un neuf après
+        CONFIG['driver_recycle_pages'] pages pour borner la mémoire de Chrome sur les longues exécutions.
+        """
+        if driver_ref[0] is None:
+            print("🔇 Navigateur headless...")
+            driver_ref[0] = self.acquire()
+        
+        with self._lock:
+            loads = self._loads.get(driver_ref[0], 0) + 1
+            worn = loads > CONFIG['driver_recycle_pages']
+            self._loads[driver_ref[0]] = 1 if worn else loads
+        if worn:
+            print(f"♻️ Navigateur remplacé après {CONFIG['driver_recycle_pages']} pages")
+            old_driver = driver_ref[0]
+            with self._lock:
+                self._loads.pop(old_driver, None)
+                self.started += 1
+                self.recycled += 1
+            try:
+                old_driver.quit()
+            except Exception:
+                pass
+            driver_ref[0] = get_driver()
+            with self._lock:
+                self._loads[driver_ref[0]] = 1
+        
+        with StageTimer('chargement_page'):
+            driver_ref[0].get(url)
+        # Cookies anti-bot du navigateur réutilisés par les requêtes HTTP (pages et images)
+        session_pool.import_cookies(driver_ref[0], url)
+        return driver_ref[0]
+    
+    def close(self):
+        """Fermer tous les navigateurs libres"""
+        with self._lock:
+            drivers, self._idle = self._idle, []
+            self._loads = {}
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if drivers:
+            print(f"🔇 {len(drivers)} navigateur(s) fermé(s)")
+
+browser_pool = BrowserPool()
+
+class ReadinessWaits:
+    """Attendre qu'une page Selenium soit prête (éléments présents) au lieu de dormir un temps fixe
+    
+    Le délai max de chaque type de page est appris des latences observées (moyenne + 4 écarts, comme
+    un délai de retransmission TCP), entre CONFIG['ready_timeout_min'] et CONFIG['ready_timeout']; le temps
+    gagné par rapport aux anciennes pauses fixes est cumulé.
+    """
+    
+    MIN_SAMPLES = 5
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._latency = {}
+        self.waits = 0
+        self.timeouts = 0
+        self.waited_seconds = 0.0
+        self.saved_seconds = 0.0
+    
+    def timeout(self, kind):
+        """Délai max actuel pour ce type de page"""
+        with self._lock:
+            state = self._latency.get(kind)
+            if state is None or state['samples'] < self.MIN_SAMPLES:
+                return CONFIG['ready_timeout']
+            return min(CONFIG['ready_timeout'], max(CONFIG['ready_timeout_min'], state['mean'] + 4 * state['deviation']))
+    
+    def _observe(self, kind, seconds, timed_out):
+        with self._lock:
+            state = self._latency.setdefault(kind, {'mean': seconds, 'deviation': seconds / 2, 'samples': 0})
+            if timed_out:
+                # Page plus lente que prévu: élargir le délai pour les suivantes
+                state['mean'] = min(CONFIG['ready_timeout'], state['mean'] * 2)
+            else:
+                state['deviation'] = 0.75 * state['deviation'] + 0.25 * abs(seconds - state['mean'])
+                state['mean'] = 0.875 * state['mean'] + 0.125 * seconds
+            state['samples'] += 1
+    
+    def wait(self, driver, kind, selector_groups, replaced_sleep):
+        """Attendre qu'un élément de chaque groupe de sélecteurs soit présent
+        
+        replaced_sleep: durée de l'ancienne pause fixe, pour mesurer le temps gagné.
+        Retourne True si la page est prête, False si le délai a expiré (le traitement continue quand même).
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+        
+        timeout = self.timeout(kind)
+        start = time.perf_counter()
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=0.1).until(
+                lambda d: d.execute_script(READY_SCRIPT, selector_groups))
+            ready = True
+        except TimeoutException:
+            ready = False
+        seconds = time.perf_counter() - start
+        
+        self._observe(kind, seconds, not ready)
+        STAGE_STATS['attente_selenium'].record(seconds, error=not ready)
+        with self._lock:
+            self.waits += 1
+            self.timeouts += 0 if ready else 1
+            self.waited_seconds += seconds
+            self.saved_seconds += max(0.0, replaced_sleep - seconds)
+        return ready
+    
+    def as_dict(self):
+        with self._lock:
+            return {
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'waited_seconds': round(self.waited_seconds, 3),
+                'saved_seconds': round(self.saved_seconds, 3),
+                'learned_timeouts': {kind: round(self.timeout(kind), 3) for kind in list(self._latency)},
+            }
+
+readiness = ReadinessWaits()
+
+# Éléments attendus avant d'extraire une page catégorie ou une page album
+CATEGORY_READY = [[ALBUM_LINK_SELECTOR]]
+ALBUM_READY = [[TITLE_SELECTOR] + TITLE_FALLBACK_SELECTORS, IMAGE_SELECTORS]
+
+class HostSlots:
+    """Limite de requêtes HTML simultanées par hôte, accordée dans l'ordre d'arrivée
+    
+    Plusieurs catégories d'un même fournisseur partagent ainsi équitablement CONFIG['host_concurrency'].
+    """
+    
+    def __init__(self):
+        self._hosts = {}
+        self._condition = threading.Condition()
+    
+    @contextlib.contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        ticket = object()
+        with self._condition:
+            state = self._hosts.setdefault(host, {'active': 0, 'waiting': collections.deque()})
+            state['waiting'].append(ticket)
+            while state['waiting'][0] is not ticket or state['active'] >= host_health.concurrency(host):
+                self._condition.wait()
+            state['waiting'].popleft()
+            state['active'] += 1
+            # Le suivant dans la file peut passer s'il reste des places
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                state['active'] -= 1
+                self._condition.notify_all()
+
+host_slots = HostSlots()
+
+def detect_pagination(driver_ref, base_url):
+    """Détecter si la page a une pagination et retourner le nombre total de pages
+    
+    Le navigateur reste sur la page 1: scrape_page la réutilise au lieu de la recharger.
+    """
+    print("🔍 Vérification de la pagination...")
+    
+    try:
+        driver = browser_pool.navigate(driver_ref, base_url)
+        readiness.wait(driver, 'categorie', CATEGORY_READY, replaced_sleep=3)
+        
+        # Un seul aller-retour avec le navigateur: le DOM rendu est analysé avec lxml
+        with StageTimer('pagination'):
+            doc = lxml_html.fromstring(driver.page_source, base_url=driver.current_url)
+            total_pages, pagination_found = parse_pagination(doc)
+        
+        if not pagination_found:
+            print("ℹ️  Aucune pagination trouvée - page unique détectée")
+        else:
+            print("✅ Pagination détectée!")
+            print(f"📄 Nombre total de pages détecté: {total_pages}")
+        
+        return total_pages, pagination_found
+        
+    except Exception as e:
+        print(f"⚠️  Erreur lors de la détection de pagination: {str(e)}")
+        return 1, False
+
+def create_output_folder():
+    """Créer un dossier personnalisé pour stocker les résultats"""
+    print("\n📁 Configuration du dossier")
+    print("Choisissez une option:")
+    print("1. Entrer un nom de dossier personnalisé")
+    print("2. Utiliser un dossier avec horodatage (auto)")
+    
+    choice = input("Entrez votre choix (1 ou 2): ").strip()
+    
+    if choice == "1":
+        folder_name = input("Entrez le nom du dossier: ").strip()
+        if not folder_name:
+            folder_name = f"scrape_yupoo_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    else:
+        folder_name = f"scrape_yupoo_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    return prepare_output_folder(folder_name)
+
+def prepare_output_folder(folder_name):
+    """Créer le dossier de sortie et son sous-dossier images; retourne (dossier, dossier images)"""
+    try:
+        if not os.path.exists(folder_name):
+            os.makedirs(folder_name)
+            print(f"✅ Dossier créé: {folder_name}")
+        else:
+            print(f"📁 Utilisation du dossier existant: {folder_name}")
+        
+        # Créer le sous-dossier images
+        images_dir = os.path.join(folder_name, "images")
+        if not os.path.exists(images_dir):
+            os.makedirs(images_dir)
+            print(f"✅ Dossier images créé: {images_dir}")
+        
+        return folder_name, images_dir
+    except Exception as e:
+        print(f"❌ Erreur lors de la création du dossier: {str(e)}")
+        print("📁 Utilisation du répertoire actuel à la place")
+        images_dir = os.path.join(".", "images")
+        if not os.path.exists(images_dir):
+            os.makedirs(images_dir)
+        return ".", images_dir
+
+def get_base_url():
+    """Obtenir l'URL de base de l'utilisateur"""
+    print("\n🌐 Configuration de l'URL")
+    print("Entrez l'URL de la catégorie Yupoo à scraper:")
+    print("Exemples:")
+    print("- https://umkao.x.yupoo.com/categories/511015?isSubCate=true")
+    print("- https://umkao.x.yupoo.com/categories/15850?isSubCate=true")
+    
+    url = clean_category_url(input("\nEntrez l'URL: "))
     
     print(f"✅ URL de base définie: {url}")
     return url
 
+def clean_category_url(url):
+    """Nettoyer l'URL - supprimer le paramètre page s'il est présent"""
+    url = url.strip()
+    if "page=" in url:
+        url = re.sub(r'&page=\d+', '', url)
+        url = re.sub(r'\?page=\d+&?', '?', url)
+        url = re.sub(r'\?$', '', url)
+    return url
+
+@functools.lru_cache(maxsize=4096)
 def build_page_url(base_url, page_num, has_pagination):
-    """Construire l'URL pour une page spécifique"""
+    """Construire l'URL pour une page spécifique (mémorisée: appelée pour chaque page de chaque catégorie)"""
     if not has_pagination or page_num == 1:
         return base_url
     
@@ -438,55 +2131,41 @@ def build_page_url(base_url, page_num, has_pagination):
     separator = "&" if "?" in base_url else "?"
     return f"{base_url}{separator}page={page_num}"
 
-def scrape_page(driver, base_url, page_num, has_pagination, images_dir, session, folder_name, image_counter, webp_quality):
-    """Scraper tous les produits d'une seule page"""
+def scrape_page(driver_ref, base_url, page_num, has_pagination, pipeline, run_state, already_loaded=False):
+    """Scraper tous les produits d'une seule page
+    
+    already_loaded: le navigateur est déjà sur cette page (page 1 après detect_pagination).
+    """
     page_url = build_page_url(base_url, page_num, has_pagination)
     print(f"\n🔍 Scraping de la page {page_num}: {page_url}")
     
     try:
-        driver.get(page_url)
-        
-        # Attendre le chargement des produits
-        wait = WebDriverWait(driver, 10)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a.album__main")))
-        time.sleep(3)
+        # La page 1 est réutilisée si detect_pagination l'a bien chargée, sinon elle est rechargée
+        driver = driver_ref[0]
+        if not (already_loaded and driver is not None and driver.execute_script(READY_SCRIPT, CATEGORY_READY)):
+            host = urlparse(page_url).netloc
+            for attempt in range(CONFIG['max_retries'] + 1):
+                if attempt:
+                    # Page vide ou trop lente: la recharger après une attente plutôt que de la perdre
+                    host_health.retried(host)
+                    delay = backoff_delay(attempt)
+                    print(f"   🔁 Page {page_num}: nouvelle tentative {attempt}/{CONFIG['max_retries']} dans {delay:.1f} s")
+                    time.sleep(delay)
+                host_health.wait(host)
+                driver = browser_pool.navigate(driver_ref, page_url)
+                
+                # Attendre le chargement des produits
+                if readiness.wait(driver, 'categorie', CATEGORY_READY, replaced_sleep=3):
+                    break
+            else:
+                raise TimeoutError("aucun produit affiché")
         
-        # Obtenir tous les liens produits de cette page
-        items = driver.find_elements(By.CSS_SELECTOR, "a.album__main")
-        print(f"📦 {len(items)} produits trouvés sur la page {page_num}")
+        # Obtenir tous les produits de cette page (lien, titre et couverture) en un seul aller-retour
+        with StageTimer('recherche_elements'):
+            entries = driver.execute_script(ALBUM_ENTRIES_SCRIPT, ALBUM_LINK_SELECTOR, ALBUM_TITLE_SELECTOR)
+        print(f"📦 {len(entries)} produits trouvés sur la page {page_num}")
         
-        page_data = []
-        
-        for i, item in enumerate(items, 1):
-            try:
-                link = item.get_attribute('href')
-                print(f"   Traitement de l'article {i}/{len(items)}: {link.split('/')[-1]}")
-                
-                # Ouvrir la page produit dans un nouvel onglet
-                driver.execute_script("window.open(arguments[0]);", link)
-                driver.switch_to.window(driver.window_handles[1])
-                
-                # Attendre le chargement de la page
-                time.sleep(2)
-                
-                # Extraire les données du produit avec le compteur d'images et la qualité WebP
-                product_data = extract_product_data(driver, link, page_num, images_dir, session, folder_name, image_counter, webp_quality)
-                if product_data:
-                    page_data.append(product_data)
-                    image_counter[0] += 1  # Incrémenter le compteur global
-                
-                # Fermer l'onglet et retourner à la page principale
-                driver.close()
-                driver.switch_to.window(driver.window_handles[0])
-                
-            except Exception as e:
-                print(f"   ❌ Erreur lors du traitement de l'article {i}: {str(e)}")
-                # S'assurer qu'on retourne à la fenêtre principale
-                while len(driver.window_handles) > 1:
-                    driver.close()
-                    if len(driver.window_handles) > 0:
-                        driver.switch_to.window(driver.window_handles[0])
-                continue
+        page_data = process_page_links(pipeline, run_state, entries, page_num)
         
         print(f"✅ Page {page_num} terminée: {len(page_data)} articles scrapés")
         return page_data
@@ -495,26 +2174,24 @@ def scrape_page(driver, base_url, page_num, has_pagination, images_dir, session,
         print(f"❌ Erreur lors du scraping de la page {page_num}: {str(e)}")
         return []
 
-def extract_product_data(driver, link, page_num, images_dir, session, folder_name, image_counter, webp_quality):
+def extract_product_data(driver, link, page_num, images_dir, downloader, folder_name, image_number, webp_quality):
     """Extraire les données d'une page produit individuelle"""
+    from selenium.webdriver.common.by import By
+    
     try:
+        lookup_start = time.perf_counter()
+        
         # Utiliser le bon sélecteur CSS pour le nom du produit
         name = "Nom non trouvé"
         
         # Sélecteur principal - celui que vous avez spécifié
         try:
-            element = driver.find_element(By.CSS_SELECTOR, ".showalbumheader__gallerytitle")
+            element = driver.find_element(By.CSS_SELECTOR, TITLE_SELECTOR)
             if element.text.strip():
                 name = element.text.strip()
         except:
             # Sélecteurs de fallback si le principal échoue
-            title_selectors = [
-                "span[data-name]",
-                ".showalbumheader__title", 
-                "h1", "h2"
-            ]
-            
-            for selector in title_selectors:
+            for selector in TITLE_FALLBACK_SELECTORS:
                 try:
                     element = driver.find_element(By.CSS_SELECTOR, selector)
                     if element.text.strip():
@@ -529,70 +2206,990 @@ def extract_product_data(driver, link, page_num, images_dir, session, folder_nam
                 except:
                     continue
         
-        # Nettoyer le nom du produit (MAX 2 MOTS)
-        clean_name = clean_product_name(name)
+        # Extraire l'URL de l'image principale
+        image_url = "Image non trouvée"
+        for selector in IMAGE_SELECTORS:
+            try:
+                img_element = driver.find_element(By.CSS_SELECTOR, selector)
+                src = (img_element.get_attribute('data-origin-src') or img_element.get_attribute('data-src')
+                       or img_element.get_attribute('src'))
+                if src:
+                    src = urljoin(link, src)
+                if src and 'yupoo.com' in src:
+                    image_url = src
+                    break
+            except:
+                continue
+        
+        # Mode galerie: toutes les photos de l'album, y compris celles en chargement différé
+        gallery = None
+        if CONFIG['gallery']:
+            gallery = gallery_urls(driver.execute_script(GALLERY_SCRIPT, GALLERY_IMAGE_SELECTOR), link)
+        
+        STAGE_STATS['recherche_elements'].record(time.perf_counter() - lookup_start)
+        
+        return build_product_row(name, image_url, link, page_num, images_dir, downloader, folder_name, image_number, webp_quality, gallery)
+        
+    except Exception as e:
+        print(f"   ⚠️  Erreur lors de l'extraction des données: {str(e)}")
+        return None
+
+def build_product_row(name, image_url, link, page_num, images_dir, downloader, folder_name, image_number, webp_quality, gallery=None):
+    """Nettoyer le nom, planifier le téléchargement de l'image et construire la ligne de résultats
+    
+    gallery: URLs des photos de l'album en mode galerie, téléchargées en img-N-1, img-N-2...
+    """
+    # Nettoyer le nom du produit (MAX 2 MOTS)
+    clean_name = clean_product_name(name)
+    
+    print(f"   📝 Nom original: {name[:60]}...")
+    print(f"   🏷️  Nom nettoyé: {clean_name}")
+    print(f"   🖼️  Nom image: img-{image_number}")
+    
+    row = {
+        'Nom_Produit': clean_name,
+        'Nom_Original': name,
+        'Lien_Article': link,
+        'URL_Image_Originale': image_url,
+        'URL_Image_Serveur': "Non disponible",
+        'Image_Telecharge': "Non téléchargée",
+        'Statut_Telechargement': "❌ ÉCHEC",
+        'Qualite_WebP': webp_quality,
+        'Numero_Page': page_num,
+        'Date_Scraping': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'URLs_Derives': "",
+        'URLs_Galerie': ""
+    }
+    
+    # Le téléchargement part dans l'étape dédiée; la ligne est complétée par resolve_download
+    if image_url != "Image non trouvée":
+        print(f"   🖼️  URL image trouvée: {image_url[:50]}...")
+        print(f"   🔄 Téléchargement image #{image_number} planifié (qualité {webp_quality})...")
+        row['_download'] = downloader.submit(image_url, images_dir, image_number, folder_name, webp_quality)
+        row['_image_file'] = f"img-{image_number}.webp"
+        row['_images_location'] = (images_dir, folder_name)
+        row['_dedup'] = downloader.dedup_for(images_dir)
+    else:
+        print(f"   ❌ ERREUR: Aucune URL d'image trouvée")
+        row['Statut_Telechargement'] = "❌ ÉCHEC - URL introuvable"
+    
+    if gallery:
+        print(f"   🖼️  Galerie: {len(gallery)} photos planifiées (img-{image_number}-1 à img-{image_number}-{len(gallery)})")
+        row['_gallery'] = downloader.submit_gallery(gallery, images_dir, image_number, folder_name, webp_quality)
+    
+    return row
+
+def resolve_download(row):
+    """Attendre le téléchargement planifié pour une ligne et compléter ses colonnes image"""
+    future = row.pop('_download', None)
+    expected_file = row.pop('_image_file', None)
+    images_location = row.pop('_images_location', None)
+    gallery = row.pop('_gallery', None)
+    dedup = row.pop('_dedup', None)
+    
+    if gallery is not None:
+        # Une seule colonne pour toute la galerie: une ligne par produit, quel que soit le nombre de photos
+        outcomes = gallery.result()
+        row['URLs_Galerie'] = " | ".join(server_url for _, success, _, server_url in outcomes if success)
+        failed = sum(1 for _, success, _, _ in outcomes if not success)
+        print(f"   🖼️  Galerie: {len(outcomes) - failed}/{len(outcomes)} photos sauvées")
+    
+    if future is None:
+        return row
+    
+    try:
+        success, filename, server_url = future.result()
+    except Exception as e:
+        print(f"   ❌ ERREUR DE TÉLÉCHARGEMENT: {str(e)}")
+        success, filename, server_url = False, None, None
+    
+    if success and dedup is not None:
+        # Les lignes sont résolues dans l'ordre des numéros: tous les fichiers de plus petit numéro sont écrits,
+        # la même image pointe donc toujours vers le même fichier, quel que soit l'ordre des téléchargements
+        canonical = dedup.canonical(filename)
+        if canonical is not None and canonical['filename'] != filename:
+            if filename == expected_file:
+                dedup.retire(filename)
+            filename, server_url = canonical['filename'], canonical['server_url']
+    
+    if success:
+        row['URL_Image_Serveur'] = server_url
+        row['Image_Telecharge'] = filename
+        if CONFIG['derivatives'] and images_location is not None:
+            row['URLs_Derives'] = derivative_urls(*images_location, filename, row['Qualite_WebP'])
+        if expected_file and filename != expected_file:
+            # Couverture identique à celle d'un autre album: fichier et URL serveur partagés
+            row['Statut_Telechargement'] = f"✅ DOUBLON de {filename} (Q{row['Qualite_WebP']})"
+            print(f"   ♻️ Image identique à {filename} - fichier réutilisé")
+        else:
+            row['Statut_Telechargement'] = f"✅ RÉUSSI (Q{row['Qualite_WebP']})"
+            print(f"   ✅ Image sauvée: {filename}")
+    else:
+        print(f"   ❌ ÉCHEC du téléchargement: {row['URL_Image_Originale'][:60]}")
+        row['Statut_Telechargement'] = "❌ ÉCHEC - Voir logs détaillés"
+    
+    return row
+
+def select_all(doc, selector):
+    """Retourner tous les éléments lxml correspondant au sélecteur CSS (compilé une seule fois)"""
+    compiled = _compiled_selectors.get(selector)
+    if compiled is None:
+        compiled = CSSSelector(selector)
+        _compiled_selectors[selector] = compiled
+    return compiled(doc)
+
+def select_first(doc, selector):
+    """Retourner le premier élément lxml correspondant au sélecteur CSS"""
+    matches = select_all(doc, selector)
+    return matches[0] if matches else None
+
+def element_text(element):
+    """Texte visible d'un élément lxml, espaces normalisés comme Selenium"""
+    return re.sub(r'\s+', ' ', element.text_content()).strip()
+
+def fetch_html(session, url):
+    """Télécharger une page HTML avec la session requests et la parser avec lxml"""
+    try:
+        with host_slots.slot(url), StageTimer('chargement_page') as timer:
+            response = resilient_get(session, url, timeout=CONFIG['http_timeout'])
+            timer.bytes_in = len(response.content)
+            timer.error = response.status_code != 200
+        if response.status_code != 200:
+            print(f"   ⚠️ Code de statut HTTP {response.status_code} pour {url}")
+            return None
+        
+        content_type = response.headers.get('Content-Type', '').lower()
+        if content_type and 'html' not in content_type:
+            print(f"   ⚠️ Type de contenu inattendu ({content_type}) pour {url}")
+            return None
+        
+        return lxml_html.fromstring(response.content, base_url=response.url)
+    except requests.exceptions.RequestException as e:
+        print(f"   ⚠️ Erreur HTTP pour {url}: {str(e)}")
+        return None
+    except Exception as e:
+        print(f"   ⚠️ HTML illisible pour {url}: {str(e)}")
+        return None
+
+def parse_pagination(doc):
+    """Détecter la pagination dans un document lxml (même logique que detect_pagination)"""
+    for selector in PAGINATION_SELECTORS:
+        pagination_element = select_first(doc, selector)
+        if pagination_element is None:
+            continue
+        
+        pagination_text = element_text(pagination_element)
+        
+        # Méthodes 1 et 2: texte "au total X pages" / "total X pages"
+        match = re.search(r'au total (\d+) pages?', pagination_text) or re.search(r'total (\d+) pages?', pagination_text.lower())
+        if match:
+            return int(match.group(1)), True
+        
+        # Méthode 3: compter les liens de numéro de page
+        number_links = len(select_all(doc, PAGE_NUMBER_SELECTOR))
+        if number_links > 0:
+            return number_links, True
+        
+        # Méthode 4: trouver le numéro de page le plus élevé
+        page_numbers = []
+        for link in select_all(doc, PAGE_LINK_SELECTOR):
+            match = re.search(r'page=(\d+)', link.get('href', ''))
+            if match:
+                page_numbers.append(int(match.group(1)))
+        return max(page_numbers, default=1), True
+    
+    return 1, False
+
+def parse_album_entries(doc, page_url):
+    """Extraire les produits (lien, titre et couverture de a.album__main) d'une page catégorie"""
+    entries = []
+    for item in select_all(doc, ALBUM_LINK_SELECTOR):
+        href = item.get('href')
+        if not href:
+            continue
+        
+        title = item.get('title')
+        if not title:
+            title_element = select_first(item, ALBUM_TITLE_SELECTOR)
+            title = element_text(title_element) if title_element is not None else ''
+        
+        cover = ''
+        img = select_first(item, "img")
+        if img is not None:
+            cover = img.get('data-origin-src') or img.get('data-src') or img.get('src') or ''
+        
+        entries.append({'link': urljoin(page_url, href), 'title': title, 'cover': cover})
+    return entries
+
+def parse_product_page(doc, page_url):
+    """Extraire le nom et l'URL de l'image principale d'une page album lxml"""
+    name = "Nom non trouvé"
+    
+    element = select_first(doc, TITLE_SELECTOR)
+    if element is not None:
+        if element_text(element):
+            name = element_text(element)
+    else:
+        # Sélecteurs de fallback si le principal échoue
+        for selector in TITLE_FALLBACK_SELECTORS:
+            element = select_first(doc, selector)
+            if element is None:
+                continue
+            if element_text(element):
+                name = element_text(element)
+                break
+            # Essayer l'attribut data-name si le texte est vide
+            if selector == "span[data-name]" and element.get('data-name'):
+                name = element.get('data-name')
+                break
+    
+    image_url = "Image non trouvée"
+    for selector in IMAGE_SELECTORS:
+        img_element = select_first(doc, selector)
+        if img_element is None:
+            continue
+        # Couverture en chargement différé: l'URL réelle est dans data-origin-src ou data-src
+        src = img_element.get('data-origin-src') or img_element.get('data-src') or img_element.get('src')
+        if src:
+            src = urljoin(page_url, src)
+        if src and 'yupoo.com' in src:
+            image_url = src
+            break
+    
+    return name, image_url
+
+def detect_pagination_http(session, base_url, driver_ref):
+    """Détecter la pagination à partir du HTML statique (repli Selenium si nécessaire)
+    
+    Retourne (nombre de pages, pagination trouvée, document lxml de la page 1 ou None après un repli):
+    la page 1 sert ensuite directement à l'extraction de ses produits.
+    """
+    print("🔍 Vérification de la pagination (HTTP)...")
+    
+    doc = fetch_html(session, base_url)
+    if doc is None:
+        print("⚠️  HTML statique indisponible - repli sur Selenium")
+        return detect_pagination(driver_ref, base_url) + (None,)
+    
+    with StageTimer('pagination'):
+        total_pages, pagination_found = parse_pagination(doc)
+    if pagination_found:
+        print("✅ Pagination détectée!")
+        print(f"📄 Nombre total de pages détecté: {total_pages}")
+    else:
+        print("ℹ️  Aucune pagination trouvée - page unique détectée")
+    
+    return total_pages, pagination_found, doc
+
+class CategoryPages:
+    """Pages d'une catégorie lues en HTTP
+    
+    La page 1 déjà téléchargée pour la pagination est réutilisée; les pages suivantes sont téléchargées
+    en parallèle, CONFIG['page_prefetch'] pages en avance sur celle en cours de traitement.
+    """
+    
+    def __init__(self, session, base_url, total_pages, has_pagination, first_doc=None):
+        self.base_url = base_url
+        self.total_pages = total_pages
+        self.has_pagination = has_pagination
+        self._session = session
+        self._futures = {}
+        if first_doc is not None:
+            self._futures[1] = Future()
+            self._futures[1].set_result(first_doc)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, CONFIG['page_prefetch']), thread_name_prefix="pages")
+    
+    def url(self, page_num):
+        return build_page_url(self.base_url, page_num, self.has_pagination)
+    
+    def doc(self, page_num):
+        """Document lxml de la page (None si indisponible); lance le téléchargement des pages suivantes"""
+        last_ahead = min(self.total_pages, page_num + CONFIG['page_prefetch'])
+        for ahead in range(page_num, last_ahead + 1):
+            if ahead not in self._futures:
+                self._futures[ahead] = self._executor.submit(fetch_html, self._session, self.url(ahead))
+        return self._futures.pop(page_num).result()
+    
+    def close(self):
+        """Abandonner les pages préchargées inutilisées (arrêt anticipé, interruption)"""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+        self._executor.shutdown(wait=True)
+
+def extract_product_data_http(driver_ref, link, page_num, images_dir, session, downloader, folder_name, image_number, webp_quality):
+    """Extraire les données d'une page produit via HTTP, avec repli Selenium si le HTML est incomplet"""
+    try:
+        doc = fetch_html(session, link)
+        if doc is not None:
+            with StageTimer('recherche_elements'):
+                name, image_url = parse_product_page(doc, link)
+                gallery = parse_gallery_urls(doc, link) if CONFIG['gallery'] else None
+            if image_url != "Image non trouvée":
+                return build_product_row(name, image_url, link, page_num, images_dir, downloader, folder_name, image_number, webp_quality, gallery)
+        
+        print(f"   ℹ️ Page produit incomplète en HTML statique - repli sur Selenium")
+        driver = browser_pool.navigate(driver_ref, link)
+        readiness.wait(driver, 'album', ALBUM_READY, replaced_sleep=2)
+        return extract_product_data(driver, link, page_num, images_dir, downloader, folder_name, image_number, webp_quality)
+        
+    except Exception as e:
+        print(f"   ⚠️  Erreur lors de l'extraction des données: {str(e)}")
+        return None
+
+def scrape_page_http(driver_ref, pages, page_num, pipeline, run_state):
+    """Scraper tous les produits d'une page via HTTP + lxml (sans navigateur)"""
+    page_url = pages.url(page_num)
+    print(f"\n🔍 Scraping de la page {page_num} (HTTP): {page_url}")
+    
+    doc = pages.doc(page_num)
+    entries = []
+    if doc is not None:
+        with StageTimer('recherche_elements'):
+            entries = parse_album_entries(doc, page_url)
+    
+    if not entries:
+        print("ℹ️  Aucun produit dans le HTML statique - repli sur Selenium")
+        return scrape_page(driver_ref, pages.base_url, page_num, pages.has_pagination, pipeline, run_state)
+    
+    print(f"📦 {len(entries)} produits trouvés sur la page {page_num}")
+    
+    page_data = process_page_links(pipeline, run_state, entries, page_num)
+    
+    print(f"✅ Page {page_num} terminée: {len(page_data)} articles scrapés")
+    return page_data
+
+class ImageNumbering:
+    """Numéros d'image (img-N) attribués dans l'ordre de découverte des liens, indépendamment des workers"""
+    
+    def __init__(self, start=1, known=None):
+        # known: numéros déjà attribués lors d'une exécution précédente (reprise)
+        self._numbers = dict(known or {})
+        self._next = max(self._numbers.values(), default=start - 1) + 1
+        self._lock = threading.Lock()
+    
+    def assign(self, link):
+        """Retourner le numéro du lien, en lui attribuant le suivant s'il est nouveau"""
+        with self._lock:
+            if link not in self._numbers:
+                self._numbers[link] = self._next
+                self._next += 1
+            return self._numbers[link]
+    
+    @property
+    def last_number(self):
+        """Dernier numéro attribué (0 si aucun)"""
+        with self._lock:
+            return self._next - 1
+
+class ProductPipeline:
+    """Pool borné de workers d'extraction: chaque worker possède son navigateur et emprunte les sessions du session_pool
+    
+    settings regroupe ce qui est commun à toutes les catégories (downloader, backend); les paramètres
+    propres à une catégorie (images_dir, folder_name, webp_quality) accompagnent chaque tâche.
+    """
+    
+    def __init__(self, settings, workers, queue_size):
+        self.settings = settings
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._threads = []
+        for stage in ('chargement_page', 'recherche_elements'):
+            STAGE_STATS[stage].workers = max(1, workers)
+        for i in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker, name=f"extraction-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _worker(self):
+        # Ressources propres au worker, jamais partagées entre threads
+        context = {'driver_ref': [None]}
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    self._tasks.task_done()
+                    break
+                
+                result_future, job, link, page_num, image_number = task
+                try:
+                    result = process_product(context, self.settings, job, link, page_num, image_number)
+                except Exception as e:
+                    print(f"   ❌ Erreur lors du traitement de {link}: {str(e)}")
+                    result = None
+                
+                result_future.set_result(result)
+                self._tasks.task_done()
+        finally:
+            # Le navigateur reste démarré pour la suite (autre worker, autre catégorie)
+            if context['driver_ref'][0] is not None:
+                browser_pool.release(context['driver_ref'][0])
+    
+    def submit(self, job, link, page_num, image_number):
+        """Ajouter un produit à la file (bloque si la file est pleine); le Future retourne la ligne ou None"""
+        result_future = Future()
+        if self._closed:
+            result_future.set_result(None)
+            return result_future
+        self._tasks.put((result_future, job, link, page_num, image_number))
+        return result_future
+    
+    def _drain(self):
+        """Abandonner les tâches encore en attente (ex: interruption par l'utilisateur)"""
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[0].set_result(None)
+            self._tasks.task_done()
+    
+    def close(self):
+        """Arrêter les workers et rendre leurs navigateurs au pool"""
+        self._closed = True
+        self._drain()
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        # Une catégorie a pu ajouter une tâche pendant l'arrêt: ne pas la laisser attendre
+        self._drain()
+
+def process_product(context, settings, job, link, page_num, image_number):
+    """Traiter un produit dans un worker avec son propre navigateur et les sessions partagées"""
+    print(f"   Traitement de l'article img-{image_number}: {link.split('/')[-1]}")
+    
+    if settings['backend'] == 'selenium':
+        driver = browser_pool.navigate(context['driver_ref'], link)
+        
+        # Attendre le titre et la couverture
+        readiness.wait(driver, 'album', ALBUM_READY, replaced_sleep=2)
+        
+        return extract_product_data(driver, link, page_num, job['images_dir'], settings['downloader'], job['folder_name'], image_number, job['webp_quality'])
+    
+    return extract_product_data_http(context['driver_ref'], link, page_num, job['images_dir'], session_pool, settings['downloader'], job['folder_name'], image_number, job['webp_quality'])
+
+def process_page_links(pipeline, run_state, entries, page_num):
+    """Numéroter les liens dans l'ordre de la page, les traiter en parallèle et garder cet ordre
+    
+    run_state regroupe l'état de la catégorie: job, numbering, journal, album_index et sinks.
+    """
+    numbering = run_state['numbering']
+    journal = run_state['journal']
+    album_index = run_state['album_index']
+    
+    # En mode incrémental, les albums déjà indexés et inchangés ne sont pas retraités
+    entries = album_index.select(entries)
+    
+    futures = {}
+    results = {}
+    resumed = set()
+    for index, entry in enumerate(entries):
+        link = entry['link']
+        image_number = numbering.assign(link)
+        
+        # Produit déjà terminé lors d'une exécution précédente: reprendre sa ligne du journal
+        done_row = journal.completed_row(link)
+        if done_row is not None:
+            print(f"   ⏭️  Déjà traité (journal): img-{image_number} - {link.split('/')[-1]}")
+            results[index] = done_row
+            resumed.add(index)
+            continue
+        
+        futures[index] = pipeline.submit(run_state['job'], link, page_num, image_number)
+    
+    for index, future in futures.items():
+        results[index] = future.result()
+    
+    page_data = []
+    for index in sorted(results):
+        row = results[index]
+        if not row:
+            continue
+        if index not in resumed:
+            resolve_download(row)
+            journal.record(row, numbering.assign(row['Lien_Article']))
+        album_index.update(entries[index], row, numbering.assign(row['Lien_Article']))
+        run_state['sinks'].write(row)
+        page_data.append(row)
+    return page_data
+
+def album_id(link):
+    """ID d'album Yupoo: dernier segment du chemin de Lien_Article (sans paramètres)"""
+    return urlparse(link).path.rstrip('/').split('/')[-1]
+
+class AlbumIndex:
+    """Index des albums déjà vus (ID, titre, couverture, ligne de résultats) pour le re-scraping incrémental
+    
+    En mémoire, seuls le lien, le numéro d'image, une empreinte du titre et de la couverture et la position
+    de la ligne de résultats sont gardés par album; les lignes sont dans un fichier JSONL à part
+    (album_rows.<génération>.jsonl), relues une par une quand la sortie fusionnée est régénérée.
+    """
+    
+    def __init__(self, output_folder, incremental=False):
+        self.path = os.path.join(output_folder, ALBUM_INDEX_FILE)
+        self._output_folder = output_folder
+        self.incremental = incremental
+        self.skipped = 0
+        self.last_page_all_known = False
+        self._lock = threading.Lock()
+        self._albums = {}
+        self._generation = 0
+        self._rows = None
+        self._reader = None
+        
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    index = json.load(f)
+                if 'albums' in index:
+                    self._albums = index['albums']
+                    self._generation = index['generation']
+                else:
+                    self._migrate(index)
+                print(f"🗂️  Index des albums chargé: {len(self._albums)} albums connus")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Index des albums illisible ({str(e)}) - reconstruction complète")
+                self._albums = {}
+        
+        # Générations orphelines (arrêt pendant un compactage)
+        current = os.path.basename(self._rows_path(self._generation))
+        for name in os.listdir(output_folder):
+            if ALBUM_ROWS_PATTERN.match(name) and name != current:
+                os.remove(os.path.join(output_folder, name))
+        self._open_rows()
+    
+    @staticmethod
+    def signature(entry):
+        """Empreinte du titre et de la couverture d'un album (détection des modifications)"""
+        return hashlib.sha1(f"{entry['title']}\n{entry['cover']}".encode('utf-8')).hexdigest()[:16]
+    
+    def _rows_path(self, generation):
+        return os.path.join(self._output_folder, f"album_rows.{generation}.jsonl")
+    
+    def _open_rows(self):
+        self._rows = open(self._rows_path(self._generation), 'ab')
+        self._reader = open(self._rows_path(self._generation), 'rb')
+    
+    def _append_row(self, row):
+        """Ajouter une ligne au fichier des lignes; retourne sa position (appelé sous verrou)"""
+        offset = self._rows.tell()
+        self._rows.write((json.dumps(row, ensure_ascii=False) + "\n").encode('utf-8'))
+        return offset
+    
+    def _read_row(self, offset):
+        self._rows.flush()
+        self._reader.seek(offset)
+        return json.loads(self._reader.readline())
+    
+    def _migrate(self, albums):
+        """Ancien format (lignes dans album_index.json): déplacer les lignes dans le fichier des lignes"""
+        with open(self._rows_path(self._generation), 'wb') as rows:
+            for key, album in albums.items():
+                offset = None
+                if album.get('row') is not None:
+                    offset = rows.tell()
+                    rows.write((json.dumps(album['row'], ensure_ascii=False) + "\n").encode('utf-8'))
+                self._albums[key] = {'link': album['link'], 'image_number': album['image_number'],
+                                     'signature': self.signature(album), 'row_offset': offset}
+    
+    def image_numbers(self):
+        """Numéros d'image déjà attribués aux albums indexés, par lien produit"""
+        return {album['link']: album['image_number'] for album in self._albums.values()}
+    
+    def is_unchanged(self, entry):
+        """Vrai si l'album est indexé avec le même titre et la même couverture"""
+        known = self._albums.get(album_id(entry['link']))
+        return known is not None and known['row_offset'] is not None and known['signature'] == self.signature(entry)
+    
+    def select(self, entries):
+        """Retourner les albums à traiter (tous, sauf les inchangés en mode incrémental)"""
+        if not self.incremental:
+            self.last_page_all_known = False
+            return entries
+        
+        selected = [entry for entry in entries if not self.is_unchanged(entry)]
+        skipped = len(entries) - len(selected)
+        self.skipped += skipped
+        self.last_page_all_known = bool(entries) and not selected
+        if skipped:
+            print(f"   ⏭️  {skipped} albums inchangés ignorés (incrémental)")
+        return selected
+    
+    def update(self, entry, row, image_number):
+        """Enregistrer le dernier état connu d'un album"""
+        with self._lock:
+            self._albums[album_id(entry['link'])] = {
+                'link': entry['link'],
+                'image_number': image_number,
+                'signature': self.signature(entry),
+                'row_offset': self._append_row(row) if row is not None else None,
+            }
+    
+    def all_rows(self):
+        """Lignes fusionnées, relues une à une: anciennes lignes mises à jour en place, nouveaux albums à la fin"""
+        with self._lock:
+            offsets = [album['row_offset'] for album in self._albums.values() if album['row_offset'] is not None]
+        for offset in offsets:
+            with self._lock:
+                row = self._read_row(offset)
+            yield row
+    
+    def save(self):
+        """Compacter les lignes dans une nouvelle génération puis écrire l'index de manière atomique
+        
+        L'index ne désigne le nouveau fichier des lignes qu'une fois celui-ci complet: un arrêt à
+        n'importe quel moment laisse un index et un fichier des lignes cohérents.
+        """
+        with self._lock:
+            generation = self._generation + 1
+            albums = {}
+            with open(self._rows_path(generation), 'wb') as rows:
+                for key, album in self._albums.items():
+                    album = dict(album)
+                    if album['row_offset'] is not None:
+                        row = self._read_row(album['row_offset'])
+                        album['row_offset'] = rows.tell()
+                        rows.write((json.dumps(row, ensure_ascii=False) + "\n").encode('utf-8'))
+                    albums[key] = album
+            
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'generation': generation, 'albums': albums}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            
+            self._rows.close()
+            self._reader.close()
+            os.remove(self._rows_path(self._generation))
+            self._albums, self._generation = albums, generation
+            self._open_rows()
+    
+    def close(self):
+        with self._lock:
+            self._rows.close()
+            self._reader.close()
+
+class DedupIndex:
+    """Couvertures déjà enregistrées dans un dossier de sortie, par hash exact (et hash perceptuel en option)
+    
+    Les entrées sont ajoutées à dedup_index.jsonl au fur et à mesure (conservé entre les exécutions);
+    une image identique est associée au fichier et à l'URL serveur existants au lieu d'être ré-encodée.
+    Avec max_distance (None = désactivé), une image quasi identique l'est aussi si son dHash est proche
+    et que sa miniature couleur confirme le rapprochement.
+    
+    Une seule entrée par fichier (la dernière écrite), vérifiée contre le SHA-256 du fichier avant
+    réutilisation; entre plusieurs fichiers identiques, le plus petit numéro d'image fait référence.
+    """
+    
+    def __init__(self, output_folder, images_dir, max_distance):
+        self.path = os.path.join(output_folder, DEDUP_INDEX_FILE)
+        self._images_dir = images_dir
+        self._max_distance = max_distance
+        self._entries = {}
+        self._exact = {}
+        self._perceptual = {}
+        self._checked = {}
+        self._retired = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.duplicates = 0
+        self.source_bytes_saved = 0
+        self.disk_bytes_saved = 0
+        self.cpu_seconds_saved = 0.0
+        
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        # Une entrée plus récente du même fichier (réécrit) remplace l'ancienne. Un fichier supprimé
+                        # depuis, ou une entrée d'avant le SHA-256 du fichier (réécriture invérifiable), ne sert plus
+                        if entry.get('file_sha256') and os.path.exists(os.path.join(images_dir, entry['filename'])):
+                            self._put(entry)
+                        else:
+                            self._drop(entry['filename'])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            print(f"🧬 Index de dédoublonnage: {len(self._entries)} images connues")
+        self._file = open(self.path, 'a', encoding='utf-8')
+    
+    @staticmethod
+    def _rank(filename):
+        """Ordre des fichiers: img-3.webp < img-3-1.webp < img-12.webp"""
+        match = re.match(r'img-([\d-]+)\.webp$', filename)
+        return tuple(int(part) for part in match.group(1).split('-')) if match else (float('inf'),)
+    
+    def _put(self, entry):
+        # Une entrée plus récente pour le même fichier remplace l'ancienne (fichier réécrit)
+        self._drop(entry['filename'])
+        self._retired.pop(entry['filename'], None)
+        self._entries[entry['filename']] = entry
+        self._exact.setdefault(entry['exact'], set()).add(entry['filename'])
+        # Entrées d'avant la miniature couleur: rapprochement perceptuel impossible à confirmer
+        if entry['perceptual'] is not None and entry.get('colour'):
+            self._perceptual[entry['filename']] = (int(entry['perceptual'], 16), bytes.fromhex(entry['colour']))
+    
+    def _drop(self, filename):
+        entry = self._entries.pop(filename, None)
+        if entry is None:
+            return
+        same = self._exact.get(entry['exact'])
+        if same is not None:
+            same.discard(filename)
+            if not same:
+                del self._exact[entry['exact']]
+        self._perceptual.pop(filename, None)
+        self._checked.pop(filename, None)
+    
+    def _verified(self, filename):
+        """Vrai si le fichier sur disque est toujours celui de l'entrée (sinon l'entrée est retirée)"""
+        file_path = os.path.join(self._images_dir, filename)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self._drop(filename)
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._checked.get(filename) == signature:
+            return True
+        if file_sha256(file_path) != self._entries[filename]['file_sha256']:
+            self._drop(filename)
+            return False
+        self._checked[filename] = signature
+        return True
+    
+    def _find(self, exact_hash, perceptual, rank):
+        """Plus petit fichier vérifié de rang <= rank pour la même image, ou None"""
+        candidates = set(self._exact.get(exact_hash, ()))
+        if perceptual is not None and self._max_distance is not None:
+            bits, colour = perceptual
+            candidates.update(filename for filename, (known_bits, known_colour) in self._perceptual.items()
+                              if bin(known_bits ^ bits).count('1') <= self._max_distance and colours_match(known_colour, colour))
+        for filename in sorted(candidates, key=self._rank):
+            if self._rank(filename) > rank:
+                break
+            if self._verified(filename):
+                return self._entries[filename]
+        return None
+    
+    def find(self, exact_hash, perceptual, filename):
+        """Entrée existante pour la même image (hash exact, puis signature perceptuelle proche), ou None
+        
+        Seuls filename et les fichiers de plus petit numéro sont candidats, le plus petit d'abord.
+        """
+        with self._lock:
+            return self._find(exact_hash, perceptual, self._rank(filename))
+    
+    def claim(self, exact_hash, perceptual, filename):
+        """(entrée existante, None), (None, Future d'un encodage identique en cours) ou (None, None)
+        
+        Dans le dernier cas l'appelant va écrire filename et en devient responsable: add() ou release()
+        une fois terminé. Seul un encodage de plus petit numéro est attendu, pour que le fichier de
+        référence ne dépende pas de l'ordre d'arrivée des téléchargements.
+        """
+        rank = self._rank(filename)
+        with self._lock:
+            entry = self._find(exact_hash, perceptual, rank)
+            if entry is not None:
+                return entry, None
+            pending = self._pending.setdefault(exact_hash, {})
+            earlier = [other for other in pending if self._rank(other) < rank]
+            if earlier:
+                return None, pending[min(earlier, key=self._rank)]
+            pending[filename] = Future()
+            # Le fichier va être réécrit: son ancienne entrée ne vaut plus
+            self._drop(filename)
+        return None, None
+    
+    def _settle(self, exact_hash, filename):
+        pending = self._pending.get(exact_hash, {})
+        future = pending.pop(filename, None)
+        if not pending:
+            self._pending.pop(exact_hash, None)
+        return future
+    
+    def release(self, exact_hash, filename):
+        """Abandonner une image réservée par claim() (échec d'encodage)"""
+        with self._lock:
+            pending = self._settle(exact_hash, filename)
+        if pending is not None:
+            pending.set_result(None)
+    
+    def forget(self, filename):
+        """Retirer l'entrée d'un fichier qui vient d'être réécrit (restauration depuis le cache)"""
+        with self._lock:
+            self._drop(filename)
+    
+    def add(self, exact_hash, perceptual, filename, server_url, size, encode_seconds):
+        """Mémoriser une image nouvellement enregistrée (remplace l'entrée précédente du même fichier)"""
+        entry = {
+            'exact': exact_hash,
+            'perceptual': f"{perceptual[0]:016x}" if perceptual is not None else None,
+            'colour': perceptual[1].hex() if perceptual is not None else None,
+            'filename': filename,
+            'file_sha256': file_sha256(os.path.join(self._images_dir, filename)),
+            'server_url': server_url,
+            'size': size,
+            'encode_seconds': round(encode_seconds, 4),
+        }
+        with self._lock, StageTimer('ecriture_disque'):
+            self._put(entry)
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            pending = self._settle(exact_hash, filename)
+        if pending is not None:
+            pending.set_result(entry)
+    
+    def canonical(self, filename):
+        """Entrée de référence pour filename: le plus petit fichier vérifié portant la même image, ou None
         
-        print(f"   📝 Nom original: {name[:60]}...")
-        print(f"   🏷️  Nom nettoyé: {clean_name}")
-        print(f"   🖼️  Nom image: img-{image_counter[0]}")
+        filename peut avoir été retiré entre-temps (un album l'a réutilisé avant qu'un plus petit numéro n'existe).
+        """
+        with self._lock:
+            entry = self._entries.get(filename)
+            exact_hash = entry['exact'] if entry is not None else self._retired.get(filename)
+            if exact_hash is None:
+                return None
+            for other in sorted(self._exact.get(exact_hash, ()), key=self._rank):
+                if self._verified(other):
+                    return self._entries[other]
+            return None
+    
+    def retire(self, filename):
+        """Supprimer un fichier devenu doublon d'un fichier de plus petit numéro (et ses dérivés)"""
+        with self._lock:
+            entry = self._entries.get(filename)
+            self._drop(filename)
+            if entry is not None:
+                self._retired[filename] = entry['exact']
+                self.duplicates += 1
+                self.disk_bytes_saved += entry['size']
+        for file_path in [os.path.join(self._images_dir, filename)] + [
+                output[0] for output in derivative_outputs(self._images_dir, filename, 0)]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(file_path)
+    
+    def reuse(self, entry, source_bytes):
+        """Compter un doublon évité; retourne le résultat de téléchargement du fichier existant"""
+        with self._lock:
+            self.duplicates += 1
+            self.source_bytes_saved += source_bytes
+            self.disk_bytes_saved += entry['size']
+            self.cpu_seconds_saved += entry['encode_seconds']
+        return True, entry['filename'], entry['server_url']
+    
+    def as_dict(self):
+        with self._lock:
+            return {
+                'known_images': len(self._entries),
+                'duplicates': self.duplicates,
+                'source_bytes_saved': self.source_bytes_saved,
+                'disk_bytes_saved': self.disk_bytes_saved,
+                'cpu_seconds_saved': round(self.cpu_seconds_saved, 3),
+            }
+    
+    def print_stats(self):
+        if self.duplicates:
+            print(f"\n🧬 DÉDOUBLONNAGE: {self.duplicates} couvertures déjà enregistrées réutilisées")
+            print(f"   💾 Disque économisé: {self.disk_bytes_saved / (1024 * 1024):.1f} Mo")
+            print(f"   🎨 Encodage évité: {self.cpu_seconds_saved:.1f} s CPU, {self.source_bytes_saved / (1024 * 1024):.1f} Mo source")
+    
+    def close(self):
+        self._file.close()
+
+class ScrapeJournal:
+    """Journal append-only (JSONL) des produits traités, pour reprendre une exécution interrompue
+    
+    Seuls le numéro d'image, le statut et la position de la ligne dans le fichier sont gardés en mémoire
+    pour chaque lien; la ligne de résultats est relue dans le journal quand la reprise en a besoin.
+    """
+    
+    def __init__(self, output_folder, images_dir, resume=False):
+        self.path = os.path.join(output_folder, JOURNAL_FILE)
+        self._images_dir = images_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._reader = None
         
-        # Extraire l'URL de l'image principale
-        image_url = "Image non trouvée"
-        image_selectors = [
-            ".showalbumheader__gallerycover img",
-            ".album-cover img",
-            ".gallery img:first-child",
-            "img[src*='yupoo.com']"
-        ]
-        
-        for selector in image_selectors:
-            try:
-                img_element = driver.find_element(By.CSS_SELECTOR, selector)
-                src = img_element.get_attribute('src')
-                if src and 'yupoo.com' in src:
-                    image_url = src
-                    print(f"   🖼️  URL image trouvée: {src[:50]}...")
-                    break
-            except:
-                continue
+        if resume:
+            self._entries = self._load()
         
-        # Télécharger l'image si une URL valide est trouvée
-        downloaded_image = None
-        server_url = None
-        download_status = "❌ ÉCHEC"
-        
-        if image_url != "Image non trouvée":
-            print(f"   🔄 Téléchargement image #{image_counter[0]} (qualité {webp_quality})...")
-            success, filename, generated_server_url = download_image(image_url, images_dir, image_counter[0], session, folder_name, webp_quality)
-            if success:
-                downloaded_image = filename
-                server_url = generated_server_url
-                download_status = f"✅ RÉUSSI (Q{webp_quality})"
-                print(f"   ✅ Image sauvée: {filename}")
-            else:
-                print(f"   ❌ ÉCHEC du téléchargement")
-                download_status = "❌ ÉCHEC - Voir logs détaillés"
-        else:
-            print(f"   ❌ ERREUR: Aucune URL d'image trouvée")
-            download_status = "❌ ÉCHEC - URL introuvable"
+        # Sans reprise, un nouveau journal remplace l'ancien (binaire: positions exactes des lignes)
+        self._file = open(self.path, 'ab' if resume else 'wb')
+        if resume and self._file.tell() and not self._ends_with_newline():
+            # Dernière ligne tronquée par un arrêt brutal: la suite commence sur une nouvelle ligne
+            self._file.write(b"\n")
+            self._file.flush()
+    
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+    
+    def _load(self):
+        """Relire le journal existant; la dernière entrée d'un lien l'emporte"""
+        entries = {}
+        if not os.path.exists(self.path):
+            print(f"ℹ️  Aucun journal trouvé dans {self.path} - démarrage depuis le début")
+            return entries
         
-        # Retourner la structure de données
-        return {
-            'Nom_Produit': clean_name,
-            'Nom_Original': name,
-            'Lien_Article': link,
-            'URL_Image_Originale': image_url,
-            'URL_Image_Serveur': server_url if server_url else "Non disponible",
-            'Image_Telecharge': downloaded_image if downloaded_image else "Non téléchargée",
-            'Statut_Telechargement': download_status,
-            'Qualite_WebP': webp_quality,
-            'Numero_Page': page_num,
-            'Date_Scraping': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        done = set()
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entries[entry['link']] = (entry['image_number'], entry['status'], offset)
+                    if entry['status'] == 'ok' and os.path.exists(os.path.join(self._images_dir, entry['row']['Image_Telecharge'])):
+                        done.add(entry['link'])
+                    else:
+                        done.discard(entry['link'])
+                except (ValueError, KeyError, TypeError):
+                    # Dernière ligne tronquée par un arrêt brutal
+                    pass
+                offset += len(line)
         
-    except Exception as e:
-        print(f"   ⚠️  Erreur lors de l'extraction des données: {str(e)}")
-        return None
+        print(f"📒 Journal chargé: {len(entries)} produits connus, {len(done)} terminés")
+        return entries
+    
+    def image_numbers(self):
+        """Numéros d'image déjà attribués, par lien produit"""
+        return {link: image_number for link, (image_number, _, _) in self._entries.items()}
+    
+    def _read_row(self, offset):
+        with self._lock:
+            if self._reader is None:
+                self._reader = open(self.path, 'rb')
+            self._reader.seek(offset)
+            return json.loads(self._reader.readline())['row']
+    
+    def completed_row(self, link):
+        """Ligne de résultats si le produit est terminé et son image présente sur le disque, sinon None"""
+        known = self._entries.get(link)
+        if known is None or known[1] != 'ok':
+            return None
+        
+        row = self._read_row(known[2])
+        image_path = os.path.join(self._images_dir, row['Image_Telecharge'])
+        if not os.path.exists(image_path):
+            return None
+        return row
+    
+    def record(self, row, image_number):
+        """Ajouter le résultat d'un produit au journal (écrit immédiatement sur disque)"""
+        status = 'ok' if status_code(row['Statut_Telechargement']) in SUCCESS_CODES else 'echec'
+        entry = {'link': row['Lien_Article'], 'image_number': image_number, 'status': status, 'row': row}
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8')
+        with self._lock, StageTimer('ecriture_disque'):
+            self._entries[row['Lien_Article']] = (image_number, status, self._file.tell())
+            self._file.write(line)
+            self._file.flush()
+    
+    def close(self):
+        self._file.close()
+        if self._reader is not None:
+            self._reader.close()
 
 def verify_downloaded_files(images_dir):
     """Vérifier les fichiers réellement téléchargés dans le dossier"""
@@ -601,10 +3198,14 @@ def verify_downloaded_files(images_dir):
             return 0, []
         
         files = os.listdir(images_dir)
-        webp_files = [f for f in files if f.endswith('.webp')]
+        # Les photos de galerie (img-N-K) ne comptent pas parmi les couvertures attendues
+        gallery_files = [f for f in files if GALLERY_FILE_PATTERN.match(f)]
+        webp_files = [f for f in files if f.endswith('.webp') and not GALLERY_FILE_PATTERN.match(f)]
         
         print(f"\n🔍 VÉRIFICATION DU DOSSIER {images_dir}:")
         print(f"   📁 Fichiers WebP trouvés: {len(webp_files)}")
+        if gallery_files:
+            print(f"   🖼️  Photos de galerie: {len(gallery_files)}")
         
         if webp_files:
             print(f"   📋 Liste des fichiers:")
@@ -619,163 +3220,479 @@ def verify_downloaded_files(images_dir):
         print(f"   ❌ Erreur lors de la vérification: {str(e)}")
         return 0, []
 
-def save_to_files(all_data, base_filename, output_folder):
-    """Sauvegarder les données scrapées dans des fichiers CSV et Excel"""
-    if not all_data:
-        print("❌ Aucune donnée à sauvegarder!")
-        return
+def backup_existing_file(filepath):
+    """Renommer un fichier de sortie existant avant de le remplacer"""
+    if os.path.exists(filepath):
+        backup_name = f"{filepath.split('.')[0]}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{filepath.split('.')[-1]}"
+        os.rename(filepath, backup_name)
+        print(f"📋 Fichier existant sauvegardé sous: {backup_name}")
+
+def status_code(status):
+    """Code catégoriel d'un Statut_Telechargement ("✅ RÉUSSI (Q80)" → 'reussi')"""
+    status = status or ""
+    if status.startswith("✅ DOUBLON"):
+        return 'doublon'
+    if status.startswith("✅"):
+        return 'reussi'
+    if "URL introuvable" in status:
+        return 'url_introuvable'
+    return 'echec'
+
+@functools.lru_cache(maxsize=None)
+def parquet_schema():
+    """Schéma typé de l'entrepôt Parquet (les colonnes categorie et date_execution viennent des dossiers)"""
+    import pyarrow as pa
+    
+    text = pa.string()
+    return pa.schema([
+        ('Nom_Produit', text),
+        ('Nom_Original', text),
+        ('Lien_Article', text),
+        ('URL_Image_Originale', text),
+        ('URL_Image_Serveur', text),
+        ('Image_Telecharge', text),
+        ('Statut_Telechargement', pa.dictionary(pa.int8(), text)),
+        ('Qualite_WebP', pa.int16()),
+        ('Numero_Page', pa.int32()),
+        ('Date_Scraping', pa.timestamp('ms')),
+        ('URLs_Derives', pa.list_(text)),
+        ('URLs_Galerie', pa.list_(text)),
+    ])
+
+def typed_parquet_table(rows):
+    """Table Arrow typée à partir de lignes de sortie texte (CSV, JSONL, journal)"""
+    import pyarrow as pa
+    
+    def optional_int(value):
+        if isinstance(value, int):
+            return value
+        return int(value) if str(value or '').isdigit() else None
+    
+    def timestamp(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return None
+    
+    def url_list(value):
+        return [url for url in (value or "").split(" | ") if url]
+    
+    converters = {
+        'Statut_Telechargement': status_code,
+        'Qualite_WebP': optional_int,
+        'Numero_Page': optional_int,
+        'Date_Scraping': timestamp,
+        'URLs_Derives': url_list,
+        'URLs_Galerie': url_list,
+    }
+    columns = {}
+    for field in parquet_schema():
+        convert = converters.get(field.name)
+        values = [row.get(field.name) for row in rows]
+        if convert is not None:
+            columns[field.name] = [convert(value) for value in values]
+        else:
+            columns[field.name] = [None if value is None or str(value) in MISSING_VALUES else str(value) for value in values]
+    
+    status = pa.DictionaryArray.from_arrays(
+        pa.array([STATUS_CODES.index(code) for code in columns['Statut_Telechargement']], pa.int8()), STATUS_CODES)
+    arrays = [status if field.name == 'Statut_Telechargement' else pa.array(columns[field.name], field.type)
+              for field in parquet_schema()]
+    return pa.Table.from_arrays(arrays, schema=parquet_schema())
+
+def parquet_partition_path(store_dir, category, base_filename, run_started):
+    """Fichier Parquet d'une exécution: <entrepôt>/categorie=<nom>/date_execution=<AAAA-MM-JJ>/<base>-<heure>-<pid>.parquet"""
+    partition = os.path.join(store_dir, f"categorie={category}", f"date_execution={run_started:%Y-%m-%d}")
+    return os.path.join(partition, f"{base_filename}-{run_started:%H%M%S}-{os.getpid()}.parquet")
+
+class OutputSinks:
+    """Écriture en continu de chaque ligne produit (CSV + JSONL, Parquet optionnel) dès qu'elle est prête
+    
+    Rien n'est gardé en mémoire: la mémoire reste stable quel que soit le nombre de produits. Les lignes
+    Parquet (typées) vont dans un nouveau fichier de l'entrepôt CONFIG['parquet_dir'] à chaque exécution,
+    partitionné par catégorie et date d'exécution; il n'y apparaît qu'une fois complet (fermeture).
+    """
+    
+    def __init__(self, output_folder, base_filename, parquet=False):
+        self.csv_path = os.path.join(output_folder, f"{base_filename}.csv")
+        self.jsonl_path = os.path.join(output_folder, f"{base_filename}.jsonl")
+        self.parquet_path = None
+        self.count = 0
+        self._lock = threading.Lock()
+        self._parquet_writer = None
+        self._parquet_rows = []
+        
+        if parquet:
+            try:
+                import pyarrow
+                self.parquet_path = parquet_partition_path(CONFIG['parquet_dir'], os.path.basename(os.path.abspath(output_folder)),
+                                                           base_filename, datetime.now())
+            except ImportError:
+                print("⚠️  pyarrow n'est pas installé - sortie Parquet désactivée (pip install pyarrow)")
+        
+        self._open()
+    
+    @property
+    def _parquet_temp_path(self):
+        # Préfixe '.': ignoré par pyarrow.dataset tant que le fichier n'est pas complet
+        folder, filename = os.path.split(self.parquet_path)
+        return os.path.join(folder, f".{filename}.tmp")
+    
+    def _open(self):
+        for filepath in [self.csv_path, self.jsonl_path]:
+            backup_existing_file(filepath)
+        if self.parquet_path:
+            os.makedirs(os.path.dirname(self.parquet_path), exist_ok=True)
+        
+        self._csv_file = open(self.csv_path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.DictWriter(self._csv_file, fieldnames=OUTPUT_COLUMNS, extrasaction='ignore')
+        self._csv.writeheader()
+        self._jsonl_file = open(self.jsonl_path, 'w', encoding='utf-8')
+        self.count = 0
+    
+    def _write_text(self, row):
+        """Ajouter une ligne au CSV et au JSONL (appelé sous verrou)"""
+        self._csv.writerow(row)
+        self._csv_file.flush()
+        self._jsonl_file.write(json.dumps({column: row.get(column) for column in OUTPUT_COLUMNS}, ensure_ascii=False) + "\n")
+        self._jsonl_file.flush()
+        self.count += 1
     
-    df = pd.DataFrame(all_data)
+    def write(self, row):
+        """Ajouter une ligne à toutes les sorties (écrite sur disque immédiatement)"""
+        with self._lock, StageTimer('ecriture_disque'):
+            self._write_text(row)
+            
+            if self.parquet_path:
+                self._parquet_rows.append(row)
+                if len(self._parquet_rows) >= 500:
+                    self._flush_parquet()
+    
+    def _flush_parquet(self):
+        """Écrire les lignes en attente comme un row group Parquet (appelé sous verrou)"""
+        import pyarrow.parquet as pq
+        
+        if not self._parquet_rows:
+            return
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self._parquet_temp_path, parquet_schema())
+        self._parquet_writer.write_table(typed_parquet_table(self._parquet_rows))
+        self._parquet_rows = []
+    
+    def rewrite(self, rows):
+        """Remplacer le CSV et le JSONL par les lignes données (fusion du mode incrémental)
+        
+        Le fichier Parquet de l'exécution garde seulement les lignes scrapées cette fois: l'entrepôt
+        cumule les exécutions, y réécrire l'historique compterait les mêmes albums plusieurs fois.
+        """
+        with self._lock:
+            self._csv_file.close()
+            self._jsonl_file.close()
+            for filepath in [self.csv_path, self.jsonl_path]:
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+        self._open()
+        for row in rows:
+            with self._lock, StageTimer('ecriture_disque'):
+                self._write_text(row)
+    
+    def close(self):
+        with self._lock:
+            self._csv_file.close()
+            self._jsonl_file.close()
+            if self.parquet_path:
+                self._flush_parquet()
+                if self._parquet_writer is not None:
+                    self._parquet_writer.close()
+                    self._parquet_writer = None
+                    os.replace(self._parquet_temp_path, self.parquet_path)
+
+def read_output_rows(csv_filepath):
+    """Relire le CSV de sortie ligne par ligne (colonnes numériques converties en entiers)"""
+    with open(csv_filepath, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            for column in INTEGER_COLUMNS:
+                if row.get(column, '').isdigit():
+                    row[column] = int(row[column])
+            yield row
+
+def write_excel_from_csv(csv_filepath, excel_filepath):
+    """Produire le classeur Excel en une passe avec le mode write-only d'openpyxl"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Produits_Yupoo')
+    
+    # Définir les largeurs de colonnes
+    column_widths = {
+        'A': 25,  # Nom_Produit
+        'B': 60,  # Nom_Original
+        'C': 60,  # Lien_Article
+        'D': 70,  # URL_Image_Originale
+        'E': 70,  # URL_Image_Serveur
+        'F': 20,  # Image_Telecharge
+        'G': 25,  # Statut_Telechargement
+        'H': 15,  # Qualite_WebP
+        'I': 12,  # Numero_Page
+        'J': 20,  # Date_Scraping
+        'K': 90,  # URLs_Derives
+        'L': 90   # URLs_Galerie
+    }
+    
+    for col, width in column_widths.items():
+        worksheet.column_dimensions[col].width = width
+    
+    # Styliser les en-têtes
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    
+    header = []
+    for column in OUTPUT_COLUMNS:
+        cell = WriteOnlyCell(worksheet, value=column)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = Alignment(horizontal="center")
+        header.append(cell)
+    worksheet.append(header)
+    
+    for row in read_output_rows(csv_filepath):
+        worksheet.append([row.get(column) for column in OUTPUT_COLUMNS])
+    
+    workbook.save(excel_filepath)
+
+def summarize_parquet(parquet_path):
+    """Résumé d'une exécution calculé sur les colonnes typées de son fichier Parquet
     
-    # Chemins des fichiers
+    Retourne total, articles par page, qualité WebP, réussites, échecs et fichiers image distincts réussis.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    
+    table = pq.read_table(parquet_path, columns=['Statut_Telechargement', 'Numero_Page', 'Qualite_WebP', 'Image_Telecharge'])
+    status = table['Statut_Telechargement'].combine_chunks().dictionary_decode()
+    succeeded = pc.is_in(status, value_set=pa.array(sorted(SUCCESS_CODES)))
+    success_count = pc.sum(succeeded).as_py() or 0
+    pages = table.group_by('Numero_Page').aggregate([('Numero_Page', 'count')])
+    return {
+        'total': table.num_rows,
+        'pages': dict(zip(pages['Numero_Page'].to_pylist(), pages['Numero_Page_count'].to_pylist())),
+        'webp_quality': table['Qualite_WebP'][0].as_py() if table.num_rows else "N/A",
+        'success': success_count,
+        'failed': table.num_rows - success_count,
+        'success_files': len(pc.unique(pc.filter(table['Image_Telecharge'], succeeded))),
+    }
+
+def summarize_csv(csv_filepath):
+    """Même résumé que summarize_parquet, en une passe sur le CSV (sortie Parquet désactivée)"""
+    summary = {'total': 0, 'pages': {}, 'webp_quality': "N/A", 'success': 0, 'failed': 0}
+    success_files = set()
+    for row in read_output_rows(csv_filepath):
+        summary['total'] += 1
+        summary['pages'][row['Numero_Page']] = summary['pages'].get(row['Numero_Page'], 0) + 1
+        if summary['total'] == 1:
+            summary['webp_quality'] = row['Qualite_WebP']
+        if status_code(row['Statut_Telechargement']) in SUCCESS_CODES:
+            summary['success'] += 1
+            success_files.add(row['Image_Telecharge'])
+        else:
+            summary['failed'] += 1
+    summary['success_files'] = len(success_files)
+    return summary
+
+def save_to_files(base_filename, output_folder, parquet_path=None):
+    """Finaliser les fichiers de sortie: classeur Excel à partir du CSV écrit en continu, puis résumé
+    
+    parquet_path: fichier de l'exécution dans l'entrepôt Parquet; le résumé est alors calculé sur ses colonnes typées.
+    """
     csv_filepath = os.path.join(output_folder, f"{base_filename}.csv")
     excel_filepath = os.path.join(output_folder, f"{base_filename}.xlsx")
     
-    # Créer des sauvegardes si les fichiers existent
-    for filepath in [csv_filepath, excel_filepath]:
-        if os.path.exists(filepath):
-            backup_name = f"{filepath.split('.')[0]}_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{filepath.split('.')[-1]}"
-            os.rename(filepath, backup_name)
-            print(f"📋 Fichier existant sauvegardé sous: {backup_name}")
+    if not os.path.exists(csv_filepath):
+        print("❌ Aucune donnée à sauvegarder!")
+        return
+    
+    backup_existing_file(excel_filepath)
     
     try:
-        # Sauvegarder en CSV
-        df.to_csv(csv_filepath, index=False, encoding='utf-8')
         print(f"📄 CSV sauvegardé dans: {csv_filepath}")
         
         # Sauvegarder en Excel avec formatage
-        with pd.ExcelWriter(excel_filepath, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Produits_Yupoo', index=False)
-            
-            # Formater le fichier Excel
-            workbook = writer.book
-            worksheet = writer.sheets['Produits_Yupoo']
-            
-            # Définir les largeurs de colonnes
-            column_widths = {
-                'A': 25,  # Nom_Produit
-                'B': 60,  # Nom_Original
-                'C': 60,  # Lien_Article
-                'D': 70,  # URL_Image_Originale
-                'E': 70,  # URL_Image_Serveur
-                'F': 20,  # Image_Telecharge
-                'G': 25,  # Statut_Telechargement
-                'H': 15,  # Qualite_WebP
-                'I': 12,  # Numero_Page
-                'J': 20   # Date_Scraping
-            }
-            
-            for col, width in column_widths.items():
-                worksheet.column_dimensions[col].width = width
-            
-            # Styliser les en-têtes
-            from openpyxl.styles import Font, PatternFill, Alignment
-            
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            
-            for cell in worksheet[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = Alignment(horizontal="center")
-        
+        write_excel_from_csv(csv_filepath, excel_filepath)
         print(f"📊 Excel sauvegardé dans: {excel_filepath}")
         
+        # Résumé calculé sur l'entrepôt Parquet (colonnes typées), sinon en une seule passe sur le CSV
+        if parquet_path and os.path.exists(parquet_path):
+            print(f"🗄️  Parquet typé: {parquet_path}")
+            summary = summarize_parquet(parquet_path)
+        else:
+            summary = summarize_csv(csv_filepath)
+        total = summary['total']
+        page_summary = summary['pages']
+        webp_quality = summary['webp_quality']
+        success_count = summary['success']
+        failed_count = summary['failed']
+        
+        if total == 0:
+            print("❌ Aucune donnée à sauvegarder!")
+            return
+        
         print(f"\n🎉 SUCCÈS!")
-        print(f"📊 Total d'articles scrapés: {len(all_data)}")
-        print(f"📈 Pages scrapées: {df['Numero_Page'].nunique()}")
+        print(f"📊 Total d'articles scrapés: {total}")
+        print(f"📈 Pages scrapées: {len(page_summary)}")
         
         # Afficher le résumé par page
-        page_summary = df.groupby('Numero_Page').size()
         print(f"\n📋 Articles par page:")
-        for page, count in page_summary.items():
+        for page, count in sorted(page_summary.items()):
             print(f"   Page {page}: {count} articles")
         
         # Afficher le résumé par qualité WebP
-        if 'Qualite_WebP' in df.columns:
-            webp_quality = df['Qualite_WebP'].iloc[0] if len(df) > 0 else "N/A"
-            print(f"\n🎨 Qualité WebP utilisée: {webp_quality}")
-        
-        # Compter les images selon les statuts dans les données
-        success_count = len(df[df['Statut_Telechargement'].str.contains('✅', na=False)])
-        failed_count = len(df[df['Statut_Telechargement'].str.contains('❌', na=False)])
+        print(f"\n🎨 Qualité WebP utilisée: {webp_quality}")
         
         print(f"\n🖼️  RÉSULTATS DE TÉLÉCHARGEMENT (selon les logs):")
-        print(f"   ✅ Images déclarées réussies: {success_count}/{len(all_data)}")
-        print(f"   ❌ Images déclarées échouées: {failed_count}/{len(all_data)}")
-        print(f"   📊 Taux de réussite déclaré: {(success_count/len(all_data)*100):.1f}%")
+        print(f"   ✅ Images déclarées réussies: {success_count}/{total}")
+        print(f"   ❌ Images déclarées échouées: {failed_count}/{total}")
+        print(f"   📊 Taux de réussite déclaré: {(success_count/total*100):.1f}%")
+        
+        # Les couvertures identiques partagent un seul fichier: on attend un fichier par image unique
+        duplicate_count = success_count - summary['success_files']
+        expected_files = total - duplicate_count
+        if duplicate_count:
+            print(f"   ♻️ Couvertures en doublon (fichier partagé): {duplicate_count}")
         
         # VÉRIFICATION RÉELLE DES FICHIERS
         images_dir = os.path.join(output_folder, "images")
         actual_count, actual_files = verify_downloaded_files(images_dir)
         
         print(f"\n🔍 VÉRIFICATION RÉELLE DES FICHIERS:")
-        print(f"   📁 Fichiers réellement présents: {actual_count}/{len(all_data)}")
-        print(f"   📊 Taux de réussite RÉEL: {(actual_count/len(all_data)*100):.1f}%")
+        print(f"   📁 Fichiers réellement présents: {actual_count}/{expected_files}")
+        print(f"   📊 Taux de réussite RÉEL: {(actual_count/expected_files*100):.1f}%")
         
         # Alerte si il y a une différence
-        if actual_count != success_count:
+        if actual_count != summary['success_files']:
             print(f"\n⚠️  ATTENTION: DIFFÉRENCE DÉTECTÉE!")
-            print(f"   📊 Déclarés réussis: {success_count}")
+            print(f"   📊 Déclarés réussis: {summary['success_files']}")
             print(f"   📁 Réellement présents: {actual_count}")
-            print(f"   🔍 Différence: {success_count - actual_count} fichiers manquants")
+            print(f"   🔍 Différence: {summary['success_files'] - actual_count} fichiers manquants")
             
-            if actual_count < success_count:
+            if actual_count < summary['success_files']:
                 print(f"\n🔧 CAUSES POSSIBLES:")
                 print(f"   • Erreurs de sauvegarde de fichiers")
                 print(f"   • Problèmes de permissions")
                 print(f"   • Conversions WebP échouées")
                 print(f"   • Fichiers corrompus supprimés")
         
-        if failed_count > 0 or actual_count < len(all_data):
-            missing_count = len(all_data) - actual_count
+        if failed_count > 0 or actual_count < expected_files:
+            missing_count = expected_files - actual_count
             print(f"\n⚠️  ATTENTION: {missing_count} images manquantes!")
             print(f"   Vérifiez la colonne 'Statut_Telechargement' dans le fichier Excel pour plus de détails.")
             
     except Exception as e:
         print(f"❌ Erreur lors de la sauvegarde des fichiers: {str(e)}")
 
-def main():
-    """Fonction principale de scraping"""
-    print("🚀 Scraper Intelligent Yupoo (Images: img-1, img-2... | Noms: MAX 2 MOTS)")
-    print("=" * 80)
+def open_shared_resources():
+    """Démarrer les ressources partagées par toutes les catégories d'une exécution
     
-    # Vérifier si Pillow est installé
-    try:
-        from PIL import Image
-    except ImportError:
-        print("❌ ERREUR: Pillow n'est pas installé!")
-        print("📦 Installez-le avec: pip install Pillow")
-        return
+    Session HTTP, encodage WebP, cache, téléchargements (limites par hôte) et workers d'extraction:
+    en mode --batch, elles restent chaudes d'une catégorie à l'autre.
+    """
+    # Sessions HTTP (User-Agents distincts) partagées par pages et images
+    print("🛡️ Initialisation des sessions HTTP avec protection anti-bot...")
+    session_pool.open()
     
-    # Obtenir l'URL et configurer le dossier
-    base_url = get_base_url()
-    output_folder, images_dir = create_output_folder()
+    # Étapes image: encodage WebP sur tous les cœurs, téléchargement avec pool de connexions par hôte
+    encoder = EncodeStage(CONFIG['encode_workers'])
+    cache = ImageCache(CONFIG['cache_dir'], CONFIG['cache_max_mb']) if CONFIG['cache_dir'] else None
+    downloader = DownloadStage(CONFIG['download_workers'], CONFIG['host_rate'], CONFIG['host_burst'], encoder, cache)
     
-    # NOUVELLE FONCTION: Obtenir la qualité WebP de l'utilisateur
-    webp_quality = get_webp_quality()
+    # Pool de workers d'extraction (chacun avec son propre navigateur)
+    pipeline_settings = {
+        'downloader': downloader,
+        'backend': CONFIG['backend'],
+    }
+    print(f"👷 {CONFIG['workers']} workers d'extraction en parallèle")
+    pipeline = ProductPipeline(pipeline_settings, CONFIG['workers'], CONFIG['queue_size'])
     
-    print(f"\n💾 Dossier de sortie: {output_folder}")
-    print(f"🖼️  Dossier des images: {images_dir}")
-    print(f"🎨 Qualité WebP: {webp_quality}")
-    print("💻 Vous pouvez continuer à utiliser votre ordinateur normalement pendant le scraping!")
+    return {
+        'session': session_pool,
+        'encoder': encoder,
+        'cache': cache,
+        'downloader': downloader,
+        'pipeline': pipeline,
+        'stop': threading.Event(),
+    }
+
+def close_shared_resources(resources):
+    """Attendre les tâches en cours puis arrêter workers, téléchargements, encodage et navigateurs"""
+    resources['stop'].set()
+    resources['pipeline'].close()
+    resources['downloader'].close()
+    resources['encoder'].close()
+    if resources['cache'] is not None:
+        resources['cache'].print_stats()
+        resources['cache'].close()
+    resources['session'].close()
+    browser_pool.close()
+
+def scrape_category(resources, base_url, output_folder, images_dir, webp_quality):
+    """Scraper toutes les pages d'une catégorie avec les ressources partagées
     
+    Retourne un résumé: nombre de produits, dernier numéro d'image et durée en secondes.
+    """
     start_time = datetime.now()
-    all_scraped_data = []
+    scraped_count = 0
+    pipeline = resources['pipeline']
+    session = resources['session']
+    
+    # Journal de reprise: en mode --resume, les produits terminés sont sautés et la numérotation continue
+    journal = ScrapeJournal(output_folder, images_dir, resume=CONFIG['resume'])
+    if CONFIG['resume']:
+        print(f"🔁 Mode reprise: journal {journal.path}")
+    
+    # Index des albums connus: en mode --incremental, seuls les albums nouveaux ou modifiés sont traités
+    album_index = AlbumIndex(output_folder, incremental=CONFIG['incremental'])
+    if CONFIG['incremental']:
+        print(f"🆕 Mode incrémental: index {album_index.path}")
+    
+    # NUMÉROTATION DES IMAGES (img-1, img-2, etc.) dans l'ordre de découverte des produits
+    known_numbers = album_index.image_numbers()
+    known_numbers.update(journal.image_numbers())
+    numbering = ImageNumbering(1, known=known_numbers)
+    
+    # Sorties écrites en continu, produit par produit
+    sinks = OutputSinks(output_folder, OUTPUT_FILE_BASE, parquet=CONFIG['parquet_output'])
     
-    # COMPTEUR GLOBAL POUR LES NOMS D'IMAGES (img-1, img-2, etc.)
-    image_counter = [1]  # Utilise une liste pour pouvoir la modifier dans les fonctions
+    # Couvertures réutilisées d'un album à l'autre: un seul fichier par image
+    dedup = DedupIndex(output_folder, images_dir, CONFIG['dedup_distance']) if CONFIG['dedup'] else None
+    resources['downloader'].register_dedup(images_dir, dedup)
     
-    print("\n🔇 Démarrage du navigateur en mode headless...")
-    driver = get_driver()
+    run_state = {
+        'job': {
+            'images_dir': images_dir,
+            'folder_name': os.path.basename(output_folder),
+            'webp_quality': webp_quality,
+        },
+        'numbering': numbering,
+        'journal': journal,
+        'album_index': album_index,
+        'sinks': sinks,
+    }
     
-    # Créer une session pour le téléchargement d'images
-    print("🛡️ Initialisation de la session de téléchargement avec protection anti-bot...")
-    session = create_session()
+    # Navigateur de la page catégorie: pris dans le pool au premier chargement (mode Selenium ou repli)
+    driver_ref = [None]
+    if CONFIG['backend'] != 'selenium':
+        print("\n⚡ Moteur HTTP + lxml (Selenium uniquement en repli)")
     
+    pages = None
     try:
-        # Détecter la pagination
-        total_pages, has_pagination = detect_pagination(driver, base_url)
+        # Détecter la pagination (la page 1 chargée sert aussi à ses produits)
+        if CONFIG['backend'] == 'selenium':
+            total_pages, has_pagination = detect_pagination(driver_ref, base_url)
+        else:
+            total_pages, has_pagination, first_doc = detect_pagination_http(session, base_url, driver_ref)
+            pages = CategoryPages(session, base_url, total_pages, has_pagination, first_doc)
         
         if has_pagination:
             print(f"📄 Va scraper {total_pages} pages")
@@ -789,55 +3706,693 @@ def main():
         
         # Scraper chaque page
         for page in range(1, total_pages + 1):
-            page_data = scrape_page(driver, base_url, page, has_pagination, images_dir, session, os.path.basename(output_folder), image_counter, webp_quality)
-            all_scraped_data.extend(page_data)
+            if resources['stop'].is_set():
+                break
+            if CONFIG['backend'] == 'selenium':
+                page_data = scrape_page(driver_ref, base_url, page, has_pagination, pipeline, run_state, already_loaded=page == 1)
+            else:
+                page_data = scrape_page_http(driver_ref, pages, page, pipeline, run_state)
+            scraped_count += len(page_data)
             
-            # Sauvegarder le progrès périodiquement (toutes les 3 pages pour multi-page, ou après page unique)
-            if (has_pagination and page % 3 == 0) or (not has_pagination and page == 1):
-                temp_csv = os.path.join(output_folder, f"temp_{OUTPUT_FILE_BASE}.csv")
-                temp_excel = os.path.join(output_folder, f"temp_{OUTPUT_FILE_BASE}.xlsx")
-                
-                if all_scraped_data:
-                    temp_df = pd.DataFrame(all_scraped_data)
-                    temp_df.to_csv(temp_csv, index=False)
-                    temp_df.to_excel(temp_excel, index=False)
-                    print(f"💾 Progrès sauvegardé (img-{image_counter[0]-1} images traitées, Q{webp_quality})")
+            # Les albums sont listés du plus récent au plus ancien: une page entièrement connue termine le scan
+            if album_index.last_page_all_known:
+                print(f"🛑 Page {page} entièrement connue et inchangée - arrêt anticipé de la pagination")
+                break
+            
+            print(f"💾 Progrès sauvegardé en continu ({sinks.count} lignes dans {sinks.csv_path})")
             
             # Brève pause entre les pages (seulement s'il y a plus de pages à traiter)
-            if page < total_pages:
-                time.sleep(2)
+            if page < total_pages and CONFIG['page_delay']:
+                time.sleep(CONFIG['page_delay'])
     
     except KeyboardInterrupt:
         print("\n⏹️  Scraping interrompu par l'utilisateur")
+        resources['stop'].set()
     except Exception as e:
         print(f"\n❌ Erreur inattendue: {str(e)}")
     finally:
-        driver.quit()
-        print("🔇 Navigateur fermé")
-    
-    # Sauvegarder les résultats finaux
-    if all_scraped_data:
-        save_to_files(all_scraped_data, OUTPUT_FILE_BASE, output_folder)
-        
-        end_time = datetime.now()
-        duration = end_time - start_time
-        print(f"\n⏱️  Temps total: {duration}")
-        print(f"⚡ Temps moyen par article: {duration.total_seconds() / len(all_scraped_data):.2f} secondes")
-        print(f"🖼️  Dernier numéro d'image: img-{image_counter[0]-1}")
-        print(f"🎨 Qualité WebP utilisée: {webp_quality}")
+        # Les produits de la catégorie sont tous résolus à ce stade: seuls les fichiers propres à la catégorie sont fermés
+        if pages is not None:
+            pages.close()
+        resources['downloader'].register_dedup(images_dir, None)
+        if dedup is not None:
+            dedup.close()
+            dedup.print_stats()
+        journal.close()
+        album_index.save()
         
-        # Nettoyer les fichiers temporaires
-        for temp_file in [f"temp_{OUTPUT_FILE_BASE}.csv", f"temp_{OUTPUT_FILE_BASE}.xlsx"]:
-            temp_path = os.path.join(output_folder, temp_file)
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                print(f"🗑️  Nettoyé {temp_file}")
+        # En mode incrémental, la sortie fusionne les anciennes lignes et celles de cette exécution
+        if CONFIG['incremental']:
+            print(f"\n🆕 Incrémental: {scraped_count} albums nouveaux/modifiés, {album_index.skipped} inchangés ignorés")
+            sinks.rewrite(album_index.all_rows())
+        album_index.close()
+        sinks.close()
+        if driver_ref[0] is not None:
+            browser_pool.release(driver_ref[0])
+    
+    # Sauvegarder les résultats finaux (en incrémental, le Parquet de l'exécution ne contient que les albums
+    # scrapés cette fois: le résumé est calculé sur le CSV fusionné)
+    if sinks.count:
+        save_to_files(OUTPUT_FILE_BASE, output_folder, None if CONFIG['incremental'] else sinks.parquet_path)
+    
+    duration = datetime.now() - start_time
+    if scraped_count:
+        print(f"\n⏱️  Temps de la catégorie: {duration}")
+        print(f"⚡ Temps moyen par article: {duration.total_seconds() / scraped_count:.2f} secondes")
+        print(f"🖼️  Dernier numéro d'image: img-{numbering.last_number}")
+        print(f"🎨 Qualité WebP utilisée: {webp_quality}")
         
         print(f"\n📁 Tous les fichiers sauvegardés dans: {output_folder}")
         print(f"🖼️  Images WebP sauvegardées dans: {images_dir}")
-        print(f"📋 Format des images: img-1.webp à img-{image_counter[0]-1}.webp (Q{webp_quality})")
+        print(f"📋 Format des images: img-1.webp à img-{numbering.last_number}.webp (Q{webp_quality})")
+    elif CONFIG['incremental'] and album_index.skipped:
+        print(f"\n✅ Aucun album nouveau ou modifié ({album_index.skipped} inchangés) - sorties régénérées depuis l'index")
     else:
         print("\n❌ Aucune donnée n'a été scrapée!")
+    
+    return {
+        'products': scraped_count,
+        'last_image_number': numbering.last_number,
+        'wall_seconds': duration.total_seconds(),
+        'dedup': dedup.as_dict() if dedup is not None else None,
+    }
+
+def run_scrape(base_url, output_folder, images_dir, webp_quality):
+    """Scraper toutes les pages de base_url sans interaction (utilisé par main et benchmark.py)
+    
+    Retourne un résumé: nombre de produits, dernier numéro d'image et durée totale en secondes.
+    """
+    # Point d'accès Prometheus optionnel pendant l'exécution
+    metrics_server = start_metrics_server(CONFIG['metrics_port']) if CONFIG['metrics_port'] else None
+    
+    start_time = datetime.now()
+    resources = open_shared_resources()
+    try:
+        summary = scrape_category(resources, base_url, output_folder, images_dir, webp_quality)
+    finally:
+        close_shared_resources(resources)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    
+    # Durée totale, y compris la fin des téléchargements et encodages en arrière-plan
+    summary['wall_seconds'] = (datetime.now() - start_time).total_seconds()
+    if summary['products']:
+        print_stage_stats(summary['wall_seconds'])
+        write_metrics_report(output_folder, OUTPUT_FILE_BASE, summary['wall_seconds'],
+                             {'base_url': base_url, 'products': summary['products'], 'webp_quality': webp_quality,
+                              'readiness': readiness.as_dict(), 'dedup': summary['dedup'],
+                              'decode_budget': decode_budget.as_dict(), 'hosts': host_health.as_dict(),
+                              'sessions': session_pool.as_dict()})
+    return summary
+
+def category_folder_name(url):
+    """Nom de dossier lisible pour une catégorie: fournisseur_idcategorie (ex: umkao_511015)"""
+    supplier = urlparse(url).netloc.split('.')[0] or "yupoo"
+    match = re.search(r'/(?:categories|collections)/(\d+)', url)
+    return f"{supplier}_{match.group(1)}" if match else f"{supplier}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+def read_batch_file(path):
+    """Lire la liste des catégories: une URL par ligne, suivie éventuellement d'un nom de dossier
+    
+    Les lignes vides et celles commençant par # sont ignorées.
+    """
+    categories = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split(None, 1)
+            url = clean_category_url(parts[0])
+            folder = parts[1].strip() if len(parts) > 1 else category_folder_name(url)
+            categories.append((url, folder))
+    return categories
+
+def run_batch(categories, batch_folder, webp_quality):
+    """Scraper toutes les catégories [(url, dossier)] avec un seul jeu de ressources partagées
+    
+    CONFIG['batch_parallel'] catégories avancent en même temps; l'échec d'une catégorie est noté
+    dans le rapport du lot sans arrêter les autres.
+    """
+    print(f"📚 Mode lot: {len(categories)} catégories, {CONFIG['batch_parallel']} à la fois → {batch_folder}")
+    os.makedirs(batch_folder, exist_ok=True)
+    
+    metrics_server = start_metrics_server(CONFIG['metrics_port']) if CONFIG['metrics_port'] else None
+    start_time = datetime.now()
+    resources = open_shared_resources()
+    reports = []
+    
+    def scrape_one(url, folder):
+        output_folder = os.path.join(batch_folder, folder)
+        images_dir = os.path.join(output_folder, "images")
+        os.makedirs(images_dir, exist_ok=True)
+        report = {'url': url, 'output_folder': output_folder, 'status': 'ok'}
+        try:
+            print(f"\n📂 Catégorie: {url} → {output_folder}")
+            report.update(scrape_category(resources, url, output_folder, images_dir, webp_quality))
+            if not report['products']:
+                report['status'] = 'vide'
+        except Exception as e:
+            print(f"❌ Échec de la catégorie {url}: {str(e)}")
+            report.update({'status': 'erreur', 'error': str(e)})
+        
+        report_path = os.path.join(output_folder, f"{OUTPUT_FILE_BASE}_report.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, CONFIG['batch_parallel']), thread_name_prefix="categorie")
+    # Avant le try: un Ctrl-C pendant la soumission doit pouvoir annuler les catégories déjà soumises
+    futures = []
+    try:
+        for url, folder in categories:
+            futures.append(executor.submit(scrape_one, url, folder))
+        for future in futures:
+            reports.append(future.result())
+    except KeyboardInterrupt:
+        print("\n⏹️  Lot interrompu par l'utilisateur")
+        resources['stop'].set()
+        for future in futures:
+            future.cancel()
+    finally:
+        # Débloquer les catégories en cours avant d'attendre leurs threads
+        close_shared_resources(resources)
+        executor.shutdown(wait=True)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+    
+    wall_seconds = (datetime.now() - start_time).total_seconds()
+    print(f"\n📚 BILAN DU LOT ({wall_seconds:.0f} s):")
+    for report in reports:
+        icon = {'ok': '✅', 'vide': '⚠️', 'erreur': '❌'}[report['status']]
+        print(f"   {icon} {report['url']}: {report.get('products', 0)} produits → {report['output_folder']}")
+    print(f"   🔇 Navigateurs démarrés: {browser_pool.started} (dont {browser_pool.recycled} remplacés)")
+    
+    print_stage_stats(wall_seconds)
+    write_metrics_report(batch_folder, "batch", wall_seconds,
+                         {'categories': reports, 'browsers_started': browser_pool.started, 'webp_quality': webp_quality,
+                          'readiness': readiness.as_dict(), 'decode_budget': decode_budget.as_dict(),
+                          'hosts': host_health.as_dict(), 'sessions': session_pool.as_dict()})
+    return reports
+
+class WorkQueue:
+    """File de tâches SQLite partagée entre un coordinateur (--coordinator) et des workers (--worker)
+    
+    Tâches 'page' (page catégorie → albums) et 'album' (extraction + image → ligne de résultats), identifiées
+    par une clé unique (page:N, album:ID): enqueue et complete sont idempotents. Un worker loue une tâche pour
+    CONFIG['lease_seconds']; une location expirée est reprise par un autre worker, jusqu'à
+    CONFIG['task_max_attempts'] tentatives. Chaque tâche terminée reçoit un numéro de séquence croissant
+    pour que le coordinateur ne relise que les nouveaux résultats.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        # Pas de WAL: le fichier peut être sur un partage réseau (verrous de fichier classiques)
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("CREATE TABLE IF NOT EXISTS tasks (key TEXT PRIMARY KEY, kind TEXT, payload TEXT, status TEXT, "
+                             "attempts INTEGER DEFAULT 0, owner TEXT, lease_until REAL, result TEXT, error TEXT, seq INTEGER)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tasks_seq ON tasks (seq)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+    
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+    
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+    
+    def enqueue(self, kind, key, payload):
+        """Ajouter une tâche si la clé est nouvelle; retourne le payload enregistré (l'ancien si elle existait)"""
+        with self._transaction() as db:
+            db.execute("INSERT OR IGNORE INTO tasks (key, kind, payload, status) VALUES (?, ?, ?, 'pending')",
+                       (key, kind, json.dumps(payload, ensure_ascii=False)))
+            return json.loads(db.execute("SELECT payload FROM tasks WHERE key = ?", (key,)).fetchone()[0])
+    
+    def payloads(self, kind):
+        """Payloads de toutes les tâches d'un type (numéros d'image déjà attribués lors d'un lancement précédent)"""
+        with self._lock:
+            return [json.loads(row[0]) for row in self._db.execute("SELECT payload FROM tasks WHERE kind = ?", (kind,))]
+    
+    def lease(self, owner):
+        """Louer la prochaine tâche disponible (pages d'abord), ou None"""
+        now = time.time()
+        with self._transaction() as db:
+            # Locations expirées sans tentative restante: échec définitif, toutes d'un coup (numéros de séquence distincts)
+            expired = db.execute("SELECT key FROM tasks WHERE status = 'leased' AND lease_until < ? AND attempts >= ? ORDER BY rowid",
+                                 (now, CONFIG['task_max_attempts'])).fetchall()
+            db.executemany("UPDATE tasks SET status = 'failed', error = COALESCE(error, 'location expirée'), "
+                           "seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks) WHERE key = ?", expired)
+            row = db.execute("SELECT key, kind, payload FROM tasks "
+                             "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ? AND attempts < ?) "
+                             "ORDER BY kind = 'album', rowid LIMIT 1", (now, CONFIG['task_max_attempts'])).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE tasks SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 WHERE key = ?",
+                       (owner, now + CONFIG['lease_seconds'], row[0]))
+        return {'key': row[0], 'kind': row[1], 'payload': json.loads(row[2])}
+    
+    def renew(self, keys, owner):
+        """Prolonger les locations des tâches encore en cours chez ce worker"""
+        if not keys:
+            return
+        with self._transaction() as db:
+            db.executemany("UPDATE tasks SET lease_until = ? WHERE key = ? AND owner = ? AND status = 'leased'",
+                           [(time.time() + CONFIG['lease_seconds'], key, owner) for key in keys])
+    
+    def release(self, keys, owner):
+        """Rendre des tâches non terminées (arrêt du worker) sans compter de tentative"""
+        with self._transaction() as db:
+            db.executemany("UPDATE tasks SET status = 'pending', owner = NULL, attempts = MAX(attempts - 1, 0) "
+                           "WHERE key = ? AND owner = ? AND status = 'leased'", [(key, owner) for key in keys])
+    
+    def complete(self, key, owner, result):
+        """Enregistrer le résultat d'une tâche; None s'il est accepté, sinon le statut qui l'a fait ignorer
+        
+        Le premier résultat est gardé. Une tâche abandonnée à l'expiration de sa dernière location ('failed'
+        sans autre worker depuis) accepte encore le résultat de ce titulaire: le coordinateur l'ajoute en retard.
+        """
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE tasks SET status = 'done', result = ?, error = NULL, "
+                                "seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks) "
+                                "WHERE key = ? AND (status IN ('pending', 'leased') OR (status = 'failed' AND owner = ?))",
+                                (json.dumps(result, ensure_ascii=False), key, owner))
+            if cursor.rowcount == 1:
+                return None
+            row = db.execute("SELECT status FROM tasks WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else 'inconnue'
+
+    
+    def fail(self, key, owner, error):
+        """Échec d'une tentative: la tâche repart dans la file, ou échoue définitivement après la dernière tentative"""
+        with self._transaction() as db:
+            db.execute("UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, owner = NULL, error = ?, "
+                       "seq = CASE WHEN attempts >= ? THEN (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks) ELSE seq END "
+                       "WHERE key = ? AND owner = ? AND status = 'leased'",
+                       (CONFIG['task_max_attempts'], error, CONFIG['task_max_attempts'], key, owner))
+    
+    def finished_since(self, seq):
+        """Tâches terminées ou définitivement échouées après le numéro de séquence seq, dans l'ordre"""
+        with self._lock:
+            rows = self._db.execute("SELECT seq, key, kind, payload, status, result, error FROM tasks "
+                                    "WHERE seq > ? AND status IN ('done', 'failed') ORDER BY seq", (seq,)).fetchall()
+        return [{'seq': row[0], 'key': row[1], 'kind': row[2], 'payload': json.loads(row[3]), 'status': row[4],
+                 'result': json.loads(row[5]) if row[5] else None, 'error': row[6]} for row in rows]
+    
+    def counts(self):
+        """Nombre de tâches par (type, statut)"""
+        with self._lock:
+            return {(kind, status): count for kind, status, count in
+                    self._db.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status")}
+    
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def page_entries(session, page_url):
+    """Albums (lien, titre, couverture) d'une page catégorie: HTML statique, repli Selenium si vide"""
+    doc = fetch_html(session, page_url)
+    entries = []
+    if doc is not None:
+        with StageTimer('recherche_elements'):
+            entries = parse_album_entries(doc, page_url)
+    if entries:
+        return entries
+    
+    print("ℹ️  Aucun produit dans le HTML statique - repli sur Selenium")
+    driver_ref = [None]
+    try:
+        driver = browser_pool.navigate(driver_ref, page_url)
+        if not readiness.wait(driver, 'categorie', CATEGORY_READY, replaced_sleep=3):
+            return []
+        with StageTimer('recherche_elements'):
+            return driver.execute_script(ALBUM_ENTRIES_SCRIPT, ALBUM_LINK_SELECTOR, ALBUM_TITLE_SELECTOR)
+    finally:
+        if driver_ref[0] is not None:
+            browser_pool.release(driver_ref[0])
+
+def run_coordinator(queue_path, base_url, output_folder, images_dir, webp_quality):
+    """Mode coordinateur: publier les pages puis les albums dans la file, fusionner les lignes des workers
+    
+    Les numéros d'image sont attribués ici, dans l'ordre des pages puis des albums, et les lignes sont
+    écrites dans cet ordre dans les sorties yupoo_data au fur et à mesure de leur arrivée.
+    """
+    start_time = datetime.now()
+    work_queue = WorkQueue(queue_path)
+    driver_ref = [None]
+    
+    total_pages, has_pagination, _ = detect_pagination_http(session_pool, base_url, driver_ref)
+    if driver_ref[0] is not None:
+        browser_pool.release(driver_ref[0])
+    session_pool.close()
+    
+    # Les workers lisent le job dans la file: dossier d'images (partagé entre machines), qualité
+    work_queue.set_meta('job', {'images_dir': os.path.abspath(images_dir), 'folder_name': os.path.basename(output_folder),
+                                'webp_quality': webp_quality})
+    work_queue.set_meta('closed', False)
+    for page in range(1, total_pages + 1):
+        work_queue.enqueue('page', f"page:{page}", {'url': build_page_url(base_url, page, has_pagination), 'page_num': page})
+    print(f"🗂️  File {queue_path}: {total_pages} pages publiées - lancez les workers avec: python scraper.py --worker {queue_path}")
+    
+    # Numérotation centrale: les numéros déjà attribués (lancement précédent) sont conservés
+    numbering = ImageNumbering(1, known={payload['link']: payload['image_number'] for payload in work_queue.payloads('album')})
+    sinks = OutputSinks(output_folder, OUTPUT_FILE_BASE, parquet=CONFIG['parquet_output'])
+    
+    page_results = {}
+    album_results = {}
+    order = collections.deque()
+    queued = set()
+    failed_keys = set()
+    next_page = 1
+    seq = 0
+    last_report = 0.0
+    
+    def publish(page_num, entries):
+        for entry in entries:
+            key = f"album:{album_id(entry['link'])}"
+            if key in queued:
+                continue
+            queued.add(key)
+            order.append(key)
+            work_queue.enqueue('album', key, {'link': entry['link'], 'page_num': page_num,
+                                              'image_number': numbering.assign(entry['link'])})
+    
+    try:
+        while True:
+            for task in work_queue.finished_since(seq):
+                seq = task['seq']
+                if task['kind'] == 'page':
+                    page_num = task['payload']['page_num']
+                    if task['status'] == 'failed':
+                        print(f"❌ Page {page_num} abandonnée: {task['error']}")
+                    elif page_num < next_page:
+                        # Résultat arrivé après l'abandon de la page (location expirée): albums publiés à la suite
+                        print(f"♻️ Page {page_num} terminée après abandon - albums ajoutés en fin de file")
+                        publish(page_num, task['result'] or [])
+                        continue
+                    page_results[page_num] = task['result'] or []
+                elif task['status'] == 'failed':
+                    print(f"❌ Album {task['payload']['link']} abandonné: {task['error']}")
+                    failed_keys.add(task['key'])
+                    album_results[task['key']] = None
+                elif task['key'] in failed_keys:
+                    # Résultat du titulaire d'une location expirée, arrivé après l'abandon de l'album
+                    failed_keys.discard(task['key'])
+                    print(f"♻️ Album {task['payload']['link']} terminé après abandon - ligne ajoutée")
+                    if task['key'] in album_results:
+                        album_results[task['key']] = task['result']
+                    elif task['result']:
+                        # Déjà dépassé dans l'ordre de fusion: ligne écrite à la suite
+                        sinks.write(task['result'])
+                else:
+                    album_results[task['key']] = task['result']
+            
+            # Les albums d'une page sont publiés quand toutes les pages précédentes l'ont été (numérotation stable)
+            while next_page in page_results:
+                publish(next_page, page_results.pop(next_page))
+                next_page += 1
+            
+            while order and order[0] in album_results:
+                row = album_results.pop(order.popleft())
+                if row:
+                    sinks.write(row)
+            
+            if next_page > total_pages and not order:
+                break
+            if time.monotonic() - last_report > 10:
+                last_report = time.monotonic()
+                counts = work_queue.counts()
+                print(f"📡 Pages {next_page - 1}/{total_pages} | albums: {sinks.count} fusionnés, "
+                      f"{counts.get(('album', 'leased'), 0)} en cours, {counts.get(('album', 'pending'), 0)} en attente")
+            time.sleep(CONFIG['queue_poll'])
+        
+        work_queue.set_meta('closed', True)
+    except KeyboardInterrupt:
+        # La file reste ouverte: relancer le coordinateur reprend la fusion là où elle en était
+        print("\n⏹️  Coordinateur interrompu - les workers continuent, relancez --coordinator pour reprendre")
+    finally:
+        sinks.close()
+        work_queue.close()
+    
+    if sinks.count:
+        save_to_files(OUTPUT_FILE_BASE, output_folder, sinks.parquet_path)
+    duration = datetime.now() - start_time
+    print(f"\n📡 Coordinateur: {sinks.count} produits fusionnés, {len(failed_keys)} albums abandonnés en {duration}")
+    return {'products': sinks.count, 'failed': len(failed_keys), 'last_image_number': numbering.last_number,
+            'wall_seconds': duration.total_seconds()}
+
+def run_worker(queue_path):
+    """Mode worker: louer des tâches dans la file et les exécuter avec l'extraction et les téléchargements habituels
+    
+    S'arrête quand le coordinateur a fermé la file et que plus rien n'est en cours.
+    """
+    import socket
+    
+    start_time = datetime.now()
+    work_queue = WorkQueue(queue_path)
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    resources = open_shared_resources()
+    capacity = max(1, CONFIG['workers']) * 2
+    executor = ThreadPoolExecutor(max_workers=capacity, thread_name_prefix="tache")
+    held = {}
+    done_count = 0
+    print(f"👷 Worker {owner} sur {queue_path} ({capacity} tâches à la fois)")
+    
+    def run_task(task):
+        payload = task['payload']
+        try:
+            if task['kind'] == 'page':
+                result = page_entries(resources['session'], payload['url'])
+                if not result:
+                    raise RuntimeError("aucun album trouvé")
+            else:
+                job = work_queue.get_meta('job')
+                os.makedirs(job['images_dir'], exist_ok=True)
+                row = resources['pipeline'].submit(job, payload['link'], payload['page_num'], payload['image_number']).result()
+                if row is None:
+                    raise RuntimeError("extraction impossible")
+                result = resolve_download(row)
+            refused = work_queue.complete(task['key'], owner, result)
+            if refused is not None:
+                print(f"   ⚠️ {task['key']}: résultat ignoré (tâche {refused} par un autre worker)")
+        except Exception as e:
+            print(f"   ❌ Tâche {task['key']}: {str(e)}")
+            work_queue.fail(task['key'], owner, str(e))
+    
+    last_renew = time.monotonic()
+    try:
+        while True:
+            for key in [key for key, future in held.items() if future.done()]:
+                held.pop(key)
+                done_count += 1
+            if time.monotonic() - last_renew > CONFIG['lease_seconds'] / 3:
+                work_queue.renew(list(held), owner)
+                last_renew = time.monotonic()
+            
+            task = work_queue.lease(owner) if len(held) < capacity else None
+            if task is None:
+                if not held and work_queue.get_meta('closed', False):
+                    break
+                time.sleep(CONFIG['queue_poll'])
+                continue
+            held[task['key']] = executor.submit(run_task, task)
+    except KeyboardInterrupt:
+        print("\n⏹️  Worker interrompu - tâches en cours rendues à la file")
+        work_queue.release(list(held), owner)
+        resources['stop'].set()
+    finally:
+        close_shared_resources(resources)
+        executor.shutdown(wait=True)
+        work_queue.close()
+    
+    wall_seconds = (datetime.now() - start_time).total_seconds()
+    print(f"\n👷 Worker {owner}: {done_count} tâches traitées en {wall_seconds:.0f} s")
+    print_stage_stats(wall_seconds)
+    return done_count
+
+def parse_args(argv=None):
+    """Options de la ligne de commande (les valeurs absentes gardent celles du fichier --config puis de CONFIG)"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="Scraper Yupoo: produits (noms nettoyés, MAX 2 mots) et images WebP img-1, img-2...",
+        epilog="Sans URL ni --batch et dans un terminal, le script pose ses questions comme avant. "
+               "Exemple non interactif: python scraper.py https://umkao.x.yupoo.com/categories/511015 -o nike -q 80",
+    )
+    parser.add_argument('urls', nargs='*', metavar='URL', help="URL(s) de catégorie Yupoo (plusieurs URLs = mode lot)")
+    parser.add_argument('--batch', metavar='FICHIER', help="fichier de catégories, une URL par ligne (nom de dossier optionnel)")
+    parser.add_argument('--config', metavar='FICHIER', help="fichier JSON: clés de CONFIG et/ou urls, batch, output, webp_quality")
+    parser.add_argument('-o', '--output', help="dossier de sortie (dossier racine du lot en mode lot)")
+    parser.add_argument('-q', '--quality', dest='webp_quality', type=int, help="qualité WebP 30-100 (défaut 80 sans terminal)")
+    parser.add_argument('--backend', choices=['http', 'selenium'])
+    parser.add_argument('--workers', type=int, help="workers d'extraction")
+    parser.add_argument('--download-workers', type=int, help="téléchargements d'images simultanés")
+    parser.add_argument('--encode-workers', type=int, help="processus d'encodage WebP")
+    parser.add_argument('--host-rate', type=float, help="requêtes d'images par seconde et par hôte (plafond, sauf --host-rate-max)")
+    parser.add_argument('--host-rate-max', type=float, help="laisser l'AIMD accélérer un hôte en bonne santé jusqu'à ce débit (--host-rate = débit de départ)")
+    parser.add_argument('--host-burst', type=int, help="rafale maximale par hôte")
+    parser.add_argument('--host-concurrency', type=int, help="requêtes HTML simultanées max par hôte (plafond, sauf --host-concurrency-max)")
+    parser.add_argument('--host-concurrency-max', type=int, help="laisser l'AIMD monter la concurrence HTML d'un hôte jusqu'à cette valeur")
+    parser.add_argument('--batch-parallel', type=int, help="catégories scrapées en même temps en mode lot")
+    parser.add_argument('--page-delay', type=float, help="pause entre deux pages catégorie (secondes)")
+    parser.add_argument('--gallery', action='store_const', const=True, help="télécharger toutes les photos de chaque album (img-N-K.webp)")
+    parser.add_argument('--gallery-max-images', type=int, help="photos max par album en mode galerie (0 = toutes)")
+    parser.add_argument('--derivative', dest='derivatives', action='append', metavar='NOM:TAILLE[:QUALITÉ[:FORMAT]]',
+                        help="taille supplémentaire dans images/NOM/ (répétable), ex. thumb:256:70 ou medium:800::AVIF")
+    parser.add_argument('--cache-dir', help="dossier du cache d'images")
+    parser.add_argument('--no-cache', action='store_true', help="désactiver le cache d'images")
+    parser.add_argument('--parquet', dest='parquet_output', action='store_const', const=True, help="écrire aussi les lignes typées dans l'entrepôt Parquet")
+    parser.add_argument('--parquet-dir', help="dossier de l'entrepôt Parquet (partitions categorie=/date_execution=)")
+    parser.add_argument('--metrics-port', type=int, help="port HTTP /metrics (Prometheus)")
+    parser.add_argument('--metrics-host', help="adresse d'écoute de /metrics (défaut 127.0.0.1; 0.0.0.0 = toutes les interfaces)")
+    parser.add_argument('--resume', action='store_const', const=True, help="reprendre depuis le journal du dossier de sortie")
+    parser.add_argument('--incremental', action='store_const', const=True, help="ne traiter que les albums nouveaux ou modifiés")
+    parser.add_argument('--coordinator', metavar='FILE_SQLITE', help="mode distribué: publier la catégorie dans cette file et fusionner les résultats")
+    parser.add_argument('--worker', metavar='FILE_SQLITE', help="mode distribué: traiter les tâches de cette file (sans URL)")
+    parser.add_argument('--dry-run', action='store_true', help="afficher la configuration et les catégories puis quitter")
+    return parser.parse_args(argv)
+
+def load_run_options(args):
+    """Fusionner CONFIG, le fichier --config et la ligne de commande (dans cet ordre de priorité croissante)
+    
+    Met à jour CONFIG et retourne les options de l'exécution: urls, batch, output, webp_quality.
+    """
+    options = {'urls': [], 'batch': None, 'output': None, 'webp_quality': None}
+    
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            file_options = json.load(f)
+        unknown = set(file_options) - set(options) - set(CONFIG)
+        if unknown:
+            raise ValueError(f"clés inconnues dans {args.config}: {', '.join(sorted(unknown))}")
+        for key, value in file_options.items():
+            if key in options:
+                options[key] = value
+            else:
+                CONFIG[key] = value
+        if isinstance(options['urls'], str):
+            options['urls'] = [options['urls']]
+    
+    for key in options:
+        value = getattr(args, key, None)
+        if value:
+            options[key] = value
+    for key in CONFIG:
+        value = getattr(args, key, None)
+        if value is not None:
+            CONFIG[key] = value
+    if args.no_cache:
+        CONFIG['cache_dir'] = None
+    CONFIG['derivatives'] = [normalize_derivative(spec) for spec in CONFIG['derivatives']]
+    
+    if options['webp_quality'] is not None and not 30 <= options['webp_quality'] <= 100:
+        raise ValueError("la qualité WebP doit être entre 30 et 100")
+    options['urls'] = [clean_category_url(url) for url in options['urls']]
+    return options
+
+def main(argv=None):
+    """Fonction principale de scraping; retourne le code de sortie du processus"""
+    try:
+        args = parse_args(argv)
+        options = load_run_options(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ Configuration invalide: {str(e)}")
+        return 2
+    
+    # Sans URL en argument, les questions ne sont posées que si quelqu'un peut y répondre
+    interactive = not options['urls'] and not options['batch'] and sys.stdin.isatty() and not args.worker
+    
+    print("🚀 Scraper Intelligent Yupoo (Images: img-1, img-2... | Noms: MAX 2 MOTS)")
+    print("=" * 80)
+    
+    # Mode distribué, côté worker: tout (URLs, dossier, qualité) vient de la file du coordinateur
+    if args.worker:
+        if args.dry_run:
+            print(f"⚙️  CONFIG: {json.dumps(CONFIG, ensure_ascii=False)}")
+            print(f"👷 Worker sur la file {args.worker}")
+            return 0
+        run_worker(args.worker)
+        return 0
+    
+    if not interactive and not options['urls'] and not options['batch']:
+        print("❌ Aucune URL: passez une URL, --batch FICHIER ou 'urls' dans --config (voir --help)")
+        return 2
+    
+    categories = None
+    if args.coordinator and (options['batch'] or len(options['urls']) != 1):
+        print("❌ --coordinator attend exactement une URL de catégorie")
+        return 2
+    if options['batch'] or len(options['urls']) > 1:
+        categories = [(url, category_folder_name(url)) for url in options['urls']]
+        if options['batch']:
+            try:
+                categories += read_batch_file(options['batch'])
+            except OSError as e:
+                print(f"❌ Fichier de lot illisible: {str(e)}")
+                return 2
+    
+    if args.dry_run:
+        print(f"⚙️  CONFIG: {json.dumps(CONFIG, ensure_ascii=False)}")
+        for url, folder in categories or [(url, options['output'] or '(dossier horodaté)') for url in options['urls']]:
+            print(f"   📂 {url} → {folder}")
+        print(f"🎨 Qualité WebP: {options['webp_quality'] or 80}")
+        return 0
+    
+    # Vérifier si Pillow est installé
+    try:
+        from PIL import Image
+    except ImportError:
+        print("❌ ERREUR: Pillow n'est pas installé!")
+        print("📦 Installez-le avec: pip install Pillow")
+        return 1
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # Mode lot: plusieurs URLs ou python scraper.py --batch categories.txt
+    if categories is not None:
+        webp_quality = options['webp_quality'] or 80
+        reports = run_batch(categories, options['output'] or f"batch_yupoo_{timestamp}", webp_quality)
+        return 0 if any(report['status'] != 'erreur' for report in reports) else 1
+    
+    if interactive:
+        # Obtenir l'URL et configurer le dossier
+        base_url = get_base_url()
+        output_folder, images_dir = create_output_folder()
+        
+        # NOUVELLE FONCTION: Obtenir la qualité WebP de l'utilisateur
+        webp_quality = get_webp_quality()
+    else:
+        base_url = options['urls'][0]
+        output_folder, images_dir = prepare_output_folder(options['output'] or f"scrape_yupoo_{timestamp}")
+        webp_quality = options['webp_quality'] or 80
+    
+    print(f"\n💾 Dossier de sortie: {output_folder}")
+    print(f"🖼️  Dossier des images: {images_dir}")
+    print(f"🎨 Qualité WebP: {webp_quality}")
+    
+    if args.coordinator:
+        summary = run_coordinator(args.coordinator, base_url, output_folder, images_dir, webp_quality)
+        return 0 if summary['products'] else 1
+    
+    print("💻 Vous pouvez continuer à utiliser votre ordinateur normalement pendant le scraping!")
+    
+    summary = run_scrape(base_url, output_folder, images_dir, webp_quality)
+    return 0 if summary['products'] or CONFIG['incremental'] else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Dédoublonnage des couvertures: réutilisation, plus petit numéro de référence, retrait des copies, reprise"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import benchmark
+import scraper
+
+SCRAPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scraper.py')
+PAGES = 3
+ALBUMS_PER_PAGE = 6
+SHARED = 3
+TOTAL = PAGES * ALBUMS_PER_PAGE
+
+def write_file(images_dir, filename, data):
+    with open(os.path.join(images_dir, filename), 'wb') as f:
+        f.write(data)
+
+@pytest.fixture
+def dedup(tmp_path):
+    images_dir = tmp_path / 'images'
+    images_dir.mkdir()
+    index = scraper.DedupIndex(str(tmp_path), str(images_dir), None)
+    yield index
+    index.close()
+
+def test_identical_cover_waits_for_the_lowest_number(dedup):
+    images_dir = dedup._images_dir
+    # img-5 commence avant img-3: img-3 n'attend pas un plus grand numéro, img-4 attend img-3
+    assert dedup.claim('H', None, 'img-5.webp') == (None, None)
+    assert dedup.claim('H', None, 'img-3.webp') == (None, None)
+    _, pending = dedup.claim('H', None, 'img-4.webp')
+    write_file(images_dir, 'img-5.webp', b'cinq')
+    dedup.add('H', None, 'img-5.webp', 'url-5', 4, 0.1)
+    assert not pending.done()
+    write_file(images_dir, 'img-3.webp', b'trois')
+    dedup.add('H', None, 'img-3.webp', 'url-3', 5, 0.1)
+    assert pending.result()['filename'] == 'img-3.webp'
+
+    # Une couverture plus tardive réutilise directement le plus petit fichier
+    entry, _ = dedup.claim('H', None, 'img-9.webp')
+    assert entry['filename'] == 'img-3.webp'
+    assert dedup.reuse(entry, 100) == (True, 'img-3.webp', 'url-3')
+
+def resolved_row(dedup, own_number, result):
+    future = Future()
+    future.set_result(result)
+    row = {'URL_Image_Originale': f"http://photo.yupoo.com/u/{own_number}/medium.jpg", 'Qualite_WebP': 80,
+           '_download': future, '_image_file': f"img-{own_number}.webp", '_dedup': dedup}
+    return scraper.resolve_download(row)
+
+def test_resolve_retires_later_copy_and_repoints_rows(dedup):
+    images_dir = dedup._images_dir
+    for number in (1, 2):
+        write_file(images_dir, f"img-{number}.webp", b'meme image')
+        dedup.add('H', None, f"img-{number}.webp", f"url-{number}", 10, 0.1)
+
+    # img-2 encodé avant img-1: sa ligne et celle de l'album 3 (qui l'a réutilisé) pointent vers img-1
+    own = resolved_row(dedup, 2, (True, 'img-2.webp', 'url-2'))
+    reused = resolved_row(dedup, 3, (True, 'img-2.webp', 'url-2'))
+    for row in (own, reused):
+        assert (row['Image_Telecharge'], row['URL_Image_Serveur']) == ('img-1.webp', 'url-1')
+        assert row['Statut_Telechargement'].startswith("✅ DOUBLON de img-1.webp")
+        assert not any(key.startswith('_') for key in row)
+    assert sorted(os.listdir(images_dir)) == ['img-1.webp']
+    assert dedup.duplicates == 1
+
+    first = resolved_row(dedup, 1, (True, 'img-1.webp', 'url-1'))
+    assert first['Statut_Telechargement'].startswith("✅ RÉUSSI")
+
+def test_rewritten_file_is_never_reused(dedup, tmp_path):
+    images_dir = dedup._images_dir
+    write_file(images_dir, 'img-1.webp', b'ancienne image')
+    dedup.add('H', None, 'img-1.webp', 'url-1', 14, 0.1)
+
+    # Fichier réécrit hors index (exécution interrompue): le SHA-256 ne correspond plus
+    write_file(images_dir, 'img-1.webp', b'nouvelle image, autre taille')
+    assert dedup.find('H', None, 'img-2.webp') is None
+
+    # Rechargé: la dernière entrée d'un fichier remplace les précédentes
+    dedup.add('K', None, 'img-1.webp', 'url-1', 28, 0.1)
+    dedup.close()
+    reloaded = scraper.DedupIndex(str(tmp_path), images_dir, None)
+    try:
+        assert reloaded.find('H', None, 'img-2.webp') is None
+        assert reloaded.find('K', None, 'img-2.webp')['filename'] == 'img-1.webp'
+    finally:
+        reloaded.close()
+
+@pytest.fixture(scope='module')
+def category_url():
+    # Couvertures identiques par groupes de SHARED albums consécutifs (img-1 à img-3, img-4 à img-6...)
+    options = benchmark.parse_args(['--pages', str(PAGES), '--albums-per-page', str(ALBUMS_PER_PAGE),
+                                    '--shared-covers', str(SHARED), '--image-size', '64x64', '--latency-ms', '20'])
+    process, url = benchmark.start_stand_in(options)
+    yield url
+    process.terminate()
+    process.join()
+
+def scraper_command(url, work_dir, *extra):
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'host_rate': 1000.0}, f)
+    return [sys.executable, SCRAPER, url, '-o', 'sortie', '-q', '80', '--no-cache', '--workers', '4',
+            '--encode-workers', '2', '--config', config_path, *extra]
+
+def expected_file(link):
+    # /albums/<page * 1000 + position>: rang de l'album, donc son numéro img-N et celui de son groupe
+    album = int(link.split('/albums/')[1].split('?')[0])
+    ordinal = benchmark.album_ordinal(album, {'albums_per_page': ALBUMS_PER_PAGE})
+    return f"img-{ordinal - ordinal % SHARED + 1}.webp"
+
+def check_output(work_dir):
+    with open(os.path.join(work_dir, 'sortie', 'yupoo_data.csv'), newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == TOTAL
+    for row in rows:
+        assert row['Image_Telecharge'] == expected_file(row['Lien_Article']), row
+        assert row['URL_Image_Serveur'].endswith(f"/{row['Image_Telecharge']}")
+    referenced = {row['Image_Telecharge'] for row in rows}
+    assert referenced == {f"img-{n}.webp" for n in range(1, TOTAL + 1, SHARED)}
+    assert sum(row['Statut_Telechargement'].startswith("✅ DOUBLON") for row in rows) == TOTAL - len(referenced)
+    return referenced, set(os.listdir(os.path.join(work_dir, 'sortie', 'images')))
+
+def test_shared_covers_point_to_the_lowest_number(category_url, tmp_path):
+    work_dir = str(tmp_path)
+    run = subprocess.run(scraper_command(category_url, work_dir), cwd=work_dir,
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=300)
+    assert run.returncode == 0, run.stdout.decode('utf-8', 'replace')[-2000:]
+    referenced, on_disk = check_output(work_dir)
+    # Chaque couverture n'existe qu'une fois: les copies encodées en parallèle ont été retirées
+    assert on_disk == referenced
+
+def journal_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for line in f if line.endswith('\n'))
+
+def test_shared_covers_after_resume(category_url, tmp_path):
+    work_dir = str(tmp_path)
+    journal_path = os.path.join(work_dir, 'sortie', 'scrape_journal.jsonl')
+    run = subprocess.Popen(scraper_command(category_url, work_dir), cwd=work_dir,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while journal_lines(journal_path) < ALBUMS_PER_PAGE + 1 and run.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    run.kill()
+    run.wait()
+    assert 0 < journal_lines(journal_path) < TOTAL, "l'exécution doit être interrompue au milieu de la catégorie"
+
+    resumed = subprocess.run(scraper_command(category_url, work_dir, '--resume'), cwd=work_dir,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=300)
+    assert resumed.returncode == 0, resumed.stdout.decode('utf-8', 'replace')[-2000:]
+    referenced, on_disk = check_output(work_dir)
+    # Un encodage interrompu peut laisser un fichier orphelin, jamais une ligne vers un fichier absent
+    assert referenced <= on_disk
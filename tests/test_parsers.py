@@ -0,0 +1,81 @@
+"""Parseurs lxml des pages catégorie et album, sur des pages Yupoo enregistrées servies en local
+
+tests/data/html: pages réduites à ce que lisent les sélecteurs (couvertures en chargement différé,
+titres en attribut ou en texte, trois formes de pagination).
+"""
+
+import functools
+import http.server
+import os
+import threading
+
+import pytest
+import requests
+
+import scraper
+
+HTML_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'html')
+
+@pytest.fixture(scope='module')
+def site():
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=HTML_DIR)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(scope='module')
+def session():
+    with requests.Session() as session:
+        yield session
+
+def fetch(site, session, name):
+    doc = scraper.fetch_html(session, f"{site}/{name}")
+    assert doc is not None
+    return doc, f"{site}/{name}"
+
+def test_pagination_total_text(site, session):
+    doc, _ = fetch(site, session, 'category_total.html')
+    assert scraper.parse_pagination(doc) == (7, True)
+
+def test_pagination_number_links(site, session):
+    doc, _ = fetch(site, session, 'category_numbers.html')
+    assert scraper.parse_pagination(doc) == (4, True)
+
+def test_no_pagination(site, session):
+    doc, _ = fetch(site, session, 'category_single.html')
+    assert scraper.parse_pagination(doc) == (1, False)
+
+def test_album_entries(site, session):
+    doc, page_url = fetch(site, session, 'category_total.html')
+    entries = scraper.parse_album_entries(doc, page_url)
+    assert entries == [
+        {'link': f"{site}/albums/101?uid=1&isSubCate=false", 'title': "200 YEEZY 700V2 Teal Blue Size 36-46",
+         'cover': "//photo.yupoo.com/shoes/101/medium.jpg"},
+        {'link': f"{site}/albums/102?uid=1", 'title': "Air Force 1 Low White",
+         'cover': "//photo.yupoo.com/shoes/102/small.jpg"},
+        {'link': "https://shoes.x.yupoo.com/albums/103?uid=1", 'title': "Dunk Low Panda",
+         'cover': "https://photo.yupoo.com/shoes/103/small.jpg"},
+    ]
+
+def test_product_page_with_lazy_cover(site, session):
+    doc, page_url = fetch(site, session, 'album_lazy.html')
+    name, image_url = scraper.parse_product_page(doc, page_url)
+    assert name == "200 YEEZY 700V2 Teal Blue Size 36-46"
+    assert image_url == "http://photo.yupoo.com/shoes/101/medium.jpg"
+
+def test_product_page_fallback_selectors(site, session):
+    doc, page_url = fetch(site, session, 'album_fallback.html')
+    assert scraper.parse_product_page(doc, page_url) == ("Dunk Low Panda (Nom attribut)",
+                                                         "https://photo.yupoo.com/shoes/103/medium.jpg")
+
+def test_gallery_urls_skip_placeholders_and_duplicates(site, session):
+    doc, page_url = fetch(site, session, 'album_lazy.html')
+    assert scraper.parse_gallery_urls(doc, page_url) == [
+        "http://photo.yupoo.com/shoes/101/a1.jpg",
+        "http://photo.yupoo.com/shoes/101/a2.jpg",
+        "https://photo.yupoo.com/shoes/101/a3.jpg",
+    ]
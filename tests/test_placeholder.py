@@ -0,0 +1,13 @@
+"""Détection des placeholders d'après l'URL finale et les en-têtes"""
+
+import scraper
+
+def test_port_or_host_never_marks_an_image_as_placeholder():
+    # Le faux site local écoute sur un port aléatoire: :40412 contient '404'
+    url = "http://127.0.0.1:40412/photo.yupoo.com/bench/1001/0/medium.jpg"
+    assert scraper.placeholder_reason(url, 'image/jpeg', 50000) is None
+    assert scraper.placeholder_reason("http://error.example.com/i/1.jpg", 'image/jpeg', 50000) is None
+
+def test_placeholder_paths_are_detected():
+    assert scraper.placeholder_reason("https://s.yupoo.com/res/703.gif", 'image/gif', 50000) is not None
+    assert scraper.placeholder_reason("https://photo.yupoo.com/u/404/medium.jpg", 'image/jpeg', 50000) is not None
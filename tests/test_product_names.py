@@ -0,0 +1,32 @@
+"""Le normaliseur précompilé doit rester identique à l'ancien clean_product_name
+
+tests/data/product_names_golden.jsonl: titres fournisseurs (écrits à la main et générés) et le nom
+produit par l'implémentation d'origine, une paire JSON par ligne.
+"""
+
+import json
+import os
+
+import scraper
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'product_names_golden.jsonl')
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_normalizer_matches_golden_corpus():
+    normalizer = scraper.ProductNameNormalizer()
+    mismatches = [(case['input'], case['expected'], normalizer(case['input']))
+                  for case in load_golden() if normalizer(case['input']) != case['expected']]
+    assert not mismatches, mismatches[:10]
+
+def test_normalize_many_matches_golden_corpus():
+    corpus = load_golden()
+    names = [case['input'] for case in corpus]
+    # Deux fois chaque titre: les doublons passent par le cache
+    assert scraper.ProductNameNormalizer().normalize_many(names + names) == [case['expected'] for case in corpus] * 2
+
+def test_clean_product_name_uses_the_normalizer():
+    for case in load_golden()[:200]:
+        assert scraper.clean_product_name(case['input']) == case['expected']
@@ -0,0 +1,26 @@
+"""Décodage des images au-delà de CONFIG['max_decode_pixels']"""
+
+import io
+
+from PIL import Image
+
+import scraper
+
+def encoded(image_format, size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (10, 200, 30)).save(buffer, image_format)
+    return buffer.getvalue()
+
+def test_large_png_and_webp_are_downscaled_under_the_limit(tmp_path):
+    for image_format in ('PNG', 'WEBP'):
+        output = str(tmp_path / f"{image_format}.webp")
+        size, _ = scraper.render_images(encoded(image_format, (3000, 2000)), [(output, None, 80, 'WEBP')], 1_000_000)
+        assert size > 0
+        width, height = Image.open(output).size
+        assert width * height <= 1_000_000 and abs(width / height - 1.5) < 0.01
+
+def test_large_jpeg_is_decoded_at_reduced_scale(tmp_path):
+    output = str(tmp_path / "jpeg.webp")
+    scraper.render_images(encoded('JPEG', (4000, 3000)), [(output, None, 80, 'WEBP')], 1_000_000)
+    width, height = Image.open(output).size
+    assert width * height <= 1_000_000
@@ -0,0 +1,79 @@
+"""Arrêt brutal au milieu d'une catégorie puis --resume, sur le faux site local de benchmark.py"""
+
+import csv
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import benchmark
+
+SCRAPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scraper.py')
+PAGES = 4
+ALBUMS_PER_PAGE = 6
+TOTAL = PAGES * ALBUMS_PER_PAGE
+
+@pytest.fixture(scope='module')
+def category_url():
+    options = benchmark.parse_args(['--pages', str(PAGES), '--albums-per-page', str(ALBUMS_PER_PAGE),
+                                    '--image-size', '64x64', '--latency-ms', '40'])
+    process, url = benchmark.start_stand_in(options)
+    yield url
+    process.terminate()
+    process.join()
+
+def scraper_command(url, work_dir, *extra):
+    # Sans dédoublonnage: chaque produit doit avoir son propre fichier img-N.webp
+    config_path = os.path.join(work_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'dedup': False, 'host_rate': 1000.0}, f)
+    return [sys.executable, SCRAPER, url, '-o', 'sortie', '-q', '80', '--no-cache', '--workers', '2',
+            '--encode-workers', '1', '--config', config_path, *extra]
+
+def journal_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return sum(1 for line in f if line.endswith('\n'))
+
+def test_killed_run_resumes_without_duplicates_or_gaps(category_url, tmp_path):
+    work_dir = str(tmp_path)
+    journal_path = os.path.join(work_dir, 'sortie', 'scrape_journal.jsonl')
+    
+    # Première exécution tuée (SIGKILL, sans nettoyage) après quelques produits journalisés
+    run = subprocess.Popen(scraper_command(category_url, work_dir), cwd=work_dir,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while journal_lines(journal_path) < ALBUMS_PER_PAGE + 1 and run.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    run.kill()
+    run.wait()
+    killed_at = journal_lines(journal_path)
+    assert 0 < killed_at < TOTAL, "l'exécution doit être interrompue au milieu de la catégorie"
+    
+    # Reprise jusqu'au bout
+    resumed = subprocess.run(scraper_command(category_url, work_dir, '--resume'), cwd=work_dir,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=300)
+    assert resumed.returncode == 0, resumed.stdout.decode('utf-8', 'replace')[-2000:]
+    
+    with open(os.path.join(work_dir, 'sortie', 'yupoo_data.csv'), newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    links = [row['Lien_Article'] for row in rows]
+    assert len(links) == TOTAL
+    assert len(set(links)) == TOTAL
+    
+    # Numéros img-N: la dernière entrée du journal de chaque lien, sans trou ni doublon
+    numbers = {}
+    with open(journal_path, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            numbers[entry['link']] = entry['image_number']
+    assert set(numbers) == set(links)
+    assert sorted(numbers.values()) == list(range(1, TOTAL + 1))
+    
+    assert sorted(row['Image_Telecharge'] for row in rows) == sorted(f"img-{n}.webp" for n in range(1, TOTAL + 1))
+    images = sorted(name for name in os.listdir(os.path.join(work_dir, 'sortie', 'images')) if name.endswith('.webp'))
+    assert images == sorted(f"img-{n}.webp" for n in range(1, TOTAL + 1))
@@ -0,0 +1,62 @@
+"""File de tâches SQLite du mode coordinateur / workers"""
+
+import pytest
+
+import scraper
+
+@pytest.fixture
+def work_queue(tmp_path, monkeypatch):
+    monkeypatch.setitem(scraper.CONFIG, 'task_max_attempts', 2)
+    monkeypatch.setitem(scraper.CONFIG, 'lease_seconds', 120)
+    queue = scraper.WorkQueue(str(tmp_path / 'file.db'))
+    yield queue
+    queue.close()
+
+def expire_leases(monkeypatch):
+    # Les prochaines locations expirent aussitôt accordées
+    monkeypatch.setitem(scraper.CONFIG, 'lease_seconds', -1)
+
+def statuses(queue):
+    return {(task['key'], task['status']) for task in queue.finished_since(0)}
+
+def test_enqueue_twice_keeps_the_first_payload(work_queue):
+    assert work_queue.enqueue('album', 'album:1', {'image_number': 1}) == {'image_number': 1}
+    assert work_queue.enqueue('album', 'album:1', {'image_number': 7}) == {'image_number': 1}
+    assert work_queue.counts() == {('album', 'pending'): 1}
+
+def test_expired_lease_is_leased_again(work_queue, monkeypatch):
+    work_queue.enqueue('album', 'album:1', {})
+    expire_leases(monkeypatch)
+    assert work_queue.lease('A')['key'] == 'album:1'
+    assert work_queue.lease('B')['key'] == 'album:1'
+    # Location reprise: le résultat de B est accepté, celui de A arrive trop tard
+    assert work_queue.complete('album:1', 'B', {'row': 'B'}) is None
+    assert work_queue.complete('album:1', 'A', {'row': 'A'}) == 'done'
+    assert [task['result'] for task in work_queue.finished_since(0)] == [{'row': 'B'}]
+
+def test_fail_retries_until_max_attempts(work_queue):
+    work_queue.enqueue('album', 'album:1', {})
+    work_queue.fail(work_queue.lease('A')['key'], 'A', "erreur 1")
+    assert work_queue.counts() == {('album', 'pending'): 1}
+    work_queue.fail(work_queue.lease('B')['key'], 'B', "erreur 2")
+    assert work_queue.lease('C') is None
+    assert statuses(work_queue) == {('album:1', 'failed')}
+
+def test_late_complete_after_lease_expiry_is_kept(work_queue, monkeypatch):
+    for number in (1, 2, 3):
+        work_queue.enqueue('album', f"album:{number}", {})
+    expire_leases(monkeypatch)
+    holders = {}
+    for owner in 'ABCDEF':
+        holders[work_queue.lease(owner)['key']] = owner
+    # Dernières tentatives expirées: toutes abandonnées au même appel
+    assert work_queue.lease('G') is None
+    assert statuses(work_queue) == {('album:1', 'failed'), ('album:2', 'failed'), ('album:3', 'failed')}
+    assert len({task['seq'] for task in work_queue.finished_since(0)}) == 3
+    
+    # Le titulaire de la dernière location termine quand même: résultat gardé; un autre worker est refusé
+    assert work_queue.complete('album:1', 'G', {'row': 'G'}) == 'failed'
+    assert work_queue.complete('album:1', holders['album:1'], {'row': 'late'}) is None
+    assert work_queue.complete('album:1', holders['album:1'], {'row': 'again'}) == 'done'
+    late = [task for task in work_queue.finished_since(0) if task['key'] == 'album:1']
+    assert [(task['status'], task['result']) for task in late] == [('done', {'row': 'late'})]